@@ -0,0 +1,77 @@
+"""
+Throughput benchmark: one-prompt-per-call `model.generate` vs the
+continuous-batching scheduler, at 1, 4 and 16 concurrent callers.
+
+Usage:
+    python benchmarks/bench_batching.py [--max-tokens 64] [--prompts-per-caller 2]
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import model_loader
+
+PROMPTS = [
+    "What is SIP?",
+    "Explain the difference between PPF and FD.",
+    "I earn 50k, spent 5k on food and 12k on rent. How much do I save?",
+    "What are the benefits of an index fund?",
+    "How does the new tax regime work?",
+    "Explain emergency funds to a beginner.",
+]
+
+
+def _count_tokens(tokenizer, text: str) -> int:
+    return len(tokenizer(text, add_special_tokens=False)["input_ids"])
+
+
+def run(mode: str, callers: int, prompts_per_caller: int, max_tokens: int) -> dict:
+    tokenizer, _, _ = model_loader.load_model()
+    generate = model_loader._generate_batched if mode == "batched" else model_loader._generate_direct
+
+    def caller(idx: int) -> int:
+        tokens = 0
+        for j in range(prompts_per_caller):
+            prompt = PROMPTS[(idx + j) % len(PROMPTS)]
+            tokens += _count_tokens(tokenizer, generate(prompt, max_tokens, 0.7))
+        return tokens
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=callers) as pool:
+        total_tokens = sum(pool.map(caller, range(callers)))
+    elapsed = time.perf_counter() - start
+
+    return {
+        "mode": mode,
+        "callers": callers,
+        "requests": callers * prompts_per_caller,
+        "seconds": round(elapsed, 2),
+        "tokens_per_sec": round(total_tokens / elapsed, 1),
+        "requests_per_sec": round(callers * prompts_per_caller / elapsed, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--max-tokens", type=int, default=64)
+    parser.add_argument("--prompts-per-caller", type=int, default=2)
+    parser.add_argument("--callers", type=int, nargs="+", default=[1, 4, 16])
+    args = parser.parse_args()
+
+    # Load once so model start-up is not part of any measurement
+    model_loader.load_model()
+    model_loader.get_scheduler()
+
+    print(f"{'mode':<8} {'callers':>7} {'requests':>8} {'seconds':>8} {'tok/s':>8} {'req/s':>7}")
+    for callers in args.callers:
+        for mode in ("direct", "batched"):
+            r = run(mode, callers, args.prompts_per_caller, args.max_tokens)
+            print(f"{r['mode']:<8} {r['callers']:>7} {r['requests']:>8} {r['seconds']:>8} {r['tokens_per_sec']:>8} {r['requests_per_sec']:>7}")
+
+
+if __name__ == "__main__":
+    main()
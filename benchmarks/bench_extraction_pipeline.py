@@ -0,0 +1,70 @@
+"""
+Latency benchmark for the analysis pipeline's extraction step.
+
+Compares the old two-call path (extract_expenses_from_text, then
+extract_income_from_text inside savings_analysis) with the single combined
+extract_financials_from_text call, over the same narratives.
+
+The response cache is disabled and the rule-based fast path can never
+accept (its confidence is at most 1), so every call really runs the model.
+
+Usage:
+    python benchmarks/bench_extraction_pipeline.py [--repeats 3]
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+os.environ["FINSMART_RESPONSE_CACHE"] = "0"
+os.environ["FINSMART_FAST_PATH_MIN_CONFIDENCE"] = "2"
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import model_loader
+from bench_precision import NARRATIVES
+from expenses_categorizer import extract_expenses_from_text, extract_financials_from_text
+from savings_analysis import extract_income_from_text
+
+
+def two_calls(text: str):
+    extract_expenses_from_text(text)
+    extract_income_from_text(text)
+
+
+def one_call(text: str):
+    extract_financials_from_text(text)
+
+
+def measure(fn, repeats: int) -> list:
+    timings = []
+    for _ in range(repeats):
+        for text, _expected in NARRATIVES:
+            start = time.perf_counter()
+            fn(text)
+            timings.append(time.perf_counter() - start)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    model_loader.load_model()
+    # Warm both paths once (prefix KV cache, kernels) so neither pays first-call costs
+    two_calls(NARRATIVES[0][0])
+    one_call(NARRATIVES[0][0])
+
+    two = measure(two_calls, args.repeats)
+    one = measure(one_call, args.repeats)
+
+    print(f"{'path':<22} {'mean s':>8} {'p50 s':>8} {'max s':>8}")
+    for name, t in (("expenses + income", two), ("combined (1 call)", one)):
+        print(f"{name:<22} {statistics.mean(t):>8.3f} {statistics.median(t):>8.3f} {max(t):>8.3f}")
+    saved = statistics.mean(two) - statistics.mean(one)
+    print(f"Saved per narrative: {saved:.3f} s ({saved / statistics.mean(two) * 100:.1f}%)")
+
+
+if __name__ == "__main__":
+    main()
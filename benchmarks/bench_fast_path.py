@@ -0,0 +1,82 @@
+"""
+Rule-based fast path coverage benchmark.
+
+Runs the deterministic income/expense parser over a fixed set of narratives
+and reports the share that would be served without any model inference
+(confidence >= FINSMART_FAST_PATH_MIN_CONFIDENCE), how many of those match the
+expected income and total expenses, and the parse latency.
+No model is loaded.
+
+Usage:
+    python benchmarks/bench_fast_path.py [--verbose]
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import config
+from rule_extractor import parse_financial_text
+
+# (narrative, expected income, expected total expenses)
+BENCHMARK = [
+    ("I earn 50k, spent 5k on food and 12k on rent.", 50000, 17000),
+    ("My salary is 60000. I spent 4000 on food, 800 on Netflix and 3000 on petrol.", 60000, 7800),
+    ("Salary 1.2 lakh per month, rent 35000, groceries 8000, electricity bill 2500", 120000, 45500),
+    ("I make 45,000 a month. Paid 15,000 rent and 2,000 for the internet bill.", 45000, 17000),
+    ("Income 12 LPA. Spent 20k on rent and 5k on travel.", 100000, 25000),
+    ("I earn 75000 and spend 10000 on food, 25000 on rent and 3000 on shopping", 75000, 38000),
+    ("₹300 on movie and ₹1200 on groceries", 0, 1500),
+    ("Paid 1,20,000 for school fees", 0, 120000),
+    ("My take home is 90k. Rent 30k, swiggy 6k, uber 4k, gym 2k.", 90000, 42000),
+    ("I earn 40000. Spent 2000 on medicines and 1500 on a doctor visit.", 40000, 3500),
+    ("Stipend 25k, hostel 8k, food 6k, books 1k", 25000, 15000),
+    ("I earn $5000 and spent $1200 on rent and $400 on groceries", 5000, 1600),
+    ("salary 80k; rent 20k; emi 15k; petrol 4k; netflix 649", 80000, 39649),
+    ("I got a salary of 55000 and spent 3000 on clothes", 55000, 3000),
+    ("I earn 1.5 lakh monthly. Spent 40k on house rent and 10k on dining out.", 150000, 50000),
+    # Harder narratives the parser should hand to the LLM
+    ("I earn 50k but I spent a lot on random stuff this month", 50000, None),
+    ("I invest 5000 in SIP and earn 60000", 60000, None),
+    ("My wife and I earn 1 lakh together, we spent 20k on our 2 kids' school", 100000, 20000),
+    ("Spent 3000 on Zara and 2000 at Decathlon", 0, 5000),
+    ("I earn 70000 and spent 8% on food", 70000, None),
+    ("Paid my maid 5000 as salary and spent 2000 on vegetables", 0, 7000),
+    ("Got a bonus of 20k this month, salary 60k, rent 15k", 80000, 15000),
+    ("I didn't spend anything on travel but paid 12000 rent", 0, 12000),
+    ("Earned 30000 from freelancing and 50000 salary, spent 25000 total", 80000, 25000),
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+
+    served, correct, timings = 0, 0, []
+    for text, income, total in BENCHMARK:
+        start = time.perf_counter()
+        result = parse_financial_text(text)
+        timings.append(time.perf_counter() - start)
+
+        confident = result["confidence"] >= config.FAST_PATH_MIN_CONFIDENCE
+        got_total = sum(e["amount"] for e in result["expenses"])
+        ok = result["income"] == income and total is not None and abs(got_total - total) < 1
+        served += confident
+        correct += confident and ok
+        if args.verbose:
+            flag = "FAST" if confident else "LLM "
+            print(f"[{flag}] conf={result['confidence']:.2f} income={result['income']} total={got_total} ok={ok} | {text}")
+
+    n = len(BENCHMARK)
+    print(f"Narratives:                 {n}")
+    print(f"Served without inference:   {served} ({served / n * 100:.1f}%)")
+    print(f"Correct among fast-path:    {correct}/{served}")
+    print(f"Parse latency (mean / max): {statistics.mean(timings) * 1e6:.0f} µs / {max(timings) * 1e6:.0f} µs")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+File categorization benchmark: a synthetic bank statement with many rows but
+few distinct merchants, categorized through extract_expenses_from_file.
+
+Reports wall time, distinct descriptions, how many the keyword rules handled
+and how many LLM calls were needed (which should track distinct unknown
+merchants, not rows).
+
+Usage:
+    python benchmarks/bench_file_categorization.py [--rows 10000] [--merchants 80]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import pandas as pd
+
+import expenses_categorizer
+import model_loader
+
+KNOWN = ["SWIGGY", "ZOMATO", "UBER", "OLA CABS", "NETFLIX", "SPOTIFY", "AMAZON", "FLIPKART", "BESCOM ELECTRICITY",
+         "AIRTEL RECHARGE", "APOLLO PHARMACY", "BIGBASKET GROCERY", "IRCTC TRAIN", "INDIAN OIL PETROL", "HOUSE RENT"]
+UNKNOWN_WORDS = ["KRISHNA", "SAI", "GANESH", "STAR", "ROYAL", "CITY", "NEW", "GREEN", "SHREE", "MAHALAXMI"]
+UNKNOWN_KINDS = ["TRADERS", "ENTERPRISES", "STORES", "AGENCIES", "CORNER", "MART", "CENTRE", "HUB"]
+
+
+def make_statement(rows: int, merchants: int, seed: int = 0) -> pd.DataFrame:
+    rng = random.Random(seed)
+    names = list(KNOWN)
+    while len(names) < merchants:
+        name = f"{rng.choice(UNKNOWN_WORDS)} {rng.choice(UNKNOWN_KINDS)}"
+        if name not in names:
+            names.append(name)
+    descriptions = [
+        f"UPI/{rng.randint(10**11, 10**12)}/{rng.choice(names)}/{rng.choice(['okicici', 'ybl', 'oksbi'])}"
+        for _ in range(rows)
+    ]
+    amounts = [round(rng.uniform(50, 5000), 2) for _ in range(rows)]
+    return pd.DataFrame({"date": pd.Timestamp("2024-01-01"), "description": descriptions, "amount": amounts})
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--merchants", type=int, default=80)
+    args = parser.parse_args()
+
+    model_loader.load_model()  # Load + warmup outside the timing
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "statement.csv")
+        make_statement(args.rows, args.merchants).to_csv(path, index=False)
+
+        calls = []
+        original = expenses_categorizer.call_llm
+
+        def counting_call_llm(*a, **kw):
+            calls.append(1)
+            return original(*a, **kw)
+
+        expenses_categorizer.call_llm = counting_call_llm
+        try:
+            start = time.perf_counter()
+            transactions = expenses_categorizer.extract_expenses_from_file(path)
+            elapsed = time.perf_counter() - start
+        finally:
+            expenses_categorizer.call_llm = original
+
+    categories = pd.Series([t["category"] for t in transactions]).value_counts().to_dict()
+    print(f"rows: {len(transactions)}  merchants: {args.merchants}")
+    print(f"llm calls: {len(calls)}  seconds: {elapsed:.2f}  rows/sec: {len(transactions) / elapsed:,.0f}")
+    print(f"categories: {categories}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Ingestion benchmark for large CSV exports: whole-file loading
+(extract_expenses_from_file + compute_expense_summary) vs the streaming
+summarizer with the pyarrow and pandas chunked engines.
+
+Each mode runs in a fresh subprocess and reports peak RSS and rows/sec. The
+synthetic statement only uses merchants the keyword rules know, so no model
+is needed and the numbers measure ingestion alone.
+
+Usage:
+    python benchmarks/bench_ingestion.py [--rows 2000000] [--chunk-rows 100000] [--modes full pyarrow pandas]
+"""
+import argparse
+import json
+import os
+import random
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+MERCHANTS = ["SWIGGY", "ZOMATO", "UBER", "OLA CABS", "NETFLIX", "SPOTIFY", "AMAZON", "FLIPKART",
+             "BESCOM ELECTRICITY", "AIRTEL RECHARGE", "APOLLO PHARMACY", "BIGBASKET GROCERY", "HOUSE RENT"]
+
+
+def write_statement(path: str, rows: int, seed: int = 0):
+    rng = random.Random(seed)
+    with open(path, "w") as f:
+        f.write("date,description,amount,balance\n")
+        for i in range(rows):
+            f.write(f"2024-01-{i % 28 + 1:02d},UPI/{rng.randint(10**11, 10**12)}/{rng.choice(MERCHANTS)}/okicici,"
+                    f"{rng.uniform(50, 5000):.2f},{rng.uniform(0, 1e6):.2f}\n")
+
+
+def _peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def run_worker(mode: str, path: str, chunk_rows: int) -> dict:
+    os.environ["FINSMART_EAGER_LOAD"] = "0"
+    baseline_rss = _peak_rss_mb()
+    from expenses_categorizer import extract_expenses_from_file
+    from savings_analysis import compute_expense_summary
+    import ingestion
+    imports_rss = _peak_rss_mb()
+
+    start = time.perf_counter()
+    if mode == "full":
+        summary = compute_expense_summary(extract_expenses_from_file(path))
+        rows = sum(1 for _ in open(path)) - 1
+    else:
+        summary = ingestion.summarize_file(path, chunk_rows, engine=mode)
+        rows = summary["rows"]
+    elapsed = time.perf_counter() - start
+
+    return {
+        "mode": mode,
+        "rows": rows,
+        "seconds": round(elapsed, 2),
+        "rows_per_sec": round(rows / elapsed),
+        "peak_rss_mb": round(_peak_rss_mb(), 1),
+        "rss_over_imports_mb": round(_peak_rss_mb() - max(baseline_rss, imports_rss), 1),
+        "total_expense": round(summary["total_expense"], 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=2_000_000)
+    parser.add_argument("--chunk-rows", type=int, default=100_000)
+    parser.add_argument("--modes", nargs="+", default=["full", "pyarrow", "pandas"])
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    parser.add_argument("--path", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(run_worker(args.worker, args.path, args.chunk_rows)))
+        return
+
+    cols = ["mode", "rows", "seconds", "rows_per_sec", "peak_rss_mb", "rss_over_imports_mb", "total_expense"]
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "statement.csv")
+        write_statement(path, args.rows)
+        print(f"statement: {args.rows:,} rows, {os.path.getsize(path) / (1024 * 1024):.0f} MB")
+        print(" | ".join(cols))
+        for mode in args.modes:
+            proc = subprocess.run(
+                [sys.executable, __file__, "--worker", mode, "--path", path, "--chunk-rows", str(args.chunk_rows)],
+                capture_output=True, text=True
+            )
+            if proc.returncode != 0:
+                print(f"{mode} | failed: {proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else proc.returncode}")
+                continue
+            result = json.loads(proc.stdout.strip().splitlines()[-1])
+            print(" | ".join(str(result[c]) for c in cols))
+
+
+if __name__ == "__main__":
+    main()
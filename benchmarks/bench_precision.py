@@ -0,0 +1,140 @@
+"""
+CPU precision harness: compares fp32, bf16 and dynamic int8 inference.
+
+For each mode it reports model load time, resident memory, decode tokens/sec
+and extraction accuracy on a fixed set of expense narratives. Every mode runs
+in a fresh subprocess so memory numbers are not polluted by the previous one.
+
+Usage:
+    python benchmarks/bench_precision.py [--modes fp32 bf16 int8] [--max-tokens 64]
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+# Fixed narratives with the expenses we expect back as (amount, category)
+NARRATIVES = [
+    ("I spent 300 on a movie ticket and 1200 on groceries.",
+     [(300, "Other"), (1200, "Food")]),
+    ("Paid 15000 rent this month and 2500 for the electricity bill.",
+     [(15000, "Rent"), (2500, "Utilities")]),
+    ("My salary is 60000. I spent 4000 on food, 800 on Netflix and 3000 on petrol.",
+     [(4000, "Food"), (800, "Subscription"), (3000, "Travel")]),
+    ("Bought shoes for 2500 and paid 1800 for a doctor visit.",
+     [(2500, "Shopping"), (1800, "Healthcare")]),
+    ("Paid 10000 as school fees and 600 for the internet bill.",
+     [(10000, "Education"), (600, "Utilities")]),
+    ("Took a cab for 450, spent 700 at a restaurant and 5000 on a flight.",
+     [(450, "Travel"), (700, "Food"), (5000, "Travel")]),
+]
+
+DECODE_PROMPT = "Explain the benefits of a systematic investment plan for a salaried beginner."
+
+
+def _rss_mb() -> float:
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss / (1024 * 1024)
+    except ImportError:
+        # Peak RSS; reported in KB on Linux and bytes on macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def _score(extracted: list, expected: list) -> tuple:
+    """Returns (amounts matched, amount+category matched) against the expected expenses."""
+    found = []
+    for txn in extracted:
+        try:
+            found.append((float(txn.get("amount")), str(txn.get("category", "")).lower()))
+        except (TypeError, ValueError, AttributeError):
+            continue
+
+    amount_hits, exact_hits = 0, 0
+    for amount, category in expected:
+        match = next((f for f in found if f[0] == amount), None)
+        if match is not None:
+            amount_hits += 1
+            exact_hits += match[1] == category.lower()
+            found.remove(match)
+    return amount_hits, exact_hits
+
+
+def run_worker(mode: str, max_tokens: int) -> dict:
+    os.environ["FINSMART_EAGER_LOAD"] = "0"  # Load (and time) it explicitly below
+    import torch
+    import model_loader
+
+    rss_before = _rss_mb()
+    start = time.perf_counter()
+    tokenizer, model, device = model_loader.load_model()  # FINSMART_PRECISION is set by the parent (includes warmup)
+    load_seconds = time.perf_counter() - start
+    rss_after = _rss_mb()
+
+    # Decode throughput (greedy, fixed length so all modes do the same work)
+    inputs = tokenizer(DECODE_PROMPT, return_tensors="pt").to(device)
+    with torch.no_grad():
+        model.generate(**inputs, max_new_tokens=4, do_sample=False)  # warmup
+        start = time.perf_counter()
+        out = model.generate(**inputs, max_new_tokens=max_tokens, min_new_tokens=max_tokens, do_sample=False)
+        decode_seconds = time.perf_counter() - start
+    new_tokens = out.shape[1] - inputs["input_ids"].shape[1]
+
+    # Extraction accuracy through the real extractor
+    from expenses_categorizer import extract_expenses_from_text
+
+    total, amount_hits, exact_hits = 0, 0, 0
+    start = time.perf_counter()
+    for text, expected in NARRATIVES:
+        a, e = _score(extract_expenses_from_text(text), expected)
+        total += len(expected)
+        amount_hits += a
+        exact_hits += e
+    extract_seconds = time.perf_counter() - start
+
+    return {
+        "mode": mode,
+        "device": device,
+        "load_seconds": round(load_seconds, 2),
+        "rss_mb": round(rss_after, 1),
+        "model_rss_mb": round(rss_after - rss_before, 1),
+        "tokens_per_sec": round(new_tokens / decode_seconds, 2),
+        "amount_accuracy": round(amount_hits / total, 3),
+        "category_accuracy": round(exact_hits / total, 3),
+        "extract_seconds": round(extract_seconds, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--modes", nargs="+", default=["fp32", "bf16", "int8"])
+    parser.add_argument("--max-tokens", type=int, default=64)
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        print(json.dumps(run_worker(args.worker, args.max_tokens)))
+        return
+
+    cols = ["mode", "device", "load_seconds", "rss_mb", "model_rss_mb", "tokens_per_sec", "amount_accuracy", "category_accuracy", "extract_seconds"]
+    print(" | ".join(cols))
+    for mode in args.modes:
+        proc = subprocess.run(
+            [sys.executable, __file__, "--worker", mode, "--max-tokens", str(args.max_tokens)],
+            capture_output=True, text=True, env={**os.environ, "FINSMART_PRECISION": mode}
+        )
+        if proc.returncode != 0:
+            print(f"{mode} | failed: {proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else proc.returncode}")
+            continue
+        result = json.loads(proc.stdout.strip().splitlines()[-1])
+        print(" | ".join(str(result[c]) for c in cols))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+"""
+Retrieval benchmark: index build time, query latency and prompt size.
+
+Prompt size compares retrieval with what the app sent before it: tax
+questions carried the fixed FY 2024-25 tax block, general questions no
+context at all. Retrieval is reported for top-1 up to top-k, and for top-k
+within the passage word budget (config.RETRIEVAL_MAX_WORDS), which is what
+the app uses.
+
+Token counts use the configured model's tokenizer (--tokenizer to override);
+if it cannot be loaded, whitespace words are counted instead.
+
+Usage:
+    python benchmarks/bench_retrieval.py [--k 3] [--max-words 100] [--repeats 200] [--embeddings all-MiniLM-L6-v2]
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+import config
+from retrieval import KnowledgeIndex, format_context
+
+QUESTIONS = [
+    "What is the standard deduction in the new regime?",
+    "Which is better for me, old or new tax regime?",
+    "How much can I claim under 80D for my parents?",
+    "Is PPF interest tax free?",
+    "How are debt mutual funds taxed now?",
+    "What is a step-up SIP?",
+    "Should I prepay my home loan or invest?",
+    "How do I improve my CIBIL score?",
+    "How big should my emergency fund be?",
+    "What is the 50/30/20 budgeting rule?",
+    "How much term insurance cover do I need?",
+    "What is the difference between an index fund and an ETF?",
+]
+
+# Questions the app answers through its tax branch (same keywords as answer_general_finance_question)
+TAX_KEYWORDS = ["tax", "slab", "regime", "deduction", "section", "80c", "old", "new"]
+
+# The tax context that used to be pasted into every tax prompt
+OLD_TAX_CONTEXT = """
+        CURRENT INDIAN FINANCIAL FACTS (FY 2024-25):
+        - **New Tax Regime (Default):**
+          - Up to ₹3 Lakh: Nil
+          - ₹3 Lakh - ₹7 Lakh: 5% (Rebate u/s 87A available up to ₹7 Lakh income, so effective tax is 0)
+          - ₹7 Lakh - ₹10 Lakh: 10%
+          - ₹10 Lakh - ₹12 Lakh: 15%
+          - ₹12 Lakh - ₹15 Lakh: 20%
+          - Above ₹15 Lakh: 30%
+        - **Old Tax Regime:** High exemptions but different slabs (0-2.5L Nil, 2.5-5L 5%, 5-10L 20%, >10L 30%).
+        - **Standard Deduction:** ₹75,000 (New Regime proposed FY25).
+"""
+
+
+def token_counter(name: str):
+    try:
+        from transformers import AutoTokenizer
+        tokenizer = AutoTokenizer.from_pretrained(name)
+        return (lambda text: len(tokenizer(text, add_special_tokens=False)["input_ids"])), "tokens"
+    except Exception as e:
+        print(f"(tokenizer unavailable: {e}; counting words)")
+        return (lambda text: len(text.split())), "words"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--k", type=int, default=config.RETRIEVAL_TOP_K)
+    parser.add_argument("--max-words", type=int, default=config.RETRIEVAL_MAX_WORDS)
+    parser.add_argument("--repeats", type=int, default=200)
+    parser.add_argument("--tokenizer", default=config.MODEL_NAME)
+    parser.add_argument("--embeddings", default=None, help="sentence-transformers model for the hybrid index")
+    args = parser.parse_args()
+
+    # ---------- Build ----------
+    builds = []
+    for _ in range(5):
+        builds.append(KnowledgeIndex.from_directory(config.KNOWLEDGE_DIR).build_seconds)
+    index = KnowledgeIndex.from_directory(config.KNOWLEDGE_DIR)
+    print(f"passages: {len(index.passages)}")
+    print(f"BM25 build: {statistics.median(builds) * 1000:.1f} ms (median of 5)")
+    indexes = [("bm25", index)]
+    if args.embeddings:
+        hybrid = KnowledgeIndex.from_directory(config.KNOWLEDGE_DIR, embedding_model=args.embeddings)
+        print(f"BM25 + embeddings build: {hybrid.build_seconds * 1000:.1f} ms")
+        indexes.append(("hybrid", hybrid))
+
+    # ---------- Query latency ----------
+    for name, idx in indexes:
+        latencies = []
+        for _ in range(args.repeats):
+            for q in QUESTIONS:
+                start = time.perf_counter()
+                idx.search(q, args.k)
+                latencies.append((time.perf_counter() - start) * 1e6)
+        latencies.sort()
+        print(f"{name} query latency: p50 {latencies[len(latencies) // 2]:.0f} us, "
+              f"p95 {latencies[int(len(latencies) * 0.95)]:.0f} us")
+
+    # ---------- Prompt size ----------
+    count, unit = token_counter(args.tokenizer)
+    old_tax = count(OLD_TAX_CONTEXT)
+    is_tax = [any(k in q.lower() for k in TAX_KEYWORDS) for q in QUESTIONS]
+    budgeted = [index.search(q, args.k, max_words=args.max_words) for q in QUESTIONS]
+    print(f"\nquestion | branch | top passage | passages | {unit}")
+    for q, tax, passages in zip(QUESTIONS, is_tax, budgeted):
+        print(f"{q} | {'tax' if tax else 'general'} | {passages[0]['title'] if passages else '-'} | "
+              f"{len(passages)} | {count(format_context(passages))}")
+
+    print(f"\nbefore retrieval: tax questions {old_tax} {unit} (fixed tax block), general questions 0")
+    settings = [(f"top-{k}", [index.search(q, k) for q in QUESTIONS]) for k in range(1, args.k + 1)]
+    settings.append((f"top-{args.k} within {args.max_words} words", budgeted))
+    for name, results in settings:
+        sizes = [count(format_context(passages)) for passages in results]
+        tax = statistics.mean(n for n, t in zip(sizes, is_tax) if t)
+        general = statistics.mean(n for n, t in zip(sizes, is_tax) if not t)
+        print(f"{name}: tax questions {tax:.0f} {unit} ({(tax / old_tax - 1) * 100:+.0f}% vs the tax block), "
+              f"general questions +{general:.0f} {unit} over no context")
+
+if __name__ == "__main__":
+    main()
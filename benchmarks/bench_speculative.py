@@ -0,0 +1,93 @@
+"""
+Speculative decoding benchmark for the expense extraction call: plain greedy
+`generate` vs prompt-lookup drafting (and draft-model assisted decoding when
+FINSMART_DRAFT_MODEL is set), on the precision-benchmark narratives.
+
+Greedy speculative decoding must produce exactly the plain output, so every
+run is also checked for identical text.
+
+Usage:
+    python benchmarks/bench_speculative.py [--max-tokens 200] [--lookup-tokens 10] [--repeats 2]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+os.environ.setdefault("FINSMART_EAGER_LOAD", "0")
+
+import torch
+
+import config
+import model_loader
+from expenses_categorizer import EXPENSE_PROMPT_PREFIX, EXPENSE_SCHEMA
+from bench_precision import NARRATIVES
+
+
+def _prompt(text: str) -> str:
+    return EXPENSE_PROMPT_PREFIX + f"""
+    Text:
+    "{text}"
+    """
+
+
+def run(mode: str, max_tokens: int, repeats: int) -> dict:
+    tokenizer, model, device = model_loader.load_model()
+    extra = {}
+    if mode == "prompt_lookup":
+        extra = {"prompt_lookup_num_tokens": config.PROMPT_LOOKUP_TOKENS}
+    elif mode == "draft_model":
+        extra = {"assistant_model": model_loader.load_draft_model()}
+
+    outputs, new_tokens, elapsed = [], 0, 0.0
+    for text, _ in NARRATIVES:
+        input_ids = tokenizer(_prompt(text), return_tensors="pt")["input_ids"].to(device)
+        for _ in range(repeats):
+            start = time.perf_counter()
+            with torch.no_grad():
+                out = model.generate(
+                    input_ids=input_ids,
+                    attention_mask=torch.ones_like(input_ids),
+                    max_new_tokens=max_tokens,
+                    do_sample=False,
+                    **model_loader._constraint_kwargs(EXPENSE_SCHEMA),
+                    **extra
+                )
+            elapsed += time.perf_counter() - start
+            new_tokens += out.shape[1] - input_ids.shape[1]
+        outputs.append(tokenizer.decode(out[0][input_ids.shape[1]:], skip_special_tokens=True))
+
+    return {
+        "mode": mode,
+        "seconds": round(elapsed, 2),
+        "new_tokens": new_tokens,
+        "tokens_per_sec": round(new_tokens / elapsed, 2),
+        "outputs": outputs,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--max-tokens", type=int, default=200)
+    parser.add_argument("--lookup-tokens", type=int, default=config.PROMPT_LOOKUP_TOKENS)
+    parser.add_argument("--repeats", type=int, default=2)
+    args = parser.parse_args()
+    config.PROMPT_LOOKUP_TOKENS = args.lookup_tokens
+
+    model_loader.load_model()  # Load + warmup outside the timings
+    modes = ["plain", "prompt_lookup"] + (["draft_model"] if config.DRAFT_MODEL_NAME else [])
+
+    baseline = None
+    print("mode | seconds | new_tokens | tokens_per_sec | speedup | identical_output")
+    for mode in modes:
+        result = run(mode, args.max_tokens, args.repeats)
+        if baseline is None:
+            baseline = result
+        speedup = result["tokens_per_sec"] / baseline["tokens_per_sec"]
+        identical = result["outputs"] == baseline["outputs"]
+        print(f"{mode} | {result['seconds']} | {result['new_tokens']} | {result['tokens_per_sec']} | {speedup:.2f}x | {identical}")
+
+
+if __name__ == "__main__":
+    main()
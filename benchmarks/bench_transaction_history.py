@@ -0,0 +1,95 @@
+"""
+Transaction history check and timing: what a repeat analysis reads back.
+
+Runs the savings stage the router uses (savings_analysis_for_user) against a
+temporary store:
+  1. a first analysis, with nothing stored yet, covers only itself;
+  2. with earlier months stored, a new analysis averages over all of them;
+  3. analyzing the same month again replaces it instead of counting it twice.
+Then times the history read (partition-pruned Parquet scans) for a store
+holding `--months` months of `--rows` transactions each.
+
+No model is needed: income is passed in, as the extraction stage does.
+
+Usage:
+    python benchmarks/bench_transaction_history.py [--months 24] [--rows 2000] [--repeats 20]
+"""
+import argparse
+import datetime
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from savings_analysis import savings_analysis_for_user, savings_analysis_from_history
+from transaction_store import TransactionStore
+
+INCOME = 80000
+THIS_MONTH = [
+    {"description": "rent", "amount": 20000, "category": "Rent"},
+    {"description": "swiggy", "amount": 5000, "category": "Food"},
+]
+CATEGORIES = ["Food", "Rent", "Travel", "Shopping", "Utilities"]
+
+
+def month_start(months_ago: int) -> datetime.date:
+    today = datetime.date.today()
+    index = today.year * 12 + today.month - 1 - months_ago
+    return datetime.date(index // 12, index % 12 + 1, 1)
+
+
+def check(root: str):
+    store = TransactionStore(root)
+    first = savings_analysis_for_user(THIS_MONTH, "", "check", income=INCOME, store=store)
+    assert "months_covered" not in first and first["total_expenses"] == 25000, first
+
+    store.append("check", [{"description": "rent", "amount": 20000, "category": "Rent"},
+                           {"description": "uber", "amount": 15000, "category": "Travel"}], when=month_start(1))
+    second = savings_analysis_for_user(THIS_MONTH, "", "check", income=INCOME, store=store)
+    assert len(second["months_covered"]) == 2, second
+    # (25000 this month + 35000 last month) / 2
+    assert second["total_expenses"] == 30000, second
+
+    again = savings_analysis_for_user(THIS_MONTH, "", "check", income=INCOME, store=store)
+    assert again["total_expenses"] == second["total_expenses"], again
+    print(f"check: first analysis {first['total_expenses']:,.0f}/month, "
+          f"second reads {len(second['months_covered'])} stored months ({second['total_expenses']:,.0f}/month), "
+          f"re-analysis replaces the month ({again['total_expenses']:,.0f}/month)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--months", type=int, default=24)
+    parser.add_argument("--rows", type=int, default=2000, help="transactions per month")
+    parser.add_argument("--repeats", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as root:
+        check(root)
+
+        store = TransactionStore(root)
+        rng = random.Random(0)
+        start = time.perf_counter()
+        for months_ago in range(args.months):
+            store.append("bench", [
+                {"description": f"merchant {i % 50}", "amount": round(rng.uniform(50, 5000), 2),
+                 "category": rng.choice(CATEGORIES)}
+                for i in range(args.rows)
+            ], when=month_start(months_ago))
+        print(f"stored {args.months} months x {args.rows} rows in {time.perf_counter() - start:.2f} s")
+
+        latencies = []
+        for _ in range(args.repeats):
+            start = time.perf_counter()
+            result = savings_analysis_from_history("bench", INCOME, store=store)
+            latencies.append((time.perf_counter() - start) * 1000)
+        print(f"history analysis over {len(result['months_covered'])} months: "
+              f"median {statistics.median(latencies):.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
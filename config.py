@@ -0,0 +1,127 @@
+"""
+Runtime settings for FinSmart AI.
+
+Every value can be overridden with an environment variable so the same code
+runs on a laptop, a CPU-only app server or behind a load balancer.
+"""
+import os
+
+
+def _env_flag(name: str, default: bool = False) -> bool:
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+def _env_int(name: str, default: int) -> int:
+    try:
+        return int(os.getenv(name, default))
+    except ValueError:
+        return default
+
+
+def _env_float(name: str, default: float) -> float:
+    try:
+        return float(os.getenv(name, default))
+    except ValueError:
+        return default
+
+
+# ---------- Model ----------
+MODEL_NAME = os.getenv("FINSMART_MODEL_NAME", "Shiva-k22/gemma-FinAI")
+# Start loading the model in a background thread when model_loader is imported
+EAGER_LOAD = _env_flag("FINSMART_EAGER_LOAD", True)
+
+# ---------- Shared model server ----------
+# When set (http://127.0.0.1:8765 or unix:///tmp/finsmart.sock), call_llm and
+# stream_llm forward to a running `python model_server.py` instead of loading
+# a model copy in every app process.
+MODEL_SERVER_URL = os.getenv("FINSMART_MODEL_SERVER") or None
+
+# ---------- Continuous batching ----------
+# When enabled, call_llm() hands prompts to a shared scheduler that batches
+# generations from all Streamlit sessions instead of running one at a time.
+ENABLE_BATCHING = _env_flag("FINSMART_BATCHING")
+MAX_BATCH_SIZE = _env_int("FINSMART_MAX_BATCH_SIZE", 8)
+
+# ---------- Speculative decoding ----------
+# call_llm(speculative=True) drafts tokens and verifies them in one forward pass.
+# Drafts come from a small local model if one is configured, otherwise from
+# n-gram lookup in the prompt (good for extraction, which copies input spans).
+DRAFT_MODEL_NAME = os.getenv("FINSMART_DRAFT_MODEL") or None
+PROMPT_LOOKUP_TOKENS = _env_int("FINSMART_PROMPT_LOOKUP_TOKENS", 10)
+
+# ---------- Prefix KV cache ----------
+# Memory budget for the cached past_key_values of registered prompt preambles
+PREFIX_CACHE_MB = _env_int("FINSMART_PREFIX_CACHE_MB", 512)
+
+# ---------- CPU precision ----------
+# fp32 | bf16 | int8 (dynamic quantization). Ignored on CUDA/MPS, which use fp16.
+PRECISION = os.getenv("FINSMART_PRECISION", "fp32").strip().lower()
+
+# ---------- File categorization ----------
+# Distinct statement descriptions sent to the model per packed prompt
+FILE_CATEGORIZE_BATCH_SIZE = _env_int("FINSMART_FILE_CATEGORIZE_BATCH_SIZE", 25)
+
+# ---------- Bundled data ----------
+PROJECT_DIR = os.path.dirname(os.path.abspath(__file__))
+BUNDLED_DATA_DIR = os.path.join(PROJECT_DIR, "data")
+
+# ---------- Local data ----------
+# Where FinSmart keeps caches and other local state
+DATA_DIR = os.path.expanduser(os.getenv("FINSMART_DATA_DIR", "~/.finsmart"))
+
+# ---------- Transaction store ----------
+# Parquet history of categorized transactions, partitioned by user and month
+TRANSACTION_STORE_DIR = os.getenv("FINSMART_TRANSACTION_STORE", os.path.join(DATA_DIR, "transactions"))
+# Analyses store their transactions under this user, and once earlier months are
+# stored the savings figures are monthly averages over the history
+TRANSACTION_HISTORY_ENABLED = _env_flag("FINSMART_TRANSACTION_HISTORY", True)
+TRANSACTION_USER_ID = os.getenv("FINSMART_USER_ID", "local")
+# Months of history the savings analysis looks back over
+TRANSACTION_HISTORY_MONTHS = _env_int("FINSMART_HISTORY_MONTHS", 12)
+
+# ---------- Merchant memo ----------
+# Merchant -> category answers learned from past extractions and user corrections
+MERCHANT_MEMO_ENABLED = _env_flag("FINSMART_MERCHANT_MEMO", True)
+MERCHANT_MEMO_PATH = os.getenv("FINSMART_MERCHANT_MEMO_PATH", os.path.join(DATA_DIR, "merchants.sqlite3"))
+MERCHANT_MEMO_MAX_ENTRIES = _env_int("FINSMART_MERCHANT_MEMO_MAX_ENTRIES", 50000)
+
+# ---------- Response cache ----------
+# Greedy (deterministic) call_llm answers are cached in memory and in SQLite
+RESPONSE_CACHE_ENABLED = _env_flag("FINSMART_RESPONSE_CACHE", True)
+RESPONSE_CACHE_PATH = os.getenv("FINSMART_RESPONSE_CACHE_PATH", os.path.join(DATA_DIR, "responses.sqlite3"))
+RESPONSE_CACHE_MEMORY_ENTRIES = _env_int("FINSMART_RESPONSE_CACHE_MEMORY_ENTRIES", 256)
+RESPONSE_CACHE_DISK_ENTRIES = _env_int("FINSMART_RESPONSE_CACHE_DISK_ENTRIES", 5000)
+RESPONSE_CACHE_TTL_SECONDS = _env_int("FINSMART_RESPONSE_CACHE_TTL_SECONDS", 7 * 24 * 3600)
+
+# ---------- Rule-based fast path ----------
+# Narratives parsed with at least this confidence skip the LLM entirely
+FAST_PATH_MIN_CONFIDENCE = _env_float("FINSMART_FAST_PATH_MIN_CONFIDENCE", 0.8)
+
+# ---------- Intent classifier ----------
+# Local classifier consulted before the LLM when the keyword heuristics are unsure
+INTENT_EXAMPLES_PATH = os.getenv("FINSMART_INTENT_EXAMPLES", os.path.join(BUNDLED_DATA_DIR, "intent_examples.jsonl"))
+INTENT_MODEL_PATH = os.getenv("FINSMART_INTENT_MODEL", os.path.join(BUNDLED_DATA_DIR, "intent_model.json"))
+# Predictions below this confidence go to the LLM
+INTENT_MIN_CONFIDENCE = _env_float("FINSMART_INTENT_MIN_CONFIDENCE", 0.7)
+
+# ---------- Portfolio projections ----------
+# Per-asset-class return/volatility assumptions for the Monte Carlo projections
+RETURN_ASSUMPTIONS_PATH = os.getenv("FINSMART_RETURN_ASSUMPTIONS", os.path.join(BUNDLED_DATA_DIR, "return_assumptions.json"))
+MONTE_CARLO_PATHS = _env_int("FINSMART_MONTE_CARLO_PATHS", 100000)
+MONTE_CARLO_YEARS = _env_int("FINSMART_MONTE_CARLO_YEARS", 10)
+# Processes to spread paths over (1 = simulate in-process)
+MONTE_CARLO_WORKERS = _env_int("FINSMART_MONTE_CARLO_WORKERS", 1)
+
+# ---------- Knowledge retrieval ----------
+# Finance / tax notes retrieved into general and tax prompts
+KNOWLEDGE_DIR = os.getenv("FINSMART_KNOWLEDGE_DIR", os.path.join(BUNDLED_DATA_DIR, "knowledge"))
+RETRIEVAL_TOP_K = _env_int("FINSMART_RETRIEVAL_TOP_K", 3)
+# Passages after the best one are added only while the context stays within this
+# many words. Tax prompts used to carry a fixed ~90-word block and general prompts
+# none, so the budget keeps retrieval at about the old tax prompt's size.
+RETRIEVAL_MAX_WORDS = _env_int("FINSMART_RETRIEVAL_MAX_WORDS", 100)
+# Optional local sentence-transformers model fused with BM25 (unset = BM25 only)
+RETRIEVAL_EMBEDDING_MODEL = os.getenv("FINSMART_RETRIEVAL_EMBEDDINGS") or None
@@ -0,0 +1,346 @@
+"""
+Continuous-batching request queue for the FinSmart LLM.
+
+All Streamlit sessions share one model. Instead of every session running its
+own `model.generate` on a batch of one, prompts are pushed onto a queue and a
+single scheduler thread decodes them together:
+
+- Newly queued prompts are prefilled as one left-padded batch.
+- Every decode step runs the whole active batch through the model once.
+- Finished sequences leave the batch and waiting ones join between steps,
+  so a long answer never holds up a short one.
+
+The active batch shares one left-padded KV cache that the decode steps extend
+in place. It is only rebuilt when requests join (their prefilled caches are
+padded onto it) and only sliced when requests leave.
+"""
+import queue
+import threading
+import time
+
+import torch
+from transformers import DynamicCache
+
+
+def cache_to_layers(cache) -> list:
+    """Returns the cache as a list of (key, value) tensors, one pair per layer."""
+    if isinstance(cache, (tuple, list)):
+        return [(k, v) for k, v in cache]
+    if hasattr(cache, "layers"):
+        return [(layer.keys, layer.values) for layer in cache.layers]
+    return list(zip(cache.key_cache, cache.value_cache))
+
+
+def layers_to_cache(layers: list):
+    """Builds a DynamicCache from (key, value) tensors (works across transformers versions)."""
+    if hasattr(DynamicCache, "from_legacy_cache"):
+        return DynamicCache.from_legacy_cache(tuple(layers))
+    return DynamicCache(tuple(layers))
+
+
+def sample_next_token(scores: torch.Tensor, temperature: float, top_p: float = 0.95, do_sample: bool = True) -> int:
+    """
+    Picks the next token id from a (1, vocab) score row.
+    Mirrors `generate(do_sample=..., temperature=..., top_p=...)`.
+    """
+    if not do_sample or temperature <= 0:
+        return int(torch.argmax(scores, dim=-1)[0])
+
+    probs = torch.softmax(scores.float() / temperature, dim=-1)
+    if top_p < 1.0:
+        sorted_probs, sorted_ids = torch.sort(probs, descending=True)
+        cumulative = torch.cumsum(sorted_probs, dim=-1)
+        # Keep the smallest set of tokens whose mass reaches top_p (always at least one)
+        sorted_probs[(cumulative - sorted_probs) > top_p] = 0.0
+        choice = torch.multinomial(sorted_probs / sorted_probs.sum(), 1)
+        return int(sorted_ids.gather(-1, choice)[0])
+    return int(torch.multinomial(probs, 1)[0])
+
+
+class GenerationRequest:
+    """One queued prompt and its decoding state."""
+
+    def __init__(
+        self,
+        input_ids: torch.Tensor,
+        max_new_tokens: int,
+        temperature: float,
+        top_p: float = 0.95,
+        do_sample: bool = True,
+        logits_processor=None,
+        stopping_criteria=None,
+        streamer=None,
+        prefix_layers=None,
+    ):
+        self.input_ids = input_ids  # (1, prompt_len) on the model device
+        self.prefix_layers = prefix_layers  # cached KV for the first tokens of input_ids, if any
+        self.max_new_tokens = max_new_tokens
+        self.temperature = temperature
+        self.top_p = top_p
+        self.do_sample = do_sample
+        self.logits_processor = logits_processor
+        self.stopping_criteria = stopping_criteria
+        self.streamer = streamer
+
+        self.generated = []
+        self.last_scores = None
+        self.layers = None  # KV cache from prefill, until it is merged into the batch cache
+        self.cache_len = 0  # tokens in this request's KV cache
+        self.error = None
+        self.submitted_at = time.perf_counter()
+        self.finished_at = None
+        self._done = threading.Event()
+
+    def all_ids(self) -> torch.Tensor:
+        if not self.generated:
+            return self.input_ids
+        new = torch.tensor([self.generated], dtype=self.input_ids.dtype, device=self.input_ids.device)
+        return torch.cat([self.input_ids, new], dim=1)
+
+    def wait(self, timeout: float = None) -> list:
+        """Blocks until the request is finished and returns the generated token ids."""
+        if not self._done.wait(timeout):
+            raise TimeoutError("Generation request timed out.")
+        if self.error is not None:
+            raise self.error
+        return self.generated
+
+    def finish(self, error: Exception = None):
+        self.error = error
+        self.finished_at = time.perf_counter()
+        if self.streamer is not None:
+            self.streamer.end()
+        self._done.set()
+
+
+class BatchScheduler:
+    """
+    Owns the model on a background thread and serves queued requests
+    with iteration-level (continuous) batching.
+    """
+
+    def __init__(self, model, tokenizer, device: str, max_batch_size: int = 8):
+        self.model = model
+        self.tokenizer = tokenizer
+        self.device = device
+        self.max_batch_size = max(1, max_batch_size)
+
+        eos = model.generation_config.eos_token_id
+        if eos is None:
+            eos = tokenizer.eos_token_id
+        self.eos_token_ids = set(eos if isinstance(eos, (list, tuple)) else [eos])
+        self.pad_token_id = tokenizer.pad_token_id if tokenizer.pad_token_id is not None else next(iter(self.eos_token_ids))
+
+        self._queue = queue.Queue()
+        # Requests being decoded. The first rows of the batch cache belong to the first
+        # requests here, in order; newly prefilled requests at the end still hold `layers`.
+        self._active = []
+        self._cache = None      # batched KV cache: (rows, heads, cache_length, head_dim) per layer
+        self._cache_length = 0
+        self._pads = None       # left padding of each cache row
+        self._thread = threading.Thread(target=self._run, name="finsmart-batch-scheduler", daemon=True)
+        self._thread.start()
+
+    # ---------- Public API ----------
+
+    def submit(self, input_ids: torch.Tensor, max_new_tokens: int = 500, temperature: float = 0.1, **kwargs) -> GenerationRequest:
+        request = GenerationRequest(input_ids.to(self.device), max_new_tokens, temperature, **kwargs)
+        if request.streamer is not None:
+            request.streamer.put(request.input_ids.cpu())
+        self._queue.put(request)
+        return request
+
+    def generate(self, input_ids: torch.Tensor, max_new_tokens: int = 500, temperature: float = 0.1, **kwargs) -> list:
+        """Blocking helper: queue a prompt and return its generated token ids."""
+        return self.submit(input_ids, max_new_tokens, temperature, **kwargs).wait()
+
+    def queue_depth(self) -> dict:
+        return {"waiting": self._queue.qsize(), "active": len(self._active)}
+
+    # ---------- Scheduler loop ----------
+
+    def _run(self):
+        while True:
+            admitted = self._admit()
+            try:
+                if admitted:
+                    self._prefill(admitted)
+                    self._active.extend(admitted)
+                    self._retire()
+                if self._active:
+                    self._decode_step()
+                    self._retire()
+            except Exception as e:  # Fail the affected requests, keep serving new ones
+                print(f"Batch scheduler error: {e}")
+                for request in admitted + self._active:
+                    if not request._done.is_set():
+                        request.finish(e)
+                self._active = []
+                self._drop_rows([])
+
+    def _admit(self) -> list:
+        """Pulls waiting requests into free batch slots. Blocks while idle."""
+        admitted = []
+        if not self._active:
+            admitted.append(self._queue.get())
+        while len(self._active) + len(admitted) < self.max_batch_size:
+            try:
+                admitted.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return admitted
+
+    def _prefill(self, requests: list):
+        """Prefills newly admitted requests; those with a cached prompt prefix only prefill their suffix."""
+        fresh = [r for r in requests if r.prefix_layers is None]
+        if fresh:
+            self._prefill_batch(fresh)
+        for r in requests:
+            if r.prefix_layers is not None:
+                self._prefill_from_prefix(r)
+
+    @torch.no_grad()
+    def _prefill_from_prefix(self, request: GenerationRequest):
+        prefix_len = request.prefix_layers[0][0].shape[2]
+        total_len = request.input_ids.shape[1]
+        out = self.model(
+            input_ids=request.input_ids[:, prefix_len:],
+            attention_mask=torch.ones((1, total_len), dtype=torch.long, device=self.device),
+            position_ids=torch.arange(prefix_len, total_len, device=self.device).unsqueeze(0),
+            past_key_values=layers_to_cache(request.prefix_layers),
+            use_cache=True,
+        )
+        request.layers = cache_to_layers(out.past_key_values)
+        request.cache_len = total_len
+        request.prefix_layers = None
+        self._accept(request, out.logits[:, -1, :])
+
+    @torch.no_grad()
+    def _prefill_batch(self, requests: list):
+        """Runs the prompts of newly admitted requests as one left-padded batch."""
+        lengths = [r.input_ids.shape[1] for r in requests]
+        max_len = max(lengths)
+
+        input_ids = torch.full((len(requests), max_len), self.pad_token_id, dtype=torch.long, device=self.device)
+        attention_mask = torch.zeros((len(requests), max_len), dtype=torch.long, device=self.device)
+        for i, r in enumerate(requests):
+            input_ids[i, max_len - lengths[i]:] = r.input_ids[0]
+            attention_mask[i, max_len - lengths[i]:] = 1
+        position_ids = (attention_mask.cumsum(-1) - 1).clamp(min=0)
+
+        out = self.model(
+            input_ids=input_ids,
+            attention_mask=attention_mask,
+            position_ids=position_ids,
+            use_cache=True,
+        )
+        layers = cache_to_layers(out.past_key_values)
+        for i, r in enumerate(requests):
+            pad = max_len - lengths[i]
+            r.layers = [(k[i:i + 1, :, pad:, :], v[i:i + 1, :, pad:, :]) for k, v in layers]
+            r.cache_len = lengths[i]
+            self._accept(r, out.logits[i:i + 1, -1, :])
+
+    @torch.no_grad()
+    def _decode_step(self):
+        """Advances every active request by one token in a single forward pass."""
+        batch = self._active
+        if any(r.layers is not None for r in batch):
+            self._merge_new_requests()
+
+        positions = torch.arange(self._cache_length + 1, device=self.device)
+        attention_mask = (positions.unsqueeze(0) >= self._pads.unsqueeze(1)).long()
+        input_ids = torch.tensor([[r.generated[-1]] for r in batch], dtype=torch.long, device=self.device)
+        position_ids = torch.tensor([[r.cache_len] for r in batch], dtype=torch.long, device=self.device)
+
+        out = self.model(
+            input_ids=input_ids,
+            attention_mask=attention_mask,
+            position_ids=position_ids,
+            past_key_values=self._cache,
+            use_cache=True,
+        )
+        # The model appended this step's keys/values to the batch cache
+        self._cache = out.past_key_values
+        self._cache_length += 1
+        for i, r in enumerate(batch):
+            r.cache_len += 1
+            self._accept(r, out.logits[i:i + 1, -1, :])
+
+    def _merge_new_requests(self):
+        """Left-pads the batch cache and the newly prefilled caches to one length and stacks them."""
+        rows = 0 if self._cache is None else self._pads.shape[0]
+        new = self._active[rows:]
+        length = max([self._cache_length] + [r.cache_len for r in new])
+        old_layers = cache_to_layers(self._cache) if self._cache is not None else None
+
+        def left_pad(t, pad):
+            return torch.nn.functional.pad(t, (0, 0, pad, 0)) if pad else t
+
+        stacked = []
+        for layer in range(len(new[0].layers)):
+            keys, values = [], []
+            if old_layers is not None:
+                k, v = old_layers[layer]
+                keys.append(left_pad(k, length - self._cache_length))
+                values.append(left_pad(v, length - self._cache_length))
+            for r in new:
+                k, v = r.layers[layer]
+                keys.append(left_pad(k, length - r.cache_len))
+                values.append(left_pad(v, length - r.cache_len))
+            stacked.append((torch.cat(keys, dim=0), torch.cat(values, dim=0)))
+
+        pads = [] if self._pads is None else [self._pads + (length - self._cache_length)]
+        pads.append(torch.tensor([length - r.cache_len for r in new], dtype=torch.long, device=self.device))
+        self._pads = torch.cat(pads)
+        self._cache = layers_to_cache(stacked)
+        self._cache_length = length
+        for r in new:
+            r.layers = None
+
+    def _drop_rows(self, keep: list):
+        """Keeps only the `keep` rows of the batch cache, trimming padding no row needs any more."""
+        if not keep:
+            self._cache, self._pads, self._cache_length = None, None, 0
+            return
+        index = torch.tensor(keep, dtype=torch.long, device=self.device)
+        pads = self._pads.index_select(0, index)
+        trim = int(pads.min())
+        self._cache = layers_to_cache([
+            (k.index_select(0, index)[:, :, trim:, :], v.index_select(0, index)[:, :, trim:, :])
+            for k, v in cache_to_layers(self._cache)
+        ])
+        self._pads = pads - trim
+        self._cache_length -= trim
+
+    def _accept(self, request: GenerationRequest, scores: torch.Tensor):
+        """Applies the request's logits processors, samples and records one token."""
+        if request.logits_processor is not None:
+            scores = request.logits_processor(request.all_ids(), scores)
+        token = sample_next_token(scores, request.temperature, request.top_p, request.do_sample)
+        request.generated.append(token)
+        request.last_scores = scores
+        if request.streamer is not None:
+            request.streamer.put(torch.tensor([token]))
+
+    def _retire(self):
+        """Removes finished sequences from the batch and wakes their callers."""
+        rows = 0 if self._cache is None else self._pads.shape[0]
+        still_active, keep_rows = [], []
+        for i, r in enumerate(self._active):
+            finished = (
+                r.generated[-1] in self.eos_token_ids
+                or len(r.generated) >= r.max_new_tokens
+            )
+            if not finished and r.stopping_criteria is not None:
+                finished = bool(torch.as_tensor(r.stopping_criteria(r.all_ids(), r.last_scores)).any())
+            if finished:
+                r.layers = None
+                r.finish()
+            else:
+                still_active.append(r)
+                if i < rows:
+                    keep_rows.append(i)
+        if len(keep_rows) < rows:
+            self._drop_rows(keep_rows)
+        self._active = still_active
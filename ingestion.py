@@ -0,0 +1,134 @@
+"""
+Streaming, memory-bounded ingestion for large bank exports.
+
+`extract_expenses_from_file` materializes the whole statement as a DataFrame
+and then as a list of dicts. For multi-year exports this module reads the CSV
+in chunks instead (pyarrow's streaming CSV reader when available, pandas
+chunked reads otherwise), categorizes each chunk against a merchant mapping
+that persists across chunks, and folds category totals as it goes. Peak
+memory is bounded by the chunk size plus the number of distinct merchants.
+
+    summary = summarize_file("statement.csv")        # compute_expense_summary-shaped
+    for txn in iter_transactions("statement.csv"):   # one dict at a time
+        ...
+
+Rows whose amount cannot be read (blank, "N/A", ...) are skipped; each chunk
+records how many in `chunk.attrs["dropped_rows"]`, and the totals are
+reported (and returned by summarize_file).
+"""
+import pandas as pd
+
+from expenses_categorizer import normalize_descriptions, categorize_descriptions, clean_amounts
+
+try:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+except ImportError:  # pandas chunked reads are the fallback
+    pa = None
+    pa_csv = None
+
+DEFAULT_CHUNK_ROWS = 100_000
+COLUMNS = ["description", "amount"]
+# pyarrow sizes its batches in bytes; bank export rows are typically well under this
+_BYTES_PER_ROW = 96
+
+
+def iter_chunks(file_path: str, chunk_rows: int = DEFAULT_CHUNK_ROWS, engine: str = "auto"):
+    """
+    Yields DataFrames with `description` (str) and `amount` (float) columns.
+    Rows without a readable amount are dropped and counted in attrs["dropped_rows"].
+    engine: "auto" (pyarrow if installed), "pyarrow" or "pandas".
+    Excel files have no streaming reader, so they are read whole and then sliced.
+    """
+    if not file_path.endswith(".csv"):
+        df = pd.read_excel(file_path, usecols=COLUMNS)
+        for start in range(0, len(df), chunk_rows):
+            yield _clean_chunk(df.iloc[start:start + chunk_rows])
+        return
+
+    if engine == "pyarrow" or (engine == "auto" and pa_csv is not None):
+        yield from _arrow_chunks(file_path, chunk_rows)
+    else:
+        # Amounts are read as text: exports often contain "1,200.00" or blanks
+        for chunk in pd.read_csv(file_path, usecols=COLUMNS, dtype=str, chunksize=chunk_rows):
+            yield _clean_chunk(chunk)
+
+
+def _arrow_chunks(file_path: str, chunk_rows: int):
+    reader = pa_csv.open_csv(
+        file_path,
+        read_options=pa_csv.ReadOptions(block_size=max(1 << 20, chunk_rows * _BYTES_PER_ROW)),
+        convert_options=pa_csv.ConvertOptions(
+            include_columns=COLUMNS,
+            column_types={name: pa.string() for name in COLUMNS}
+        )
+    )
+    for batch in reader:
+        yield _clean_chunk(batch.to_pandas())
+
+
+def _clean_chunk(chunk: pd.DataFrame) -> pd.DataFrame:
+    chunk = pd.DataFrame({
+        "description": chunk["description"].fillna("").astype(str),
+        "amount": clean_amounts(chunk["amount"])
+    })
+    cleaned = chunk.dropna(subset=["amount"])
+    cleaned.attrs["dropped_rows"] = len(chunk) - len(cleaned)
+    return cleaned
+
+
+def _report_dropped(file_path: str, dropped: int):
+    if dropped:
+        print(f"Ingestion: skipped {dropped} rows of {file_path} with no readable amount")
+
+
+class ChunkCategorizer:
+    """Categorizes chunks, remembering every merchant seen so each is categorized only once."""
+
+    def __init__(self):
+        self.mapping = {}
+
+    def categorize(self, chunk: pd.DataFrame) -> pd.Series:
+        normalized = normalize_descriptions(chunk["description"])
+        new = [d for d in normalized.unique() if d not in self.mapping]
+        if new:
+            self.mapping.update(categorize_descriptions(new))
+        return normalized.map(self.mapping).fillna("Other")
+
+
+def iter_transactions(file_path: str, chunk_rows: int = DEFAULT_CHUNK_ROWS, engine: str = "auto"):
+    """Yields {description, amount, category} dicts, holding at most one chunk in memory."""
+    categorizer = ChunkCategorizer()
+    dropped = 0
+    for chunk in iter_chunks(file_path, chunk_rows, engine):
+        dropped += chunk.attrs.get("dropped_rows", 0)
+        categories = categorizer.categorize(chunk)
+        for description, amount, category in zip(chunk["description"], chunk["amount"], categories):
+            yield {"description": description, "amount": float(amount), "category": category}
+    _report_dropped(file_path, dropped)
+
+
+def summarize_file(file_path: str, chunk_rows: int = DEFAULT_CHUNK_ROWS, engine: str = "auto") -> dict:
+    """
+    Same shape as compute_expense_summary ({total_expense, category_breakdown}),
+    plus `rows`, `dropped_rows` and `distinct_descriptions`, computed one chunk at a time.
+    """
+    categorizer = ChunkCategorizer()
+    totals = {}
+    rows = 0
+    dropped = 0
+    for chunk in iter_chunks(file_path, chunk_rows, engine):
+        dropped += chunk.attrs.get("dropped_rows", 0)
+        partial = chunk["amount"].groupby(categorizer.categorize(chunk)).sum()
+        for category, amount in partial.items():
+            totals[category] = totals.get(category, 0) + float(amount)
+        rows += len(chunk)
+    _report_dropped(file_path, dropped)
+
+    return {
+        "total_expense": sum(totals.values()),
+        "category_breakdown": totals,
+        "rows": rows,
+        "dropped_rows": dropped,
+        "distinct_descriptions": len(categorizer.mapping)
+    }
@@ -0,0 +1,145 @@
+"""
+Lightweight local intent classifier for detect_user_intent.
+
+Hashed word/character n-gram features with a multinomial logistic regression,
+in pure Python: a prediction takes microseconds instead of an LLM generation.
+The model is trained from data/intent_examples.jsonl by
+`python train_intent_classifier.py` and stored as JSON in data/intent_model.json.
+"""
+import json
+import math
+import os
+import random
+import re
+import threading
+import zlib
+
+import config
+
+DEFAULT_DIM = 2 ** 16
+
+_TOKEN = re.compile(r"[a-z]+|\d+(?:[.,]\d+)*|[₹$€£%]")
+
+
+class IntentClassifier:
+    def __init__(self, labels: list, dim: int = DEFAULT_DIM, weights: list = None, bias: list = None):
+        self.labels = list(labels)
+        self.dim = dim
+        # Sparse weights: one {feature index: weight} dict per label
+        self.weights = weights or [{} for _ in self.labels]
+        self.bias = bias or [0.0] * len(self.labels)
+
+    # ---------- Features ----------
+
+    def features(self, text: str) -> dict:
+        """L2-normalized hashed counts of word unigrams/bigrams and character trigrams."""
+        tokens = ["<num>" if t[0].isdigit() else t for t in _TOKEN.findall(text.lower())]
+        grams = [f"w:{t}" for t in tokens]
+        grams += [f"b:{a} {b}" for a, b in zip(tokens, tokens[1:])]
+        for t in tokens:
+            padded = f"^{t}$"
+            grams += [f"c:{padded[i:i + 3]}" for i in range(len(padded) - 2)]
+        if not tokens:
+            grams.append("<empty>")
+
+        counts = {}
+        for g in grams:
+            idx = zlib.crc32(g.encode("utf-8")) % self.dim
+            counts[idx] = counts.get(idx, 0.0) + 1.0
+        norm = math.sqrt(sum(v * v for v in counts.values()))
+        return {k: v / norm for k, v in counts.items()}
+
+    # ---------- Inference ----------
+
+    def predict_proba(self, text: str) -> dict:
+        return dict(zip(self.labels, self._probs(self.features(text))))
+
+    def predict(self, text: str) -> tuple:
+        """Returns (label, confidence), confidence being the softmax probability of the label."""
+        probs = self._probs(self.features(text))
+        best = max(range(len(probs)), key=probs.__getitem__)
+        return self.labels[best], probs[best]
+
+    def _probs(self, feats: dict) -> list:
+        scores = [
+            b + sum(w.get(k, 0.0) * v for k, v in feats.items())
+            for w, b in zip(self.weights, self.bias)
+        ]
+        top = max(scores)
+        exps = [math.exp(s - top) for s in scores]
+        total = sum(exps)
+        return [e / total for e in exps]
+
+    # ---------- Training ----------
+
+    def fit(self, examples: list, epochs: int = 40, lr: float = 0.5, l2: float = 1e-4, seed: int = 0) -> "IntentClassifier":
+        """Plain SGD on the cross-entropy loss over (text, label) pairs."""
+        data = [(self.features(text), self.labels.index(label)) for text, label in examples]
+        rng = random.Random(seed)
+        for epoch in range(epochs):
+            rng.shuffle(data)
+            step = lr / (1 + 0.1 * epoch)
+            for feats, target in data:
+                probs = self._probs(feats)
+                for c, p in enumerate(probs):
+                    grad = p - (1.0 if c == target else 0.0)
+                    w = self.weights[c]
+                    for k, v in feats.items():
+                        w[k] = w.get(k, 0.0) * (1 - step * l2) - step * grad * v
+                    self.bias[c] -= step * grad
+        return self
+
+    # ---------- Persistence ----------
+
+    def save(self, path: str):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        payload = {
+            "labels": self.labels,
+            "dim": self.dim,
+            "bias": [round(b, 6) for b in self.bias],
+            "weights": [{str(k): round(v, 6) for k, v in w.items() if abs(v) > 1e-6} for w in self.weights],
+        }
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(payload, f, separators=(",", ":"))
+
+    @classmethod
+    def load(cls, path: str) -> "IntentClassifier":
+        with open(path, encoding="utf-8") as f:
+            payload = json.load(f)
+        weights = [{int(k): v for k, v in w.items()} for w in payload["weights"]]
+        return cls(payload["labels"], payload["dim"], weights, payload["bias"])
+
+
+def load_examples(path: str) -> list:
+    """Reads a JSONL file of {"text": ..., "label": ...} lines into (text, label) pairs."""
+    examples = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                row = json.loads(line)
+                examples.append((row["text"], row["label"]))
+    return examples
+
+
+# ---------- Bundled model ----------
+
+_model = None
+_model_lock = threading.Lock()
+
+
+def get_intent_classifier():
+    """The bundled classifier, loaded on first use (None if no trained model is available)."""
+    global _model
+    with _model_lock:
+        if _model is None and os.path.exists(config.INTENT_MODEL_PATH):
+            try:
+                _model = IntentClassifier.load(config.INTENT_MODEL_PATH)
+            except (OSError, ValueError, KeyError) as e:
+                print(f"Intent classifier unavailable: {e}")
+    return _model
+
+
+def classify_intent(text: str):
+    """Returns (label, confidence), or None when no trained model is available."""
+    model = get_intent_classifier()
+    return model.predict(text) if model is not None else None
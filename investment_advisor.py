@@ -1,4 +1,108 @@
-from model_loader import call_llm
+import bisect
+from types import MappingProxyType
+
+import numpy as np
+
+from model_loader import call_llm, stream_llm, register_prompt_prefix
+
+def _persona_prefix(persona: str, tone_instruction: str) -> str:
+    return register_prompt_prefix(f"""
+    {persona}
+    
+    Task: {tone_instruction}
+""")
+
+# Dynamic Persona Selection: one fixed preamble per savings tier (KV state cached across calls)
+STRICT_COACH_PREFIX = _persona_prefix(
+    "You are a Strict Financial Coach. The user is struggling to save. Be direct, urgent, and focus on cutting costs.",
+    "Use a warning tone. Prioritize the 50/30/20 rule. highlight 'Needs' vs 'Wants'."
+)
+BALANCED_PLANNER_PREFIX = _persona_prefix(
+    "You are a Balanced Financial Planner. The user is doing well but can optimize. Be encouraging but analytical.",
+    "Focus on optimizing the portfolio. Suggest better asset allocation."
+)
+WEALTH_MANAGER_PREFIX = _persona_prefix(
+    "You are a Wealth Manager for High Net Worth Individuals. The user is a super-saver. Focus on aggressive growth and wealth preservation.",
+    "Use a professional, sophisticated tone. Suggest advanced diversification."
+)
+
+# ---------- Savings Tiers ----------
+# Each tier applies from its floor (inclusive) up to the next tier's floor.
+# Rows are (instrument, allocation_percent, risk_level, reason).
+INVESTMENT_TIERS = (
+    {
+        "floor": 0,
+        "strategy": "Capital Protection & Liquidity",
+        "allocation": (
+            ("Savings Account", 100, "Low", "Ensure emergency liquidity before investing"),
+        ),
+        "note": "Build an emergency fund before moving to market-linked investments."
+    },
+    {
+        "floor": 10000,
+        "strategy": "Low Risk with Market Introduction",
+        "allocation": (
+            ("Fixed Deposit / Recurring Deposit", 60, "Low", "Capital safety with predictable returns"),
+            ("Liquid Mutual Fund", 20, "Low", "Better liquidity than FD"),
+            ("Nifty 50 Index Fund", 20, "Medium", "Initial exposure to equity markets"),
+        ),
+        "note": "Start equity exposure slowly to understand market behavior."
+    },
+    {
+        "floor": 50000,
+        "strategy": "Balanced Growth & Stability",
+        "allocation": (
+            ("PPF / Bank FD", 30, "Low", "Long-term capital protection"),
+            ("Index Fund (Nifty / Sensex)", 30, "Medium", "Market-linked growth with diversification"),
+            ("Large Cap Equity Mutual Fund", 20, "Medium", "Stable companies with growth potential"),
+            ("Gold ETF / Sovereign Gold Bond", 20, "Medium", "Hedge against inflation and volatility"),
+        ),
+        "note": "Balanced portfolio reduces risk while improving long-term returns."
+    },
+    {
+        "floor": 200000,
+        "strategy": "Diversified Wealth Creation",
+        "allocation": (
+            ("PPF / Government Bonds", 20, "Low", "Foundation of capital safety"),
+            ("Index Funds", 25, "Medium", "Low-cost market participation"),
+            ("Mid & Large Cap Equity Funds", 25, "High", "Higher growth potential"),
+            ("REITs / InvITs", 15, "Medium", "Income-generating real assets"),
+            ("Gold / SGB", 10, "Medium", "Portfolio hedge"),
+            ("High-Risk Bucket (Direct Stocks / Crypto)", 5, "High", "Optional high-growth exposure"),
+        ),
+        "note": "High-risk exposure is capped to protect overall portfolio."
+    },
+)
+REVIEW_NOTE = "Review allocation annually or after major life events."
+
+_TIER_FLOORS = [tier["floor"] for tier in INVESTMENT_TIERS]
+
+# Built once: read-only allocation rows per tier; callers get fresh copies
+_TIER_TEMPLATES = tuple(
+    (
+        tier["strategy"],
+        tuple(
+            MappingProxyType({"instrument": i, "allocation_percent": p, "risk_level": r, "reason": why})
+            for i, p, r, why in tier["allocation"]
+        ),
+        (tier["note"], REVIEW_NOTE)
+    )
+    for tier in INVESTMENT_TIERS
+)
+
+# Column per distinct instrument (first-appearance order), row per tier, values in percent
+INSTRUMENTS = list(dict.fromkeys(row[0] for tier in INVESTMENT_TIERS for row in tier["allocation"]))
+_ALLOCATION_MATRIX = np.zeros((len(INVESTMENT_TIERS), len(INSTRUMENTS)))
+for _t, _tier in enumerate(INVESTMENT_TIERS):
+    for _instrument, _percent, _, _ in _tier["allocation"]:
+        _ALLOCATION_MATRIX[_t, INSTRUMENTS.index(_instrument)] = _percent
+_ALLOCATION_MATRIX.setflags(write=False)
+
+
+def savings_tier(savings: float) -> int:
+    """Index into INVESTMENT_TIERS for a positive savings amount."""
+    return bisect.bisect_right(_TIER_FLOORS, savings) - 1
+
 
 def investment_advisor_json(input_data: dict) -> dict:
     """
@@ -26,155 +130,62 @@ def investment_advisor_json(input_data: dict) -> dict:
             "error": "Invalid savings_amount. Must be a number."
         }
 
-    if savings <= 0:
+    if not savings > 0:
         return {
             "error": "Savings amount must be greater than zero."
         }
 
-    # ---------- Base Response Structure ----------
-    response = {
+    # ---------- Recommendation Lookup ----------
+    strategy, allocation, notes = _TIER_TEMPLATES[savings_tier(savings)]
+    return {
         "input_savings": savings,
-        "investment_strategy": "",
-        "recommended_allocation": [],
-        "advisor_notes": []
+        "investment_strategy": strategy,
+        "recommended_allocation": [dict(row) for row in allocation],
+        "advisor_notes": list(notes)
     }
 
-    # ---------- Recommendation Logic ----------
-
-    # Tier 1: Very Low Savings
-    if savings < 10000:
-        response["investment_strategy"] = "Capital Protection & Liquidity"
-        response["recommended_allocation"] = [
-            {
-                "instrument": "Savings Account",
-                "allocation_percent": 100,
-                "risk_level": "Low",
-                "reason": "Ensure emergency liquidity before investing"
-            }
-        ]
-        response["advisor_notes"].append(
-            "Build an emergency fund before moving to market-linked investments."
-        )
-
-    # Tier 2: Low Savings
-    elif 10000 <= savings < 50000:
-        response["investment_strategy"] = "Low Risk with Market Introduction"
-        response["recommended_allocation"] = [
-            {
-                "instrument": "Fixed Deposit / Recurring Deposit",
-                "allocation_percent": 60,
-                "risk_level": "Low",
-                "reason": "Capital safety with predictable returns"
-            },
-            {
-                "instrument": "Liquid Mutual Fund",
-                "allocation_percent": 20,
-                "risk_level": "Low",
-                "reason": "Better liquidity than FD"
-            },
-            {
-                "instrument": "Nifty 50 Index Fund",
-                "allocation_percent": 20,
-                "risk_level": "Medium",
-                "reason": "Initial exposure to equity markets"
-            }
-        ]
-        response["advisor_notes"].append(
-            "Start equity exposure slowly to understand market behavior."
-        )
-
-    # Tier 3: Medium Savings
-    elif 50000 <= savings < 200000:
-        response["investment_strategy"] = "Balanced Growth & Stability"
-        response["recommended_allocation"] = [
-            {
-                "instrument": "PPF / Bank FD",
-                "allocation_percent": 30,
-                "risk_level": "Low",
-                "reason": "Long-term capital protection"
-            },
-            {
-                "instrument": "Index Fund (Nifty / Sensex)",
-                "allocation_percent": 30,
-                "risk_level": "Medium",
-                "reason": "Market-linked growth with diversification"
-            },
-            {
-                "instrument": "Large Cap Equity Mutual Fund",
-                "allocation_percent": 20,
-                "risk_level": "Medium",
-                "reason": "Stable companies with growth potential"
-            },
-            {
-                "instrument": "Gold ETF / Sovereign Gold Bond",
-                "allocation_percent": 20,
-                "risk_level": "Medium",
-                "reason": "Hedge against inflation and volatility"
-            }
-        ]
-        response["advisor_notes"].append(
-            "Balanced portfolio reduces risk while improving long-term returns."
-        )
-
-    # Tier 4: High Savings
-    else:
-        response["investment_strategy"] = "Diversified Wealth Creation"
-        response["recommended_allocation"] = [
-            {
-                "instrument": "PPF / Government Bonds",
-                "allocation_percent": 20,
-                "risk_level": "Low",
-                "reason": "Foundation of capital safety"
-            },
-            {
-                "instrument": "Index Funds",
-                "allocation_percent": 25,
-                "risk_level": "Medium",
-                "reason": "Low-cost market participation"
-            },
-            {
-                "instrument": "Mid & Large Cap Equity Funds",
-                "allocation_percent": 25,
-                "risk_level": "High",
-                "reason": "Higher growth potential"
-            },
-            {
-                "instrument": "REITs / InvITs",
-                "allocation_percent": 15,
-                "risk_level": "Medium",
-                "reason": "Income-generating real assets"
-            },
-            {
-                "instrument": "Gold / SGB",
-                "allocation_percent": 10,
-                "risk_level": "Medium",
-                "reason": "Portfolio hedge"
-            },
-            {
-                "instrument": "High-Risk Bucket (Direct Stocks / Crypto)",
-                "allocation_percent": 5,
-                "risk_level": "High",
-                "reason": "Optional high-growth exposure"
-            }
-        ]
-        response["advisor_notes"].append(
-            "High-risk exposure is capped to protect overall portfolio."
-        )
-
-    # ---------- Final Notes ----------
-    response["advisor_notes"].append(
-        "Review allocation annually or after major life events."
-    )
 
-    return response
+def investment_allocations_batch(savings_amounts) -> dict:
+    """
+    Vectorized investment_advisor_json for many savings amounts at once
+    (a cohort of users, or a what-if sweep).
+
+    Returns:
+    {
+        "instruments": [name, ...],                   # column order
+        "tier": int array (n,),                       # index into INVESTMENT_TIERS, -1 if invalid
+        "strategy": object array (n,),                # None where invalid
+        "allocation_percent": float array (n, k),
+        "allocation_amount": float array (n, k)       # rupees per instrument
+    }
+    Amounts that are not positive numbers get tier -1 and all-zero rows.
+    """
+    savings = np.asarray(savings_amounts, dtype=np.float64).reshape(-1)
+    valid = savings > 0  # False for NaN as well
+    tier = np.searchsorted(_TIER_FLOORS, savings, side="right") - 1
+    tier[~valid] = -1
+
+    percent = np.zeros((len(savings), len(INSTRUMENTS)))
+    percent[valid] = _ALLOCATION_MATRIX[tier[valid]]
+    strategies = np.array([t["strategy"] for t in INVESTMENT_TIERS] + [None], dtype=object)
+
+    return {
+        "instruments": list(INSTRUMENTS),
+        "tier": tier,
+        "strategy": strategies[tier],
+        "allocation_percent": percent,
+        "allocation_amount": percent * np.where(valid, savings, 0.0)[:, None] / 100
+    }
 
 def generate_investment_guidance(
     cash_flow_summary: dict,
     financial_goals: str = "wealth building and financial security",
-    risk_tolerance: str = "moderate"
-) -> str:
+    risk_tolerance: str = "moderate",
+    stream: bool = False
+):
     """
     Generates budget, savings, and investment recommendations using LLM.
+    With stream=True, returns an iterator of text chunks (for st.write_stream).
     """
 
     total_income = cash_flow_summary["total_income"]
@@ -189,20 +200,13 @@ def generate_investment_guidance(
 
     # Dynamic Persona Selection
     if savings_percentage < 20:
-        persona = "You are a Strict Financial Coach. The user is struggling to save. Be direct, urgent, and focus on cutting costs."
-        tone_instruction = "Use a warning tone. Prioritize the 50/30/20 rule. highlight 'Needs' vs 'Wants'."
+        persona_prefix = STRICT_COACH_PREFIX
     elif savings_percentage < 50:
-        persona = "You are a Balanced Financial Planner. The user is doing well but can optimize. Be encouraging but analytical."
-        tone_instruction = "Focus on optimizing the portfolio. Suggest better asset allocation."
+        persona_prefix = BALANCED_PLANNER_PREFIX
     else:
-        persona = "You are a Wealth Manager for High Net Worth Individuals. The user is a super-saver. Focus on aggressive growth and wealth preservation."
-        tone_instruction = "Use a professional, sophisticated tone. Suggest advanced diversification."
-
-    prompt = f"""
-    {persona}
-    
-    Task: {tone_instruction}
+        persona_prefix = WEALTH_MANAGER_PREFIX
 
+    prompt = persona_prefix + f"""
     ### Financial Overview
     - Monthly Income: ₹{total_income}
     - Total Expenses: ₹{total_expenses}
@@ -229,4 +233,7 @@ def generate_investment_guidance(
     3. Strictly follow your assigned Persona Tone.
     """
 
-    return call_llm(prompt)
+    # Low-temperature call site: decode greedily so repeated summaries hit the response cache
+    if stream:
+        return stream_llm(prompt, greedy=True)
+    return call_llm(prompt, greedy=True)
@@ -0,0 +1,294 @@
+"""
+Grammar-constrained JSON decoding.
+
+The extractors ask the model for JSON and then hunt for `[`/`{` in free text.
+With a schema, generation is constrained instead: at every step only tokens
+that keep the output a valid prefix of a document matching the schema are
+allowed, and generation stops as soon as the document closes.
+
+Schemas use a small JSON-Schema subset, so they stay plain serializable dicts:
+
+    {"type": "array", "items": {...}}
+    {"type": "object", "properties": {"name": {...}, ...}}   # keys emitted in this order
+    {"type": "string", "enum": [...]}                        # enum is optional
+    {"type": "number"} / {"type": "integer"} / {"type": "null"}
+    {"type": ["integer", "null"]}                            # unions of the above
+"""
+import re
+
+import torch
+from transformers import LogitsProcessor, StoppingCriteria
+
+WHITESPACE = " \t\n\r"
+# Consecutive tokens of whitespace allowed between JSON tokens. Enough for a
+# newline plus indentation; more only burns a short max_tokens budget.
+MAX_WHITESPACE_TOKENS = 2
+MAX_STRING_LENGTH = 200
+
+_INT_PARTIAL = re.compile(r"-?(0|[1-9]\d{0,14})?")
+_INT_COMPLETE = re.compile(r"-?(0|[1-9]\d{0,14})")
+_NUM_PARTIAL = re.compile(r"-?((0|[1-9]\d{0,14})(\.\d{0,6})?)?")
+_NUM_COMPLETE = re.compile(r"-?(0|[1-9]\d{0,14})(\.\d{1,6})?")
+
+
+def _types(schema: dict) -> tuple:
+    t = schema.get("type")
+    return tuple(t) if isinstance(t, (list, tuple)) else (t,)
+
+
+class JsonPrefixMatcher:
+    """
+    Character-level pushdown automaton for documents matching a schema.
+
+    States are immutable tuples `(stack, whitespace_tokens)`, so trying a
+    candidate token from the current state never needs a copy. `feed` takes the
+    text of one token and returns None when it cannot be continued into a valid
+    document.
+    """
+
+    def __init__(self, schema: dict):
+        self.schema = schema
+
+    def initial(self):
+        return ((("value", self.schema),), 0)
+
+    @staticmethod
+    def is_complete(state) -> bool:
+        return state is not None and not state[0]
+
+    def feed(self, state, text: str):
+        stack, ws_run = state
+        only_whitespace, ends_in_whitespace = True, False
+        for ch in text:
+            # Whitespace inside strings and keys is content, not padding
+            if ch in WHITESPACE and not (stack and stack[-1][0] in ("string", "key")):
+                ends_in_whitespace = True
+            else:
+                only_whitespace, ends_in_whitespace = False, False
+            stack = self._step(stack, ch)
+            if stack is None:
+                return None
+        if text:
+            ws_run = ws_run + 1 if only_whitespace else int(ends_in_whitespace)
+            if ws_run > MAX_WHITESPACE_TOKENS:
+                return None
+        return (stack, ws_run)
+
+    # ---------- Transitions ----------
+
+    def _step(self, stack, ch):
+        if not stack:
+            return None  # Document already closed
+        frame = stack[-1]
+        rest = stack[:-1]
+        kind = frame[0]
+
+        if kind == "value":
+            if ch in WHITESPACE:
+                return stack
+            return self._start_value(rest, frame[1], ch)
+
+        if kind == "array":
+            _, schema, phase = frame
+            if ch in WHITESPACE:
+                return stack
+            if phase == "next":
+                if ch == ",":
+                    return rest + (("array", schema, "item"),)
+                return rest if ch == "]" else None
+            if phase == "first" and ch == "]":
+                return rest
+            # "first" or "item": a new element starts here
+            return self._start_value(rest + (("array", schema, "next"),), schema["items"], ch)
+
+        if kind == "object":
+            _, schema, index, phase = frame
+            keys = list(schema["properties"])
+            if ch in WHITESPACE:
+                return stack
+            if phase == "key":
+                if ch == '"' and index < len(keys):
+                    return rest + (("object", schema, index, "colon"), ("key", keys[index], 0))
+                return rest if ch == "}" and index == len(keys) else None
+            if phase == "colon":
+                if ch != ":":
+                    return None
+                value_schema = schema["properties"][keys[index]]
+                return rest + (("object", schema, index + 1, "after_value"), ("value", value_schema))
+            # after_value
+            if ch == "," and index < len(keys):
+                return rest + (("object", schema, index, "key"),)
+            return rest if ch == "}" and index == len(keys) else None
+
+        if kind == "key":
+            _, name, pos = frame
+            expected = name + '"'
+            if ch != expected[pos]:
+                return None
+            return rest if pos + 1 == len(expected) else rest + (("key", name, pos + 1),)
+
+        if kind == "string":
+            _, enum, content, escaped = frame
+            if escaped:
+                if ch not in '"\\/bfnrtu':
+                    return None
+                return rest + (("string", enum, content + 1, False),)
+            if ch == '"':
+                if enum is not None and content not in enum:
+                    return None
+                return rest
+            if ord(ch) < 0x20:
+                return None
+            if enum is not None:
+                # Track the literal text so far; it must stay a prefix of an allowed value
+                candidate = content + ch
+                if ch == "\\" or not any(e.startswith(candidate) for e in enum):
+                    return None
+                return rest + (("string", enum, candidate, False),)
+            if content + 1 > MAX_STRING_LENGTH:
+                return None
+            return rest + (("string", None, content + 1, ch == "\\"),)
+
+        if kind == "number":
+            _, integer, text = frame
+            candidate = text + ch
+            partial = _INT_PARTIAL if integer else _NUM_PARTIAL
+            if (ch.isdigit() or ch in "-.") and partial.fullmatch(candidate):
+                return rest + (("number", integer, candidate),)
+            # Any other character ends the number and belongs to the parent
+            complete = _INT_COMPLETE if integer else _NUM_COMPLETE
+            if not complete.fullmatch(text):
+                return None
+            return self._step(rest, ch)
+
+        if kind == "literal":
+            _, word, pos = frame
+            if ch != word[pos]:
+                return None
+            return rest if pos + 1 == len(word) else rest + (("literal", word, pos + 1),)
+
+        return None
+
+    def _start_value(self, below, schema, ch):
+        types = _types(schema)
+        if ch == "[" and "array" in types:
+            return below + (("array", schema, "first"),)
+        if ch == "{" and "object" in types:
+            return below + (("object", schema, 0, "key"),)
+        if ch == '"' and "string" in types:
+            enum = schema.get("enum")
+            return below + (("string", tuple(enum), "", False) if enum else ("string", None, 0, False),)
+        if (ch.isdigit() or ch == "-") and ("number" in types or "integer" in types):
+            integer = "number" not in types
+            return below + (("number", integer, ch),)
+        if ch == "n" and "null" in types:
+            return below + (("literal", "null", 1),)
+        return None
+
+
+class JsonSchemaLogitsProcessor(LogitsProcessor):
+    """
+    Masks every token that would break the schema. To stay cheap on large
+    vocabularies, only the highest-scoring candidates are checked each step
+    (widening the search only if none of them is valid).
+    """
+
+    def __init__(self, schema: dict, tokenizer, candidates: int = 64):
+        self.matcher = JsonPrefixMatcher(schema)
+        self.tokenizer = tokenizer
+        self.candidates = candidates
+        self.eos_token_id = tokenizer.eos_token_id
+        self.special_ids = set(tokenizer.all_special_ids)
+        self.prompt_len = None
+        self._rows = {}  # row -> (generated token ids, automaton state after each of them)
+        self._anchor = tokenizer.encode("a", add_special_tokens=False)[:1]
+        self._anchor_text = tokenizer.decode(self._anchor)
+        self._texts = {}
+
+    def token_text(self, token_id: int) -> str:
+        """Decoded text of one token, including any leading space (decoded after an anchor token)."""
+        text = self._texts.get(token_id)
+        if text is None:
+            full = self.tokenizer.decode(self._anchor + [token_id])
+            text = full[len(self._anchor_text):]
+            self._texts[token_id] = text
+        return text
+
+    def state_for(self, row: int, ids: torch.Tensor):
+        """
+        Advances the automaton over the tokens generated since the last call.
+        Speculative decoding can roll rejected draft tokens back, so states are
+        kept per token and resumed from the longest prefix seen before.
+        """
+        if self.prompt_len is None:
+            self.prompt_len = ids.shape[-1]
+        generated = ids[self.prompt_len:].tolist()
+        seen, states = self._rows.get(row, ([], [self.matcher.initial()]))
+        common = 0
+        while common < min(len(seen), len(generated)) and seen[common] == generated[common]:
+            common += 1
+        seen, states = seen[:common], states[:common + 1]
+
+        state = states[-1]
+        for token_id in generated[common:]:
+            # Special tokens (EOS/padding) leave the document unchanged
+            if state is not None and token_id not in self.special_ids:
+                state = self.matcher.feed(state, self.token_text(token_id))
+            seen.append(token_id)
+            states.append(state)
+        self._rows[row] = (seen, states)
+        return state
+
+    def _accepts(self, state, token_id: int) -> bool:
+        if token_id in self.special_ids:
+            return False
+        text = self.token_text(token_id)
+        if not text or "�" in text:  # empty or partial UTF-8 byte tokens
+            return False
+        return self.matcher.feed(state, text) is not None
+
+    def __call__(self, input_ids: torch.LongTensor, scores: torch.FloatTensor) -> torch.FloatTensor:
+        for row in range(input_ids.shape[0]):
+            state = self.state_for(row, input_ids[row])
+            if state is None:
+                continue  # Output already left the grammar; nothing sensible to enforce
+
+            allowed = []
+            if self.matcher.is_complete(state):
+                allowed = [self.eos_token_id]
+            else:
+                k = min(self.candidates, scores.shape[-1])
+                top = torch.topk(scores[row], k).indices.tolist()
+                allowed = [t for t in top if self._accepts(state, t)]
+                if not allowed:
+                    order = torch.argsort(scores[row], descending=True)[k:]
+                    for start in range(0, order.shape[0], 1024):
+                        allowed = [t for t in order[start:start + 1024].tolist() if self._accepts(state, t)]
+                        if allowed:
+                            break
+                if not allowed:
+                    # No token continues the document: end it here rather than mask every logit
+                    print("JSON constraint: no valid continuation, ending generation")
+                    allowed = [self.eos_token_id]
+
+            mask = torch.full_like(scores[row], float("-inf"))
+            mask[allowed] = 0.0
+            scores[row] = scores[row] + mask
+        return scores
+
+
+class JsonCompleteCriteria(StoppingCriteria):
+    """Stops a row the moment its JSON document is closed."""
+    reason = "json_complete"
+
+    def __init__(self, processor: JsonSchemaLogitsProcessor):
+        self.processor = processor
+        self.fired = False
+
+    def __call__(self, input_ids: torch.LongTensor, scores: torch.FloatTensor, **kwargs) -> torch.BoolTensor:
+        done = [
+            self.processor.matcher.is_complete(self.processor.state_for(row, input_ids[row]))
+            for row in range(input_ids.shape[0])
+        ]
+        self.fired = self.fired or any(done)
+        return torch.tensor(done, dtype=torch.bool, device=input_ids.device)
@@ -0,0 +1,333 @@
+"""
+Vectorized loan amortization engine.
+
+Every function takes NumPy-broadcastable inputs, so one call prices a single
+loan or thousands of loans / tenures / rate scenarios at once:
+
+    emi(25_00_000, 8.5, 240)                            # one EMI
+    emi_grid(25_00_000, [8, 8.5, 9], [120, 180, 240])   # rates x tenures table
+    simulate_loans([25e5, 25e5], [8.5, 8.5], [240, 240],
+                   prepayments=[{}, {36: 2_00_000}])    # side-by-side scenarios
+
+`simulate_loans` steps month by month across all loans together and supports
+lump-sum prepayments, a fixed extra payment every month and rate resets.
+After a prepayment or rate reset the loan either keeps its EMI and finishes
+sooner/later (reduce="tenure", the usual bank default) or keeps its end date
+and re-computes the EMI (reduce="emi").
+
+`parse_loan_query` turns a free-text question into the inputs for these.
+"""
+import re
+
+import numpy as np
+
+# Loans that would run past this (e.g. an EMI that barely covers interest) are cut off here
+MAX_MONTHS = 1200
+_PAISA = 0.005
+
+
+# ---------------------------------------------------------
+# Closed-form helpers
+# ---------------------------------------------------------
+
+def emi(principal, annual_rate, months):
+    """Monthly instalment for `principal` at `annual_rate` percent over `months` (broadcasts)."""
+    principal = np.asarray(principal, dtype=np.float64)
+    r = np.asarray(annual_rate, dtype=np.float64) / 1200
+    n = np.asarray(months, dtype=np.float64)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        growth = (1 + r) ** n
+        result = np.where(r > 0, principal * r * growth / (growth - 1), principal / n)
+    return result if result.ndim else float(result)
+
+
+def total_interest(principal, annual_rate, months):
+    """Interest paid over the full tenure without prepayments (broadcasts)."""
+    return emi(principal, annual_rate, months) * np.asarray(months, dtype=np.float64) - np.asarray(principal, dtype=np.float64)
+
+
+def emi_grid(principal, rates, tenures_months) -> dict:
+    """EMI and total interest for every (rate, tenure) pair: arrays of shape (len(rates), len(tenures))."""
+    rates = np.asarray(rates, dtype=np.float64).reshape(-1, 1)
+    tenures = np.asarray(tenures_months, dtype=np.float64).reshape(1, -1)
+    return {
+        "rates": rates.ravel(),
+        "tenures_months": tenures.ravel().astype(int),
+        "emi": emi(principal, rates, tenures),
+        "total_interest": total_interest(principal, rates, tenures),
+    }
+
+
+# ---------------------------------------------------------
+# Month-by-month simulation
+# ---------------------------------------------------------
+
+def _events(per_loan, n: int) -> dict:
+    """[{month: value}, ...] (one dict per loan, or one dict for all) -> {month: (loan indices, values)}."""
+    if not per_loan:
+        return {}
+    if isinstance(per_loan, dict):
+        per_loan = [per_loan] * n
+    if len(per_loan) != n:
+        raise ValueError(f"Expected {n} event dicts, got {len(per_loan)}")
+    by_month = {}
+    for i, events in enumerate(per_loan):
+        for month, value in (events or {}).items():
+            by_month.setdefault(int(month), ([], []))
+            by_month[int(month)][0].append(i)
+            by_month[int(month)][1].append(float(value))
+    return {m: (np.array(idx), np.array(vals)) for m, (idx, vals) in by_month.items()}
+
+
+def simulate_loans(principal, annual_rate, months, prepayments=None, monthly_extra=0.0,
+                   rate_resets=None, reduce: str = "tenure") -> dict:
+    """
+    Amortizes n loans side by side.
+
+    principal, annual_rate (percent), months, monthly_extra: scalars or arrays of length n.
+    prepayments: {month: amount} for every loan, or a list of n such dicts. Paid after that month's EMI.
+    rate_resets: {month: new annual rate} (or a list of n dicts), effective from that month's interest.
+    reduce: "tenure" keeps the EMI after prepayments/resets, "emi" keeps the end date.
+
+    Returns per-month arrays of shape (n, T) - opening_balance, payment, interest,
+    principal, prepayment, closing_balance, rate - and per-loan arrays: emi (initial),
+    months_taken, total_interest, total_paid.
+    """
+    if reduce not in ("tenure", "emi"):
+        raise ValueError("reduce must be 'tenure' or 'emi'")
+    principal, annual_rate, months, monthly_extra = np.broadcast_arrays(
+        *(np.atleast_1d(np.asarray(v, dtype=np.float64)) for v in (principal, annual_rate, months, monthly_extra))
+    )
+    n = principal.shape[0]
+    prepay_events = _events(prepayments, n)
+    reset_events = _events(rate_resets, n)
+
+    balance = principal.copy()
+    rate = annual_rate / 1200
+    payment = np.atleast_1d(emi(balance, annual_rate, months))
+    initial_emi = payment.copy()
+    columns = {k: [] for k in ("opening_balance", "payment", "interest", "principal", "prepayment",
+                               "closing_balance", "rate")}
+    months_taken = np.zeros(n, dtype=np.int64)
+
+    for t in range(1, MAX_MONTHS + 1):
+        active = balance > _PAISA
+        if not active.any():
+            break
+        remaining = np.maximum(months - (t - 1), 1)
+
+        if t in reset_events:
+            idx, new_rates = reset_events[t]
+            rate[idx] = new_rates / 1200
+            # Re-price the EMI when asked to, or when the old one no longer covers the interest
+            reprice = np.zeros(n, dtype=bool)
+            reprice[idx] = True
+            reprice &= (reduce == "emi") | (payment <= balance * rate)
+            if reprice.any():
+                payment[reprice] = emi(balance[reprice], rate[reprice] * 1200, remaining[reprice])
+
+        opening = np.where(active, balance, 0.0)
+        interest = opening * rate
+        paid = np.minimum(payment, opening + interest) * active
+        principal_paid = paid - interest
+        balance = opening - principal_paid
+
+        extra = np.where(active, monthly_extra, 0.0)
+        if t in prepay_events:
+            idx, amounts = prepay_events[t]
+            np.add.at(extra, idx, amounts * active[idx])
+        extra = np.minimum(extra, np.maximum(balance, 0.0))
+        balance = balance - extra
+        if reduce == "emi" and extra.any():
+            changed = extra > 0
+            payment[changed] = emi(balance[changed], rate[changed] * 1200, np.maximum(remaining[changed] - 1, 1))
+
+        months_taken += active
+        for key, value in (("opening_balance", opening), ("payment", paid), ("interest", interest),
+                           ("principal", principal_paid), ("prepayment", extra),
+                           ("closing_balance", np.maximum(balance, 0.0)), ("rate", rate * 1200 * active)):
+            columns[key].append(value)
+
+    result = {k: np.stack(v, axis=1) if v else np.zeros((n, 0)) for k, v in columns.items()}
+    result.update({
+        "emi": initial_emi,
+        "months_taken": months_taken,
+        "total_interest": result["interest"].sum(axis=1),
+        "total_paid": (result["payment"] + result["prepayment"]).sum(axis=1),
+    })
+    return result
+
+
+def amortization_schedule(principal: float, annual_rate: float, months: int, prepayments: dict = None,
+                          monthly_extra: float = 0.0, rate_resets: dict = None, reduce: str = "tenure") -> dict:
+    """Single-loan schedule: 1-D per-month arrays (plus `month`) and scalar totals."""
+    sim = simulate_loans(principal, annual_rate, months, prepayments and [prepayments], monthly_extra,
+                         rate_resets and [rate_resets], reduce)
+    taken = int(sim["months_taken"][0])
+    schedule = {k: v[0, :taken] for k, v in sim.items() if isinstance(v, np.ndarray) and v.ndim == 2}
+    schedule["month"] = np.arange(1, taken + 1)
+    schedule.update({
+        "emi": float(sim["emi"][0]),
+        "months_taken": taken,
+        "total_interest": float(sim["total_interest"][0]),
+        "total_paid": float(sim["total_paid"][0]),
+    })
+    return schedule
+
+
+def yearly_summary(schedule: dict) -> list:
+    """Collapses a single-loan schedule into [{year, payment, interest, principal, prepayment, closing_balance}]."""
+    year = (schedule["month"] - 1) // 12
+    rows = []
+    for y in range(int(year.max()) + 1 if len(year) else 0):
+        in_year = year == y
+        rows.append({
+            "year": y + 1,
+            "payment": float(schedule["payment"][in_year].sum()),
+            "interest": float(schedule["interest"][in_year].sum()),
+            "principal": float(schedule["principal"][in_year].sum()),
+            "prepayment": float(schedule["prepayment"][in_year].sum()),
+            "closing_balance": float(schedule["closing_balance"][in_year][-1]),
+        })
+    return rows
+
+
+def compare_loans(scenarios: list, reduce: str = "tenure") -> list:
+    """
+    Runs scenarios side by side in one simulation. Each scenario is a dict with
+    principal, annual_rate, months and optionally label, prepayments, monthly_extra,
+    rate_resets. Returns one summary row per scenario, with interest saved
+    relative to the first.
+    """
+    sim = simulate_loans(
+        [s["principal"] for s in scenarios],
+        [s["annual_rate"] for s in scenarios],
+        [s["months"] for s in scenarios],
+        prepayments=[s.get("prepayments") or {} for s in scenarios],
+        monthly_extra=[s.get("monthly_extra", 0.0) for s in scenarios],
+        rate_resets=[s.get("rate_resets") or {} for s in scenarios],
+        reduce=reduce,
+    )
+    baseline = sim["total_interest"][0]
+    return [
+        {
+            "label": s.get("label") or f"Scenario {i + 1}",
+            "emi": float(sim["emi"][i]),
+            "months_taken": int(sim["months_taken"][i]),
+            "total_interest": float(sim["total_interest"][i]),
+            "total_paid": float(sim["total_paid"][i]),
+            "interest_saved": float(baseline - sim["total_interest"][i]),
+        }
+        for i, s in enumerate(scenarios)
+    ]
+
+
+# ---------------------------------------------------------
+# Query parsing
+# ---------------------------------------------------------
+
+_AMOUNT = r"(?:rs\.?|inr|₹)?\s*(\d+(?:\.\d+)?)\s*(lakhs?|lacs?|l\b|crores?|cr\b|k\b)?"
+_UNITS = {"lakh": 1e5, "lac": 1e5, "l": 1e5, "crore": 1e7, "cr": 1e7, "k": 1e3}
+_PERIOD = r"(?:after|from|in|at)\s+(?:(?:year|yr)\s*(\d+)|(?:month)\s*(\d+)|(\d+)\s*(years?|yrs?|months?))"
+
+_PREPAY_RE = re.compile(
+    r"(?:prepay(?:ment)?|pre-pay(?:ment)?|part[- ]?pay(?:ment)?|lump[- ]?sum|pay (?:off )?an? extra)\s*(?:of\s*)?"
+    + _AMOUNT + r"(?![\d%])(?:\s*(?:per|every|a|each)\s*month|\s*monthly)?(?:[^.%]*?" + _PERIOD + r")?"
+)
+_EXTRA_RE = re.compile(r"(?:extra|additional)\s*(?:of\s*)?" + _AMOUNT + r"\s*(?:per|every|a|each)\s*month")
+_RESET_RE = re.compile(
+    r"(?:rate|interest)\s*(?:\w+\s*){0,2}?(?:rises?|increases?|goes up|drops?|falls?|decreases?|goes down|changes?|resets?|moves?)"
+    r"\s*(?:to\s*)?(\d+(?:\.\d+)?)\s*%(?:[^.]*?" + _PERIOD + r")?"
+)
+# A percentage is a loan rate unless it describes something else: "10% down",
+# "20% of the price", "30% tax bracket", "12% returns"
+_RATE_RE = re.compile(
+    r"(\d+(?:\.\d+)?)\s*(?:%|percent|\s*interest)"
+    r"(?!\s*(?:down\b|down[- ]?payment|of\b|tax|bracket|slab|gst|cess|fee|processing|margin|returns?\b|"
+    r"inflation|hike|raise|more\b|less\b|higher\b|lower\b))"
+)
+# "15, 20 or 25 years": the unit at the end applies to every number in the list
+_TENURE_RE = re.compile(
+    r"(?<![\d.])((?:\d{1,3}(?:\.\d+)?\s*(?:,|/|&|or|and|vs\.?|versus)\s*)*)(\d+(?:\.\d+)?)\s*(years?|yrs?|months?)"
+)
+_MAX_TENURE_MONTHS = 50 * 12
+_SCHEDULE_RE = re.compile(r"\b(?:schedule|amorti[sz]ation|year[- ]?wise|breakdown)\b")
+
+
+def _amount(number: str, unit: str) -> float:
+    unit = (unit or "").rstrip("s")
+    return float(number) * _UNITS.get(unit, 1)
+
+
+def _period_month(groups) -> int:
+    """(year N | month N | N years/months) -> month number the event takes effect (default: month 1)."""
+    year_n, month_n, count, unit = groups
+    if year_n:
+        return (int(year_n) - 1) * 12 + 1
+    if month_n:
+        return int(month_n)
+    if count:
+        return int(float(count) * (12 if unit.startswith("y") else 1)) + 1
+    return 1
+
+
+def _tenures(text: str) -> list:
+    """Tenures in months, in the order written. Listed numbers too long to be a tenure are skipped."""
+    tenures = []
+    for listed, number, unit in _TENURE_RE.findall(text):
+        per = 12 if unit.startswith("y") else 1
+        months = [int(round(float(n) * per)) for n in re.findall(r"\d+(?:\.\d+)?", listed)]
+        tenures += [m for m in months if 0 < m <= _MAX_TENURE_MONTHS]
+        tenures.append(int(round(float(number) * per)))
+    return tenures
+
+
+def parse_loan_query(text: str):
+    """
+    Extracts loan inputs from a question. Returns None unless a principal, a rate
+    and a tenure are all present; otherwise:
+    {principal, rates, tenures_months, prepayments, monthly_extra, rate_resets, schedule}
+    Lump sums after month 1 are paid at the end of the month before the stated period starts.
+    """
+    # Only thousands separators go; list commas ("15, 20 or 25 years") stay
+    text = re.sub(r"(?<=\d),(?=\d)", "", text.lower())
+    prepayments, rate_resets, monthly_extra = {}, {}, 0.0
+
+    # Pull out event clauses first so their numbers are not mistaken for the loan itself
+    for match in _EXTRA_RE.finditer(text):
+        monthly_extra += _amount(match.group(1), match.group(2))
+    text = _EXTRA_RE.sub(" ", text)
+    for match in _PREPAY_RE.finditer(text):
+        amount = _amount(match.group(1), match.group(2))
+        if re.search(r"(?:per|every|a|each)\s*month|monthly", match.group(0)):
+            monthly_extra += amount
+            continue
+        month = max(_period_month(match.groups()[2:6]) - 1, 1)
+        prepayments[month] = prepayments.get(month, 0.0) + amount
+    text = _PREPAY_RE.sub(" ", text)
+    for match in _RESET_RE.finditer(text):
+        rate_resets[_period_month(match.groups()[1:5])] = float(match.group(1))
+    text = _RESET_RE.sub(" ", text)
+
+    rates = [float(r) for r in _RATE_RE.findall(text)]
+    tenures = _tenures(text)
+    remainder = _TENURE_RE.sub(" ", _RATE_RE.sub(" ", text))
+
+    principal = 0.0
+    for number, unit in re.findall(_AMOUNT, remainder):
+        value = _amount(number, unit)
+        # Bare numbers below 1000 are almost never a loan amount
+        if unit or value > 1000:
+            principal = max(principal, value)
+
+    if not (principal > 0 and rates and tenures):
+        return None
+    return {
+        "principal": principal,
+        "rates": list(dict.fromkeys(rates)),
+        "tenures_months": list(dict.fromkeys(tenures)),
+        "prepayments": prepayments,
+        "monthly_extra": monthly_extra,
+        "rate_resets": rate_resets,
+        "schedule": bool(_SCHEDULE_RE.search(text)),
+    }
@@ -0,0 +1,248 @@
+"""
+Persistent merchant -> category memo.
+
+The same merchants ("swiggy", "netflix", "electricity bill") come back month
+after month. Every category the model assigns, and every correction a user
+makes, is remembered here under the normalized description, so repeat
+merchants are answered before any prompt is built:
+
+1. exact lookup in an in-memory dict
+2. fuzzy lookup in a token trie: the longest remembered merchant that appears
+   as a run of whole words in the description ("swiggy order bangalore" ->
+   "swiggy order"). Single words only match fuzzily when a user set them: a
+   word the model once categorized ("bill", "amazon") is too generic.
+
+Entries live in SQLite (shared by all app processes, survives restarts) and
+are mirrored in memory. Past the size limit the least recently used entries
+are evicted, model-assigned ones before user corrections.
+"""
+import atexit
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+import config
+from rule_extractor import normalize_description
+
+SOURCE_USER = "user"
+SOURCE_MODEL = "llm"
+
+_END = "\0"  # Trie key marking the end of a remembered merchant
+
+
+class MerchantMemo:
+    def __init__(self, db_path: str = None, max_entries: int = 50000):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key -> (category, source); order = LRU
+        self._trie = {}
+        self._touched = set()
+        self._lock = threading.Lock()
+        self._counters = {"exact_hits": 0, "fuzzy_hits": 0, "misses": 0, "evictions": 0, "corrections": 0}
+
+        self._db = None
+        if db_path:
+            try:
+                os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+                self._db = sqlite3.connect(db_path, check_same_thread=False)
+                self._db.execute("PRAGMA journal_mode=WAL")
+                self._db.execute(
+                    "CREATE TABLE IF NOT EXISTS merchants ("
+                    " key TEXT PRIMARY KEY, category TEXT NOT NULL, source TEXT NOT NULL,"
+                    " updated_at REAL NOT NULL, last_access REAL NOT NULL)"
+                )
+                self._db.commit()
+                rows = self._db.execute(
+                    "SELECT key, category, source FROM merchants ORDER BY last_access ASC"
+                ).fetchall()
+                for key, category, source in rows[-max_entries:]:
+                    self._remember(key, category, source)
+            except sqlite3.Error as e:
+                print(f"Merchant memo: disk tier disabled ({e})")
+                self._db = None
+
+    # ---------- Public API ----------
+
+    def lookup(self, description: str):
+        """Returns the remembered category for a description, or None."""
+        found = self.match(description)
+        return found[0] if found is not None else None
+
+    def match(self, description: str):
+        """
+        (category, is_correction, exact) for a description, or None. Callers
+        can rank user corrections and exact repeats above fuzzy model guesses.
+        """
+        key = normalize_description(description)
+        if not key:
+            return None
+        with self._lock:
+            item = self._entries.get(key)
+            exact = item is not None
+            if exact:
+                self._counters["exact_hits"] += 1
+            else:
+                match = self._fuzzy(key.split())
+                if match is None:
+                    self._counters["misses"] += 1
+                    return None
+                self._counters["fuzzy_hits"] += 1
+                key, item = match, self._entries[match]
+            self._entries.move_to_end(key)
+            self._touched.add(key)
+            return item[0], item[1] == SOURCE_USER, exact
+
+    def record(self, description: str, category: str, source: str = SOURCE_MODEL):
+        """Remembers a category. Model output never overrides a user correction."""
+        key = normalize_description(description)
+        if not key or not category:
+            return
+        with self._lock:
+            existing = self._entries.get(key)
+            if existing is not None and existing[1] == SOURCE_USER and source != SOURCE_USER:
+                return
+            if source == SOURCE_USER:
+                self._counters["corrections"] += 1
+            self._remember(key, category, source)
+            evicted = self._evict()
+            if self._db is not None:
+                now = time.time()
+                try:
+                    self._db.execute(
+                        "INSERT OR REPLACE INTO merchants (key, category, source, updated_at, last_access) VALUES (?, ?, ?, ?, ?)",
+                        (key, category, source, now, now)
+                    )
+                    if evicted:
+                        self._db.executemany("DELETE FROM merchants WHERE key = ?", [(k,) for k in evicted])
+                    self._flush_touched(now)
+                    self._db.commit()
+                except sqlite3.Error as e:
+                    # e.g. "database is locked" by another app process: keep the entry in memory
+                    self._disk_failed("write", e)
+
+    def record_many(self, transactions: list, source: str = SOURCE_MODEL):
+        """Remembers {description, category} pairs, e.g. an extractor's output."""
+        for txn in transactions:
+            if isinstance(txn, dict) and txn.get("description") and txn.get("category"):
+                self.record(str(txn["description"]), str(txn["category"]), source)
+
+    def record_correction(self, description: str, category: str):
+        """A user fixed a category: it wins over anything the model says later."""
+        self.record(description, category, SOURCE_USER)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self._counters["exact_hits"] + self._counters["fuzzy_hits"] + self._counters["misses"]
+            hits = lookups - self._counters["misses"]
+            return {
+                **self._counters,
+                "hit_rate": round(hits / lookups, 3) if lookups else 0.0,
+                "entries": len(self._entries),
+                "user_entries": sum(1 for _, source in self._entries.values() if source == SOURCE_USER),
+            }
+
+    def flush(self):
+        """Persists last-access times of recent hits (used for eviction order across restarts)."""
+        with self._lock:
+            if self._db is not None:
+                try:
+                    self._flush_touched(time.time())
+                    self._db.commit()
+                except sqlite3.Error as e:
+                    self._disk_failed("flush", e)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._trie = {}
+            self._touched.clear()
+            if self._db is not None:
+                try:
+                    self._db.execute("DELETE FROM merchants")
+                    self._db.commit()
+                except sqlite3.Error as e:
+                    self._disk_failed("clear", e)
+
+    # ---------- Internals ----------
+
+    def _disk_failed(self, operation: str, error: Exception):
+        """A disk error only skips this write; the in-memory memo keeps working."""
+        print(f"Merchant memo: disk {operation} skipped ({error})")
+        try:
+            self._db.rollback()
+        except sqlite3.Error:
+            pass
+
+    def _remember(self, key: str, category: str, source: str):
+        self._entries[key] = (category, source)
+        self._entries.move_to_end(key)
+        node = self._trie
+        for token in key.split():
+            node = node.setdefault(token, {})
+        node[_END] = key
+
+    def _forget(self, key: str):
+        del self._entries[key]
+        node = self._trie
+        for token in key.split():
+            node = node.get(token)
+            if node is None:
+                return
+        node.pop(_END, None)
+
+    def _evict(self) -> list:
+        """Drops least recently used entries past the limit, model-assigned ones first."""
+        overflow = len(self._entries) - self.max_entries
+        if overflow <= 0:
+            return []
+        # One pass from the least recently used end, stopping once enough are found
+        victims, corrections = [], []
+        for key, (_, source) in self._entries.items():
+            if len(victims) == overflow:
+                break
+            (corrections if source == SOURCE_USER else victims).append(key)
+        victims += corrections[:overflow - len(victims)]
+        for key in victims:
+            self._forget(key)
+            self._touched.discard(key)
+        self._counters["evictions"] += len(victims)
+        return victims
+
+    def _fuzzy(self, tokens: list):
+        """
+        Longest remembered merchant that occurs as a run of whole tokens in
+        `tokens`. Single-token merchants only count when a user set them.
+        """
+        best, best_len = None, 0
+        for start in range(len(tokens)):
+            node = self._trie
+            for depth, token in enumerate(tokens[start:], 1):
+                node = node.get(token)
+                if node is None:
+                    break
+                if _END in node and depth > best_len and (depth > 1 or self._entries[node[_END]][1] == SOURCE_USER):
+                    best, best_len = node[_END], depth
+        return best
+
+    def _flush_touched(self, now: float):
+        if self._touched:
+            self._db.executemany("UPDATE merchants SET last_access = ? WHERE key = ?",
+                                 [(now, k) for k in self._touched])
+            self._touched.clear()
+
+
+_memo = None
+_memo_lock = threading.Lock()
+
+
+def get_merchant_memo():
+    """Process-wide merchant memo (None when disabled)."""
+    global _memo
+    if not config.MERCHANT_MEMO_ENABLED:
+        return None
+    with _memo_lock:
+        if _memo is None:
+            _memo = MerchantMemo(config.MERCHANT_MEMO_PATH, max_entries=config.MERCHANT_MEMO_MAX_ENTRIES)
+            atexit.register(_memo.flush)
+    return _memo
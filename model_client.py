@@ -0,0 +1,111 @@
+"""
+Thin client for the local FinSmart model server (see model_server.py).
+
+Set FINSMART_MODEL_SERVER to "http://127.0.0.1:8765" or "unix:///tmp/finsmart.sock"
+and `call_llm` / `stream_llm` forward to the server instead of loading a model
+copy in this process.
+"""
+import http.client
+import json
+import socket
+from urllib.parse import urlparse
+
+
+class _UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, socket_path: str, timeout: float = None):
+        super().__init__("localhost", timeout=timeout)
+        self.socket_path = socket_path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        if self.timeout is not None:
+            self.sock.settimeout(self.timeout)
+        self.sock.connect(self.socket_path)
+
+
+class ModelServerError(RuntimeError):
+    pass
+
+
+class RemoteModelClient:
+    def __init__(self, url: str, timeout: float = 600):
+        self.url = url
+        self.timeout = timeout
+        parsed = urlparse(url)
+        if parsed.scheme == "unix":
+            self._socket_path = parsed.path
+            self._host, self._port = None, None
+        elif parsed.scheme == "http":
+            self._socket_path = None
+            self._host, self._port = parsed.hostname, parsed.port or 80
+        else:
+            raise ValueError(f"Unsupported model server URL '{url}'. Use http://host:port or unix:///path.sock")
+
+    # ---------- Public API (mirrors model_loader) ----------
+
+    def call_llm(self, prompt: str, max_tokens: int = 500, temperature: float = 0.1, **kwargs) -> str:
+        return self.generate(prompt, max_tokens, temperature, **kwargs)["text"]
+
+    def generate(self, prompt: str, max_tokens: int = 500, temperature: float = 0.1, **kwargs) -> dict:
+        """Returns {"text": ..., "info": {reason, new_tokens, max_tokens, tokens_saved}}."""
+        payload = {"prompt": prompt, "max_tokens": max_tokens, "temperature": temperature, **kwargs}
+        return self._request("POST", "/generate", payload)
+
+    def stream_llm(self, prompt: str, max_tokens: int = 500, temperature: float = 0.1, **kwargs):
+        """
+        Returns an iterator of text chunks (newline-delimited JSON over chunked HTTP).
+        The request is sent right away, so generation starts before the caller iterates.
+        """
+        payload = {"prompt": prompt, "max_tokens": max_tokens, "temperature": temperature, **kwargs}
+        conn = self._connection()
+        try:
+            response = self._send(conn, "POST", "/stream", payload)
+        except Exception:
+            conn.close()
+            raise
+        return self._read_stream(conn, response)
+
+    @staticmethod
+    def _read_stream(conn, response):
+        try:
+            while True:
+                line = response.readline()
+                if not line:
+                    break
+                event = json.loads(line)
+                if "error" in event:
+                    raise ModelServerError(event["error"])
+                yield event["text"]
+        finally:
+            conn.close()
+
+    def health(self, timeout: float = 2) -> dict:
+        return self._request("GET", "/health", timeout=timeout)
+
+    def queue_depth(self, timeout: float = 2) -> dict:
+        return self._request("GET", "/queue", timeout=timeout)
+
+    # ---------- Internals ----------
+
+    def _connection(self, timeout: float = None):
+        timeout = timeout if timeout is not None else self.timeout
+        if self._socket_path:
+            return _UnixHTTPConnection(self._socket_path, timeout=timeout)
+        return http.client.HTTPConnection(self._host, self._port, timeout=timeout)
+
+    def _send(self, conn, method: str, path: str, payload: dict = None):
+        body = json.dumps(payload).encode("utf-8") if payload is not None else None
+        headers = {"Content-Type": "application/json"} if body is not None else {}
+        conn.request(method, path, body=body, headers=headers)
+        response = conn.getresponse()
+        if response.status != 200:
+            detail = response.read().decode("utf-8", errors="replace")
+            raise ModelServerError(f"Model server returned {response.status}: {detail}")
+        return response
+
+    def _request(self, method: str, path: str, payload: dict = None, timeout: float = None) -> dict:
+        conn = self._connection(timeout)
+        try:
+            return json.loads(self._send(conn, method, path, payload).read())
+        finally:
+            conn.close()
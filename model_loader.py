@@ -1,12 +1,123 @@
+import json
+import threading
+import time
+from collections import OrderedDict
 import torch
-from transformers import AutoTokenizer, AutoModelForCausalLM
+from transformers import AutoTokenizer, AutoModelForCausalLM, TextIteratorStreamer
+from transformers import LogitsProcessorList, StoppingCriteriaList
 import streamlit as st
 
-# Global cache for the model
-@st.cache_resource
+import config
+from inference_queue import BatchScheduler, cache_to_layers, layers_to_cache
+from response_cache import ResponseCache, make_cache_key
+from json_constraints import JsonSchemaLogitsProcessor, JsonCompleteCriteria
+from model_client import RemoteModelClient
+from stopping import build_stop_criteria, truncate_at_stop, stop_reason, stop_spec
+
+CPU_PRECISIONS = ("fp32", "bf16", "int8")
+
+_PROCESS_START = time.perf_counter()
+
+# ---------------------------------------------------------
+# Background Model Loading
+# ---------------------------------------------------------
+# The model starts loading in a daemon thread as soon as this module is
+# imported, so the UI renders immediately. Anything that needs the model
+# calls load_model(), which only blocks if loading has not finished yet.
+
+class _BackgroundLoader:
+    def __init__(self):
+        self._thread = None
+        self._lock = threading.Lock()
+        self._ready = threading.Event()
+        self._result = None
+        self._error = None
+        self.first_answer_logged = False
+
+    def start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._load, name="finsmart-model-loader", daemon=True)
+                self._thread.start()
+
+    def _load(self):
+        try:
+            start = time.perf_counter()
+            tokenizer, model, device = load_model_uncached(config.MODEL_NAME, config.PRECISION)
+            loaded = time.perf_counter()
+            _warmup(tokenizer, model, device)
+            done = time.perf_counter()
+            print(
+                f"Model ready: load {loaded - start:.1f}s, warmup {done - loaded:.2f}s, "
+                f"cold start {done - _PROCESS_START:.1f}s since import"
+            )
+            self._result = (tokenizer, model, device)
+        except Exception as e:
+            print(f"Model loading failed: {e}")
+            self._error = e
+        finally:
+            self._ready.set()
+
+    def get(self):
+        self.start()
+        self._ready.wait()
+        if self._error is not None:
+            raise self._error
+        return self._result
+
+    def is_ready(self) -> bool:
+        return self._ready.is_set() and self._error is None
+
+    @property
+    def error(self):
+        return self._error
+
+_loader = _BackgroundLoader()
+
 def load_model():
-    model_name = "Shiva-k22/gemma-FinAI"
-    
+    """Returns (tokenizer, model, device), waiting for the background load if needed."""
+    return _loader.get()
+
+def model_ready() -> bool:
+    if config.MODEL_SERVER_URL:
+        try:
+            return get_model_client().health().get("status") == "ready"
+        except Exception:
+            return False
+    return _loader.is_ready()
+
+def model_load_error():
+    if config.MODEL_SERVER_URL:
+        try:
+            error = get_model_client().health().get("error")
+            return RuntimeError(error) if error else None
+        except Exception as e:
+            return RuntimeError(f"Model server {config.MODEL_SERVER_URL} unreachable ({e})")
+    return _loader.error
+
+def _warmup(tokenizer, model, device):
+    """A tiny generation so lazy kernel initialization is not paid by the first real query."""
+    inputs = tokenizer("Warmup", return_tensors="pt").to(device)
+    with torch.no_grad():
+        model.generate(**inputs, max_new_tokens=4, do_sample=False)
+
+def _log_first_answer():
+    if not _loader.first_answer_logged:
+        _loader.first_answer_logged = True
+        print(f"Time to first answer: {time.perf_counter() - _PROCESS_START:.1f}s since import")
+
+def load_model_uncached(model_name: str, precision: str = "fp32"):
+    """
+    Loads tokenizer and model. On CPU, `precision` selects the inference mode:
+    - fp32: full precision (original behaviour)
+    - bf16: bfloat16 weights, half the memory
+    - int8: dynamic int8 quantization of the Linear layers (weights int8, activations quantized on the fly)
+    GPUs (CUDA/MPS) always use float16.
+    """
+    precision = precision.lower()
+    if precision not in CPU_PRECISIONS:
+        raise ValueError(f"Invalid precision '{precision}'. Choose one of {CPU_PRECISIONS}.")
+
     # Determine device
     if torch.backends.mps.is_available():
         device = "mps"
@@ -15,79 +126,546 @@ def load_model():
     else:
         device = "cpu"
         
-    print(f"Loading model on {device}...")
+    print(f"Loading model on {device} ({precision if device == 'cpu' else 'fp16'})...")
     
+    if device != "cpu":
+        dtype = torch.float16
+    elif precision == "bf16":
+        dtype = torch.bfloat16
+    else:
+        dtype = torch.float32
+
     tokenizer = AutoTokenizer.from_pretrained(model_name)
+    # safetensors checkpoints are memory-mapped; low_cpu_mem_usage avoids a second full copy in RAM
     model = AutoModelForCausalLM.from_pretrained(
         model_name,
-        torch_dtype=torch.float16 if device != "cpu" else torch.float32
+        torch_dtype=dtype,
+        low_cpu_mem_usage=True
     ).to(device)
-    
+
+    if device == "cpu" and precision == "int8":
+        model = torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+    model.eval()
     return tokenizer, model, device
 
+# ---------------------------------------------------------
+# Prefix KV Cache
+# ---------------------------------------------------------
+# Most prompts start with a long fixed preamble (extraction rules, tax context,
+# advisor personas). Modules register those preambles once; the first call that
+# uses one computes its past_key_values, and later calls start generation from
+# the cached state so only the variable part of the prompt is prefilled.
+
+class PrefixEntry:
+    def __init__(self, input_ids: torch.Tensor, layers: list, prefill_seconds: float):
+        self.input_ids = input_ids  # (1, prefix_len), on CPU
+        self.layers = layers        # list of (key, value) per layer
+        self.prefill_seconds = prefill_seconds
+        self.nbytes = sum(k.numel() * k.element_size() + v.numel() * v.element_size() for k, v in layers)
+
+    @property
+    def num_tokens(self) -> int:
+        return self.input_ids.shape[1]
+
+    def new_cache(self):
+        # update() concatenates into new tensors, so the cached ones are never modified
+        return layers_to_cache(self.layers)
+
+class PrefixCache:
+    """LRU store of prompt-prefix KV states, bounded by a memory budget."""
+
+    def __init__(self, budget_bytes: int):
+        self.budget_bytes = budget_bytes
+        self._prefixes = set()
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0, "prefill_seconds_saved": 0.0}
+
+    def register(self, prefix: str):
+        self._prefixes.add(prefix)
+
+    def match(self, prompt: str):
+        """Returns the longest registered prefix of the prompt, if any."""
+        matches = [p for p in self._prefixes if prompt.startswith(p)]
+        return max(matches, key=len) if matches else None
+
+    def get(self, prefix: str):
+        """Cached KV state for a registered prefix, or None. Callers record whether it was usable."""
+        with self._lock:
+            entry = self._entries.get(prefix)
+            if entry is not None:
+                self._entries.move_to_end(prefix)
+            return entry
+
+    def record(self, entry):
+        """Counts a reused entry as a hit (with the prefill it saved), or None as a miss."""
+        with self._lock:
+            if entry is None:
+                self.stats["misses"] += 1
+            else:
+                self.stats["hits"] += 1
+                self.stats["prefill_seconds_saved"] += entry.prefill_seconds
+
+    def fill(self, prefix: str, input_ids: torch.Tensor, model, device) -> PrefixEntry:
+        """
+        Prefills `input_ids` (the prefix's tokens) and stores the KV state. The
+        entry is returned either way, so the calling prompt only prefills its
+        suffix on top of it and a miss costs no more than an uncached call.
+        """
+        start = time.perf_counter()
+        with torch.no_grad():
+            out = model(input_ids=input_ids.to(device), use_cache=True)
+        entry = PrefixEntry(input_ids, cache_to_layers(out.past_key_values), time.perf_counter() - start)
+        if entry.nbytes > self.budget_bytes:
+            return entry
+
+        with self._lock:
+            self._entries[prefix] = entry
+            while sum(e.nbytes for e in self._entries.values()) > self.budget_bytes:
+                self._entries.popitem(last=False)
+                self.stats["evictions"] += 1
+        return entry
+
+    def memory_bytes(self) -> int:
+        return sum(e.nbytes for e in self._entries.values())
+
+_prefix_cache = PrefixCache(config.PREFIX_CACHE_MB * 1024 * 1024)
+
+def register_prompt_prefix(prefix: str) -> str:
+    """Registers a fixed prompt preamble for KV reuse. Returns it unchanged for convenience."""
+    _prefix_cache.register(prefix)
+    return prefix
+
+def prefix_cache_stats() -> dict:
+    return {
+        **_prefix_cache.stats,
+        "entries": len(_prefix_cache._entries),
+        "memory_mb": round(_prefix_cache.memory_bytes() / (1024 * 1024), 2)
+    }
+
+def _prepare_inputs(prompt: str):
+    """
+    Tokenizes the prompt. If it starts with a registered prefix, also returns the
+    prefix's KV state so generation only prefills the rest of the prompt.
+
+    The full prompt is always tokenized in one piece, and the cached state is
+    used only when its tokens are an exact prefix of those ids, so cached and
+    uncached calls see the same token sequence.
+    """
+    tokenizer, model, device = load_model()
+    input_ids = tokenizer(prompt, return_tensors="pt")["input_ids"]
+    prefix = _prefix_cache.match(prompt)
+    if prefix is None:
+        return input_ids.to(device), None
+
+    entry = _prefix_cache.get(prefix)
+    if entry is not None and _is_token_prefix(entry.input_ids, input_ids):
+        _prefix_cache.record(entry)
+        print(f"Prefix cache hit: reused {entry.num_tokens} tokens, saved ~{entry.prefill_seconds * 1000:.0f} ms of prefill")
+        return input_ids.to(device), entry
+    # Not cached, or cached tokens that do not line up with this prompt: both are misses
+    _prefix_cache.record(None)
+    if entry is None:
+        prefix_ids = tokenizer(prefix, return_tensors="pt")["input_ids"]
+        if _is_token_prefix(prefix_ids, input_ids):
+            return input_ids.to(device), _prefix_cache.fill(prefix, prefix_ids, model, device)
+    # The prefix's last tokens merge with the text after it: no reusable state
+    return input_ids.to(device), None
+
+def _is_token_prefix(prefix_ids: torch.Tensor, input_ids: torch.Tensor) -> bool:
+    """True if prefix_ids are the first tokens of input_ids, with at least one token after them."""
+    n = prefix_ids.shape[1]
+    return n < input_ids.shape[1] and torch.equal(prefix_ids[0], input_ids[0, :n])
+
+def _generate_kwargs(input_ids: torch.Tensor, prefix) -> dict:
+    kwargs = {"input_ids": input_ids, "attention_mask": torch.ones_like(input_ids)}
+    if prefix is not None:
+        kwargs["past_key_values"] = prefix.new_cache()
+    return kwargs
+
+def _sampling_kwargs(temperature: float, greedy: bool) -> dict:
+    """Decoding settings shared by `generate` and the batch scheduler."""
+    if greedy:
+        return {"do_sample": False}
+    return {"do_sample": True, "temperature": temperature, "top_p": 0.95}
+
+# ---------------------------------------------------------
+# Speculative Decoding
+# ---------------------------------------------------------
+_draft_model = None
+_draft_lock = threading.Lock()
+
+def load_draft_model():
+    """Small draft model for assisted generation (FINSMART_DRAFT_MODEL), loaded on first use."""
+    global _draft_model
+    with _draft_lock:
+        if _draft_model is None:
+            _, _, device = load_model()
+            print(f"Loading draft model {config.DRAFT_MODEL_NAME} on {device}...")
+            _draft_model = AutoModelForCausalLM.from_pretrained(
+                config.DRAFT_MODEL_NAME,
+                torch_dtype=torch.float16 if device != "cpu" else torch.float32,
+                low_cpu_mem_usage=True
+            ).to(device).eval()
+    return _draft_model
+
+def _speculative_kwargs() -> dict:
+    """
+    Draft-model assisted decoding when a draft model is configured, otherwise
+    prompt lookup: candidate continuations are n-grams copied from the prompt.
+    Either way the main model verifies all drafted tokens in one forward pass.
+    """
+    if config.DRAFT_MODEL_NAME:
+        return {"assistant_model": load_draft_model()}
+    return {"prompt_lookup_num_tokens": config.PROMPT_LOOKUP_TOKENS}
+
+# Shared continuous-batching scheduler (one per process, like the model)
+@st.cache_resource
+def get_scheduler() -> BatchScheduler:
+    tokenizer, model, device = load_model()
+    return BatchScheduler(model, tokenizer, device, max_batch_size=config.MAX_BATCH_SIZE)
+
+# ---------------------------------------------------------
+# Shared Model Server Client
+# ---------------------------------------------------------
+# With FINSMART_MODEL_SERVER set, this process never loads the model: call_llm
+# and stream_llm forward to model_server.py, which keeps one resident copy for
+# all app workers. The response cache is still checked locally first.
+_model_client = None
+
+def get_model_client():
+    global _model_client
+    if _model_client is None or _model_client.url != config.MODEL_SERVER_URL:
+        _model_client = RemoteModelClient(config.MODEL_SERVER_URL)
+    return _model_client
+
+# ---------------------------------------------------------
+# Response Cache
+# ---------------------------------------------------------
+_response_cache = None
+_response_cache_lock = threading.Lock()
+
+def get_response_cache():
+    """Process-wide response cache (None when disabled)."""
+    global _response_cache
+    if not config.RESPONSE_CACHE_ENABLED:
+        return None
+    with _response_cache_lock:
+        if _response_cache is None:
+            _response_cache = ResponseCache(
+                config.RESPONSE_CACHE_PATH,
+                max_memory_entries=config.RESPONSE_CACHE_MEMORY_ENTRIES,
+                max_disk_entries=config.RESPONSE_CACHE_DISK_ENTRIES,
+                ttl_seconds=config.RESPONSE_CACHE_TTL_SECONDS
+            )
+    return _response_cache
+
+def _cache_key(prompt: str, max_tokens: int, temperature: float, greedy: bool, json_schema: dict = None,
+               stops: dict = None):
+    """Only greedy generations are deterministic, so only they get a cache key."""
+    if not greedy or get_response_cache() is None:
+        return None
+    model_id = f"{config.MODEL_NAME}:{config.PRECISION}"
+    decoding = "greedy"
+    if json_schema is not None:
+        decoding += "+json:" + json.dumps(json_schema, sort_keys=True)
+    if stops and any(stops.values()):
+        spec = stop_spec(**stops)
+        if spec is None:
+            return None  # A plain-callable predicate has no stable identity
+        decoding += "+stop:" + json.dumps(spec, sort_keys=True)
+    return make_cache_key(prompt, model_id, max_tokens, temperature, decoding)
+
+def _constraint_kwargs(json_schema: dict, stop_criteria: list = (), scheduler: bool = False) -> dict:
+    """
+    Logits processor + stopping criteria: the JSON schema constraint (which also
+    stops when the document closes) and any per-call stop conditions.
+    """
+    criteria = list(stop_criteria)
+    processor = None
+    if json_schema is not None:
+        tokenizer, _, _ = load_model()
+        processor = JsonSchemaLogitsProcessor(json_schema, tokenizer)
+        criteria.append(JsonCompleteCriteria(processor))
+
+    kwargs = {}
+    if processor is not None:
+        kwargs["logits_processor"] = processor if scheduler else LogitsProcessorList([processor])
+    if criteria:
+        kwargs["stopping_criteria"] = StoppingCriteriaList(criteria)
+    return kwargs
+
+# ---------------------------------------------------------
+# Per-call Stop Reporting
+# ---------------------------------------------------------
+# Every call_llm records why it stopped and how many of its max_tokens it did
+# not need; last_call_info() returns that for the calling thread.
+_call_info = threading.local()
+
+def last_call_info():
+    """{reason, new_tokens, max_tokens, tokens_saved} for this thread's last call_llm (None before the first)."""
+    return getattr(_call_info, "info", None)
+
+def _record_call(reason: str, new_tokens: int, max_tokens: int, log: bool = True) -> dict:
+    info = {
+        "reason": reason,
+        "new_tokens": new_tokens,
+        "max_tokens": max_tokens,
+        "tokens_saved": max(0, max_tokens - new_tokens)
+    }
+    _call_info.info = info
+    if log:
+        print(f"call_llm: stopped by {reason} after {new_tokens} tokens ({info['tokens_saved']} of {max_tokens} saved)")
+    return info
+
+def _eos_token_ids(model, tokenizer) -> set:
+    eos = model.generation_config.eos_token_id
+    if eos is None:
+        eos = tokenizer.eos_token_id
+    return set(eos if isinstance(eos, (list, tuple)) else [eos])
+
 # Helper function to serve as 'call_llm'
-def call_llm(prompt: str, max_tokens: int = 500, temperature: float = 0.1) -> str:
+def call_llm(prompt: str, max_tokens: int = 500, temperature: float = 0.1, greedy: bool = False,
+             json_schema: dict = None, speculative: bool = False, stop=None, stop_token_ids=None,
+             stop_when=None) -> str:
     """
     Generates a response from the LLM based on the prompt.
     This acts as the bridge between logic modules and the model.
+
+    With FINSMART_BATCHING=1 the prompt is queued on the shared scheduler and
+    decoded together with prompts from other sessions. With FINSMART_MODEL_SERVER
+    set, it is sent to the shared model server instead.
+
+    greedy=True decodes deterministically (temperature is ignored), which makes
+    the answer cacheable: repeated prompts are served from the response cache.
+
+    json_schema constrains decoding to JSON matching the schema (see json_constraints)
+    and stops as soon as the document closes. The raw JSON is returned unfiltered.
+
+    speculative=True drafts several tokens at a time (prompt lookup or a draft
+    model, see _speculative_kwargs) and verifies them in one forward pass. With
+    greedy decoding the output is identical to a plain run, just faster when the
+    answer copies spans of the prompt. It always runs on the direct path, since
+    the batch scheduler decodes one token per step, and prefills the whole
+    prompt, since registered prefixes are not reused for it.
+
+    Generation also ends early on any stop condition (see stopping.py):
+    - stop: string or list of strings; the output is cut before the first one
+    - stop_token_ids: token ids that end generation
+    - stop_when: text predicate(s), e.g. OneOf(labels) or JsonClosed()
+    The stop reason and tokens saved are available from last_call_info().
     """
+    stops = {"stop": stop, "stop_token_ids": stop_token_ids, "stop_when": stop_when}
+    cache_key = _cache_key(prompt, max_tokens, temperature, greedy, json_schema, stops)
+    if cache_key is not None:
+        cached = get_response_cache().get(cache_key)
+        if cached is not None:
+            _record_call("cache", 0, max_tokens, log=False)
+            return cached
+
+    if config.MODEL_SERVER_URL:
+        spec = stop_spec(**stops)
+        if spec is None:
+            raise ValueError("Plain-callable stop predicates cannot be sent to the model server; use a StopPredicate.")
+        # The server already cleans the response
+        result = get_model_client().generate(
+            prompt, max_tokens=max_tokens, temperature=temperature, greedy=greedy, json_schema=json_schema,
+            speculative=speculative, **spec
+        )
+        response = result["text"]
+        if result.get("info"):
+            _record_call(**{k: v for k, v in result["info"].items() if k != "tokens_saved"})
+    else:
+        if speculative:
+            completion = _generate_direct(prompt, max_tokens, temperature, greedy, json_schema, speculative=True, stops=stops)
+        elif config.ENABLE_BATCHING:
+            completion = _generate_batched(prompt, max_tokens, temperature, greedy, json_schema, stops=stops)
+        else:
+            completion = _generate_direct(prompt, max_tokens, temperature, greedy, json_schema, stops=stops)
+        completion = truncate_at_stop(completion, stop)
+        response = completion.strip() if json_schema is not None else _clean_response(completion)
+
+    if cache_key is not None:
+        get_response_cache().put(cache_key, response)
+    _log_first_answer()
+    return response
+
+def _generate_batched(prompt: str, max_tokens: int, temperature: float, greedy: bool = False,
+                      json_schema: dict = None, stops: dict = None) -> str:
+    """Queues the prompt on the shared scheduler and waits for its completion."""
+    tokenizer, _, _ = load_model()
+    input_ids, prefix = _prepare_inputs(prompt)
+    scheduler = get_scheduler()
+    stop_criteria = build_stop_criteria(tokenizer, input_ids.shape[1], **(stops or {}))
+    control = _constraint_kwargs(json_schema, stop_criteria, scheduler=True)
+    generated_tokens = scheduler.generate(
+        input_ids,
+        max_new_tokens=max_tokens,
+        prefix_layers=prefix.layers if prefix is not None else None,
+        **_sampling_kwargs(temperature, greedy),
+        **control
+    )
+    criteria = control.get("stopping_criteria", [])
+    _record_call(stop_reason(criteria, generated_tokens, max_tokens, scheduler.eos_token_ids), len(generated_tokens), max_tokens)
+    return tokenizer.decode(generated_tokens, skip_special_tokens=True)
+
+def _generate_direct(prompt: str, max_tokens: int, temperature: float, greedy: bool = False,
+                     json_schema: dict = None, speculative: bool = False, stops: dict = None) -> str:
+    """One-prompt-per-call path: runs its own `model.generate` on a batch of one."""
     tokenizer, model, device = load_model()
     
-    inputs = tokenizer(prompt, return_tensors="pt").to(device)
+    if speculative:
+        # No prefix KV reuse here: assisted generation started from a partially
+        # filled cache does not reproduce the plain run (its first-step logits
+        # differ), so the whole prompt is prefilled and the drafts pay for it.
+        input_ids, prefix = tokenizer(prompt, return_tensors="pt")["input_ids"].to(device), None
+    else:
+        input_ids, prefix = _prepare_inputs(prompt)
     
+    stop_criteria = build_stop_criteria(tokenizer, input_ids.shape[1], **(stops or {}))
+    control = _constraint_kwargs(json_schema, stop_criteria)
     with torch.no_grad():
         outputs = model.generate(
-            **inputs,
+            **_generate_kwargs(input_ids, prefix),
             max_new_tokens=max_tokens,
-            do_sample=True,
-            temperature=temperature,
-            top_p=0.95
+            **_sampling_kwargs(temperature, greedy),
+            **control,
+            **(_speculative_kwargs() if speculative else {})
         )
         
-    response = tokenizer.decode(outputs[0], skip_special_tokens=True)
-    
-    # Simple post-processing to strip the prompt from the output if the model repeats it
-    # (Gemma sometimes repeats the prompt, but usually decode(skip_special_tokens=True) handles it.
-    # However, for safety, let's just return the raw decode and let logic filter if needed, 
-    # or try to split if the prompt is explicitly echoed.)
-    
-    # A cleaner approach for instruction models:
-    # If the prompt ends with specific token, we might parse. 
-    # For now, we return specific substring if prompt is echoed, 
-    # but 'decode' usually gives full text.
-    
-    # Heuristic: verify if response starts with prompt and strip it
-    if response.startswith(prompt):
-        response = response[len(prompt):].strip()
-        
-    # Another common pattern is "User: ... Model: ..." or similar.
-    # But since we control the prompt, we assume we get the full text.
-    # Let's rely on the prompt structure forcing clean output.
-    
-    # NOTE: The notebook used `response = call_llm(prompt)`.
-    # We strip the prompt part to return only the generated answer.
-    # Since `inputs` are passed, `generate` returns full sequence (prompt+completion).
-    
-    input_len = inputs["input_ids"].shape[1]
+    # `generate` returns the full sequence (prompt + completion), so decode only
+    # the new tokens instead of decoding everything and stripping the echoed prompt.
+    input_len = input_ids.shape[1]
     generated_tokens = outputs[0][input_len:]
-    clean_response = tokenizer.decode(generated_tokens, skip_special_tokens=True)
-    
+    generated = generated_tokens.tolist()
+    reason = stop_reason(control.get("stopping_criteria", []), generated, max_tokens, _eos_token_ids(model, tokenizer))
+    _record_call(reason, len(generated), max_tokens)
+    return tokenizer.decode(generated_tokens, skip_special_tokens=True)
+
+def stream_llm(prompt: str, max_tokens: int = 500, temperature: float = 0.1, greedy: bool = False):
+    """
+    Streaming version of call_llm: yields text as tokens are produced.
+
+    Generation starts as soon as this is called (on a worker thread, or on the
+    shared scheduler when batching is enabled), so the caller can render the
+    returned iterator whenever it is ready, e.g. with `st.write_stream`.
+    Greedy streams share the response cache with call_llm.
+    """
+    cache_key = _cache_key(prompt, max_tokens, temperature, greedy)
+    if cache_key is not None:
+        cached = get_response_cache().get(cache_key)
+        if cached is not None:
+            return iter([cached])
+
+    if config.MODEL_SERVER_URL:
+        stream = _log_first_chunk(get_model_client().stream_llm(
+            prompt, max_tokens=max_tokens, temperature=temperature, greedy=greedy
+        ))
+        return _cache_stream(stream, cache_key) if cache_key is not None else stream
+
+    tokenizer, model, device = load_model()
+    streamer = TextIteratorStreamer(tokenizer, skip_prompt=True, skip_special_tokens=True)
+    input_ids, prefix = _prepare_inputs(prompt)
+
+    if config.ENABLE_BATCHING:
+        get_scheduler().submit(
+            input_ids,
+            max_new_tokens=max_tokens,
+            prefix_layers=prefix.layers if prefix is not None else None,
+            streamer=streamer,
+            **_sampling_kwargs(temperature, greedy)
+        )
+    else:
+        def _worker():
+            try:
+                with torch.no_grad():
+                    model.generate(
+                        **_generate_kwargs(input_ids, prefix),
+                        max_new_tokens=max_tokens,
+                        streamer=streamer,
+                        **_sampling_kwargs(temperature, greedy)
+                    )
+            except Exception as e:
+                print(f"Streaming generation error: {e}")
+                streamer.end()
+
+        threading.Thread(target=_worker, daemon=True).start()
+
+    stream = _log_first_chunk(_filter_stream(streamer))
+    if cache_key is not None:
+        return _cache_stream(stream, cache_key)
+    return stream
+
+def _log_first_chunk(chunks):
+    first = True
+    for chunk in chunks:
+        if first:
+            _log_first_answer()
+            first = False
+        yield chunk
+
+def _cache_stream(chunks, cache_key: str):
+    """Passes chunks through and stores the full answer once the stream completes."""
+    parts = []
+    for chunk in chunks:
+        parts.append(chunk)
+        yield chunk
+    get_response_cache().put(cache_key, "".join(parts))
+
+def _is_safety_line(line: str) -> bool:
+    l = line.strip()
+    # Filter out lines that look like safety rules
+    # Catches: "Do NOT provide...", "Do NOT give...", "5. Do NOT..."
+    if "Do NOT" in l or "financial advice that is" in l or "legal or tax advice" in l:
+        return True
+    if "Provide a clear" in l and "response" in l:
+        return True
+    return False
+
+def _filter_stream(chunks):
+    """
+    Applies the safety-line filter to streamed text.
+    Text is released one line at a time, since a line can only be judged once it is complete.
+    """
+    raw = []
+    buffer = ""
+    emitted = False
+    blank_lines = 0
+
+    def _release(line):
+        nonlocal emitted, blank_lines
+        if _is_safety_line(line):
+            return
+        if not line.strip():
+            # Hold blank lines back so leading/trailing whitespace is dropped like in call_llm
+            blank_lines += 1
+            return
+        prefix = "\n" * (blank_lines + 1) if emitted else ""
+        blank_lines = 0
+        emitted = True
+        yield prefix + line
+
+    for chunk in chunks:
+        raw.append(chunk)
+        buffer += chunk
+        *lines, buffer = buffer.split("\n")
+        for line in lines:
+            yield from _release(line)
+    yield from _release(buffer)
+
+    # Same fallback as call_llm: better to show something than nothing
+    if not emitted and "".join(raw).strip():
+        yield "".join(raw).strip()
+
+def _clean_response(clean_response: str) -> str:
     # ---------------------------------------------------------
     # Safety Boilerplate Cleaner
     # ---------------------------------------------------------
     # Some models append "Do NOT provide..." constraints.
     # We use aggressive filtering to keep the UI clean.
     lines = clean_response.split('\n')
-    filtered_lines = []
-    for line in lines:
-        l = line.strip()
-        # Filter out lines that look like safety rules
-        # Catches: "Do NOT provide...", "Do NOT give...", "5. Do NOT..."
-        if "Do NOT" in l or "financial advice that is" in l or "legal or tax advice" in l:
-            continue
-        if "Provide a clear" in l and "response" in l:
-            continue
-        filtered_lines.append(line)
+    filtered_lines = [line for line in lines if not _is_safety_line(line)]
         
     final_output = "\n".join(filtered_lines).strip()
     
@@ -97,3 +675,7 @@ def call_llm(prompt: str, max_tokens: int = 500, temperature: float = 0.1) -> st
         return clean_response
         
     return final_output
+
+# Start loading as soon as the app imports this module (unless a model server does the work)
+if config.EAGER_LOAD and not config.MODEL_SERVER_URL:
+    _loader.start()
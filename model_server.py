@@ -0,0 +1,209 @@
+"""
+Local inference server: one resident model copy shared by every app worker.
+
+`@st.cache_resource` only shares the model inside one Streamlit process. Run
+this once per machine and point the app processes at it with
+FINSMART_MODEL_SERVER; their `call_llm` / `stream_llm` then forward here.
+
+Usage:
+    python model_server.py                                  # http://127.0.0.1:8765
+    python model_server.py --port 9000
+    python model_server.py --socket /tmp/finsmart.sock      # FINSMART_MODEL_SERVER=unix:///tmp/finsmart.sock
+
+Endpoints:
+    GET  /health    -> {"status": "loading" | "ready" | "error", ...}
+    GET  /queue     -> {"in_flight": n, "waiting": n, "active": n}
+    POST /generate  {"prompt", "max_tokens", "temperature", "greedy", "json_schema", "speculative",
+                     "stop", "stop_token_ids", "stop_when"} -> {"text": ..., "info": {"reason", "tokens_saved", ...}}
+    POST /stream    {"prompt", "max_tokens", "temperature", "greedy"} -> one {"text": chunk} JSON object per line
+"""
+import argparse
+import json
+import os
+import socketserver
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import config
+
+# This process *is* the server: never forward to another one. Requests from
+# all workers arrive concurrently, so they go through the batch scheduler.
+config.MODEL_SERVER_URL = None
+
+import model_loader  # noqa: E402  (config must be adjusted first)
+from stopping import predicate_from_spec  # noqa: E402
+
+_GENERATE_FIELDS = ("max_tokens", "temperature", "greedy", "json_schema", "speculative", "stop", "stop_token_ids")
+_STREAM_FIELDS = ("max_tokens", "temperature", "greedy")
+
+_started_at = time.time()
+_in_flight = 0
+_in_flight_lock = threading.Lock()
+
+
+class ModelRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # Needed for chunked streaming responses
+
+    def address_string(self):
+        # Unix-socket peers have no (host, port) address
+        return self.client_address[0] if isinstance(self.client_address, tuple) and self.client_address else "unix"
+
+    def log_message(self, format, *args):
+        pass  # One line per request is too noisy next to the model logs
+
+    # ---------- Routes ----------
+
+    def do_GET(self):
+        if self.path == "/health":
+            self._send_json(200, _health())
+        elif self.path == "/queue":
+            self._send_json(200, _queue_depth())
+        else:
+            self._send_json(404, {"error": f"Unknown endpoint {self.path}"})
+
+    def do_POST(self):
+        if self.path not in ("/generate", "/stream"):
+            self._send_json(404, {"error": f"Unknown endpoint {self.path}"})
+            return
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            payload = json.loads(self.rfile.read(length) or b"{}")
+            prompt = payload["prompt"]
+        except (ValueError, KeyError) as e:
+            self._send_json(400, {"error": f"Invalid request: {e}"})
+            return
+
+        global _in_flight
+        with _in_flight_lock:
+            _in_flight += 1
+        try:
+            if self.path == "/generate":
+                self._generate(prompt, payload)
+            else:
+                self._stream(prompt, payload)
+        finally:
+            with _in_flight_lock:
+                _in_flight -= 1
+
+    def _generate(self, prompt: str, payload: dict):
+        kwargs = {k: payload[k] for k in _GENERATE_FIELDS if k in payload}
+        try:
+            kwargs["stop_when"] = [predicate_from_spec(spec) for spec in payload.get("stop_when") or []]
+        except (ValueError, TypeError, AttributeError) as e:
+            self._send_json(400, {"error": f"Invalid request: {e}"})
+            return
+        try:
+            text = model_loader.call_llm(prompt, **kwargs)
+        except Exception as e:
+            print(f"Model server: generation error: {e}")
+            self._send_json(500, {"error": str(e)})
+            return
+        # call_llm ran on this handler thread, so its stop info is ours
+        self._send_json(200, {"text": text, "info": model_loader.last_call_info()})
+
+    def _stream(self, prompt: str, payload: dict):
+        kwargs = {k: payload[k] for k in _STREAM_FIELDS if k in payload}
+        try:
+            chunks = model_loader.stream_llm(prompt, **kwargs)
+        except Exception as e:
+            print(f"Model server: generation error: {e}")
+            self._send_json(500, {"error": str(e)})
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        try:
+            for chunk in chunks:
+                self._write_chunk({"text": chunk})
+        except (BrokenPipeError, ConnectionResetError):
+            return  # Client went away; the generation itself finishes on its own
+        except Exception as e:
+            print(f"Model server: streaming error: {e}")
+            self._write_chunk({"error": str(e)})
+        self.wfile.write(b"0\r\n\r\n")
+
+    # ---------- Helpers ----------
+
+    def _send_json(self, status: int, body: dict):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _write_chunk(self, event: dict):
+        data = (json.dumps(event) + "\n").encode("utf-8")
+        self.wfile.write(f"{len(data):X}\r\n".encode("ascii") + data + b"\r\n")
+        self.wfile.flush()
+
+
+class ThreadingUnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def server_bind(self):
+        socketserver.UnixStreamServer.server_bind(self)
+        self.server_name, self.server_port = "localhost", 0
+
+
+def _health() -> dict:
+    error = model_loader.model_load_error()
+    if error is not None:
+        status = "error"
+    elif model_loader.model_ready():
+        status = "ready"
+    else:
+        status = "loading"
+    return {
+        "status": status,
+        "error": str(error) if error is not None else None,
+        "model": config.MODEL_NAME,
+        "precision": config.PRECISION,
+        "batching": config.ENABLE_BATCHING,
+        "uptime_seconds": round(time.time() - _started_at, 1),
+    }
+
+
+def _queue_depth() -> dict:
+    depth = {"in_flight": _in_flight, "waiting": 0, "active": 0}
+    if config.ENABLE_BATCHING and model_loader.model_ready():
+        depth.update(model_loader.get_scheduler().queue_depth())
+    return depth
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--socket", help="Serve on this Unix socket path instead of TCP")
+    parser.add_argument("--no-batching", action="store_true", help="Serve one generation at a time")
+    args = parser.parse_args()
+
+    config.ENABLE_BATCHING = not args.no_batching
+    model_loader._loader.start()  # Accept connections while the model loads; /health reports progress
+
+    if args.socket:
+        if os.path.exists(args.socket):
+            os.remove(args.socket)
+        server = ThreadingUnixHTTPServer(args.socket, ModelRequestHandler)
+        address = f"unix://{os.path.abspath(args.socket)}"
+    else:
+        server = ThreadingHTTPServer((args.host, args.port), ModelRequestHandler)
+        address = f"http://{args.host}:{args.port}"
+
+    print(f"FinSmart model server listening on {address} (set FINSMART_MODEL_SERVER={address})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if args.socket and os.path.exists(args.socket):
+            os.remove(args.socket)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""
+Small dependency-graph executor for multi-step analyses.
+
+Stages declare which earlier stages they need; every stage whose inputs are
+ready runs on a thread pool, so stages that do not depend on each other
+overlap (e.g. rule-based steps next to a model call).
+Scheduling, progress callbacks and error handling all stay on the calling
+thread, which matters for Streamlit: only the script thread may touch `st.*`.
+
+    pipeline = Pipeline()
+    pipeline.add("extraction", lambda: extract(text), label="Identifying Income & Expenses...")
+    pipeline.add("savings", lambda extraction: analyze(extraction), deps=["extraction"])
+    results, timings = pipeline.run(on_progress=lambda labels: status.info(" | ".join(labels)))
+"""
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+
+class Stage:
+    def __init__(self, name: str, fn, deps=(), label: str = None):
+        self.name = name
+        self.fn = fn          # called with the results of `deps` as keyword arguments
+        self.deps = tuple(deps)
+        self.label = label or name
+
+
+class Pipeline:
+    def __init__(self, max_workers: int = 4):
+        self.max_workers = max_workers
+        self.stages = {}
+
+    def add(self, name: str, fn, deps=(), label: str = None) -> "Pipeline":
+        unknown = [d for d in deps if d not in self.stages]
+        if unknown:
+            # Stages must be added after their dependencies, which also rules out cycles
+            raise ValueError(f"Stage '{name}' depends on unknown stage(s): {', '.join(unknown)}")
+        if name in self.stages:
+            raise ValueError(f"Duplicate stage '{name}'")
+        self.stages[name] = Stage(name, fn, deps, label)
+        return self
+
+    def run(self, on_progress=None) -> tuple:
+        """
+        Runs every stage as soon as its dependencies finish.
+        `on_progress(labels)` is called on this thread with the labels of the
+        stages currently running. Returns (results, timings): results by stage
+        name and wall-clock seconds per stage plus "total".
+        """
+        results, timings = {}, {}
+        running = {}  # future -> (stage, start time)
+        pending = dict(self.stages)
+        start = time.perf_counter()
+
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="finsmart-pipeline") as pool:
+            while pending or running:
+                for name in [n for n, s in pending.items() if all(d in results for d in s.deps)]:
+                    stage = pending.pop(name)
+                    kwargs = {d: results[d] for d in stage.deps}
+                    running[pool.submit(_timed, stage.fn, kwargs)] = stage
+
+                if on_progress is not None:
+                    on_progress([s.label for s in running.values()])
+
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    stage = running.pop(future)
+                    try:
+                        results[stage.name], timings[stage.name] = future.result()
+                    except Exception:
+                        for other in running:
+                            other.cancel()
+                        raise
+
+        timings["total"] = round(time.perf_counter() - start, 3)
+        return results, timings
+
+
+def _timed(fn, kwargs: dict) -> tuple:
+    start = time.perf_counter()
+    value = fn(**kwargs)
+    return value, round(time.perf_counter() - start, 3)
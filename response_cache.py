@@ -0,0 +1,171 @@
+"""
+Two-tier cache for deterministic LLM responses.
+
+Tier 1 is an in-process LRU (dict lookups, shared by all Streamlit sessions).
+Tier 2 is a SQLite file, so answers survive restarts and are shared by every
+app process on the machine. Both tiers expire entries after a TTL and evict
+least-recently-used entries once they hold more than their size limit.
+
+Only deterministic (greedy) generations should be cached: a sampled answer is
+just one of many possible answers.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+def make_cache_key(prompt: str, model_name: str, max_tokens: int, temperature: float, decoding: str) -> str:
+    """Stable key over everything that changes the generated text."""
+    payload = json.dumps(
+        {"prompt": prompt, "model": model_name, "max_tokens": max_tokens,
+         "temperature": temperature, "decoding": decoding},
+        sort_keys=True, ensure_ascii=False
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    def __init__(self, db_path: str = None, max_memory_entries: int = 256,
+                 max_disk_entries: int = 5000, ttl_seconds: float = 7 * 24 * 3600):
+        self.max_memory_entries = max_memory_entries
+        self.max_disk_entries = max_disk_entries
+        self.ttl_seconds = ttl_seconds
+
+        self._memory = OrderedDict()  # key -> (value, created_at)
+        self._lock = threading.Lock()
+        self._counters = {"memory_hits": 0, "disk_hits": 0, "misses": 0,
+                          "expired": 0, "memory_evictions": 0, "disk_evictions": 0, "disk_errors": 0}
+
+        self._db = None
+        if db_path:
+            try:
+                os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+                self._db = sqlite3.connect(db_path, check_same_thread=False)
+                self._db.execute("PRAGMA journal_mode=WAL")
+                self._db.execute(
+                    "CREATE TABLE IF NOT EXISTS responses ("
+                    " key TEXT PRIMARY KEY, value TEXT NOT NULL,"
+                    " created_at REAL NOT NULL, last_access REAL NOT NULL)"
+                )
+                self._db.execute("CREATE INDEX IF NOT EXISTS idx_last_access ON responses(last_access)")
+                self._db.commit()
+            except sqlite3.Error as e:
+                print(f"Response cache: disk tier disabled ({e})")
+                self._db = None
+
+    # ---------- Public API ----------
+
+    def get(self, key: str):
+        now = time.time()
+        with self._lock:
+            item = self._memory.get(key)
+            if item is not None:
+                value, created_at = item
+                if now - created_at <= self.ttl_seconds:
+                    self._memory.move_to_end(key)
+                    self._counters["memory_hits"] += 1
+                    return value
+                del self._memory[key]
+                self._counters["expired"] += 1
+
+            if self._db is not None:
+                try:
+                    row = self._db.execute(
+                        "SELECT value, created_at FROM responses WHERE key = ?", (key,)
+                    ).fetchone()
+                    if row is not None:
+                        value, created_at = row
+                        if now - created_at <= self.ttl_seconds:
+                            self._db.execute("UPDATE responses SET last_access = ? WHERE key = ?", (now, key))
+                            self._db.commit()
+                            self._remember(key, value, created_at)
+                            self._counters["disk_hits"] += 1
+                            return value
+                        self._counters["expired"] += 1
+                        self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                        self._db.commit()
+                except sqlite3.Error as e:
+                    # e.g. "database is locked" while another app process writes:
+                    # answer a miss rather than failing the request; put() repopulates
+                    self._disk_failed("lookup", e)
+
+            self._counters["misses"] += 1
+            return None
+
+    def put(self, key: str, value: str):
+        now = time.time()
+        with self._lock:
+            self._remember(key, value, now)
+            if self._db is not None:
+                try:
+                    self._db.execute(
+                        "INSERT OR REPLACE INTO responses (key, value, created_at, last_access) VALUES (?, ?, ?, ?)",
+                        (key, value, now, now)
+                    )
+                    self._evict_disk()
+                    self._db.commit()
+                except sqlite3.Error as e:
+                    # The answer is already generated; keep it in memory only
+                    self._disk_failed("write", e)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self._counters["memory_hits"] + self._counters["disk_hits"] + self._counters["misses"]
+            hits = lookups - self._counters["misses"]
+            disk_entries = 0
+            if self._db is not None:
+                try:
+                    disk_entries = self._db.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+                except sqlite3.Error as e:
+                    self._disk_failed("count", e)
+            return {
+                **self._counters,
+                "hit_rate": round(hits / lookups, 3) if lookups else 0.0,
+                "memory_entries": len(self._memory),
+                "disk_entries": disk_entries,
+            }
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            if self._db is not None:
+                try:
+                    self._db.execute("DELETE FROM responses")
+                    self._db.commit()
+                except sqlite3.Error as e:
+                    self._disk_failed("clear", e)
+
+    # ---------- Internals ----------
+
+    def _disk_failed(self, operation: str, error: Exception):
+        """A disk-tier error only costs this call the disk tier; the memory tier keeps working."""
+        print(f"Response cache: disk {operation} skipped ({error})")
+        self._counters["disk_errors"] += 1
+        try:
+            self._db.rollback()
+        except sqlite3.Error:
+            pass
+
+    def _remember(self, key: str, value: str, created_at: float):
+        self._memory[key] = (value, created_at)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+            self._counters["memory_evictions"] += 1
+
+    def _evict_disk(self):
+        cutoff = time.time() - self.ttl_seconds
+        self._db.execute("DELETE FROM responses WHERE created_at < ?", (cutoff,))
+        count = self._db.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        overflow = count - self.max_disk_entries
+        if overflow > 0:
+            self._db.execute(
+                "DELETE FROM responses WHERE key IN ("
+                " SELECT key FROM responses ORDER BY last_access ASC LIMIT ?)",
+                (overflow,)
+            )
+            self._counters["disk_evictions"] += overflow
@@ -0,0 +1,209 @@
+"""
+Offline retrieval over the bundled finance / tax notes (data/knowledge/*.md).
+
+Notes are split into passages at their `##` sections (long sections are cut
+into ~120-word windows) and indexed with BM25. Each posting stores its
+precomputed BM25 weight, so a query is a handful of NumPy scatter-adds over
+the posting arrays of its terms: well under a millisecond for this corpus.
+
+An embedding index can be layered on top when a local sentence-transformers
+model is configured (FINSMART_RETRIEVAL_EMBEDDINGS); BM25 and embedding
+rankings are then merged with reciprocal-rank fusion.
+
+    passages = search("old vs new regime standard deduction", k=3)
+    prompt = format_context(passages) + question
+"""
+import glob
+import math
+import os
+import re
+import threading
+import time
+
+import numpy as np
+
+import config
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+_STOPWORDS = frozenset(
+    "a an and are as at be by can do does for from how i if in is it its my of on or should "
+    "than that the this to was what when which who why will with you your me we our".split()
+)
+# Reciprocal-rank fusion constant (the usual value from the RRF paper)
+_RRF_K = 60
+
+
+def tokenize(text: str) -> list:
+    """Lowercase alphanumeric tokens without stopwords; plural "s" is dropped ("funds" -> "fund")."""
+    tokens = []
+    for token in _TOKEN_RE.findall(text.lower()):
+        if token in _STOPWORDS:
+            continue
+        if len(token) > 3 and token.endswith("s") and not token.endswith("ss"):
+            token = token[:-1]
+        tokens.append(token)
+    return tokens
+
+
+def chunk_markdown(text: str, source: str, max_words: int = 120) -> list:
+    """[{title, text, source}] passages: one per `##` section, long sections split into windows."""
+    doc_title = source
+    sections, current, heading = [], [], None
+    for line in text.splitlines():
+        if line.startswith("# "):
+            doc_title = line[2:].strip()
+        elif line.startswith("## "):
+            if current:
+                sections.append((heading, current))
+            heading, current = line[3:].strip(), []
+        elif line.strip():
+            current.append(line.strip())
+    if current:
+        sections.append((heading, current))
+
+    passages = []
+    for heading, lines in sections:
+        title = f"{doc_title}: {heading}" if heading else doc_title
+        words = " ".join(lines).split()
+        for start in range(0, len(words), max_words):
+            passages.append({"title": title, "text": " ".join(words[start:start + max_words]), "source": source})
+    return passages
+
+
+class KnowledgeIndex:
+    def __init__(self, passages: list, k1: float = 1.5, b: float = 0.75, embedding_model: str = None):
+        self.passages = passages
+        start = time.perf_counter()
+
+        # Titles are indexed with the body so section names ("Section 80C") count as evidence
+        docs = [tokenize(p["title"] + " " + p["text"]) for p in passages]
+        lengths = np.array([len(d) for d in docs], dtype=np.float64)
+        avg_length = lengths.mean() if len(docs) else 0.0
+        postings = {}
+        for doc_id, tokens in enumerate(docs):
+            counts = {}
+            for token in tokens:
+                counts[token] = counts.get(token, 0) + 1
+            for token, tf in counts.items():
+                postings.setdefault(token, []).append((doc_id, tf))
+
+        n = len(docs)
+        self._postings = {}
+        for token, entries in postings.items():
+            ids = np.array([d for d, _ in entries], dtype=np.int32)
+            tf = np.array([t for _, t in entries], dtype=np.float64)
+            idf = math.log(1 + (n - len(ids) + 0.5) / (len(ids) + 0.5))
+            norm = k1 * (1 - b + b * lengths[ids] / avg_length)
+            self._postings[token] = (ids, idf * tf * (k1 + 1) / (tf + norm))
+
+        self._encoder = None
+        self._embeddings = None
+        if embedding_model:
+            self._build_embeddings(embedding_model)
+        self.build_seconds = time.perf_counter() - start
+
+    @classmethod
+    def from_directory(cls, directory: str, **kwargs) -> "KnowledgeIndex":
+        passages = []
+        for path in sorted(glob.glob(os.path.join(directory, "*.md"))):
+            with open(path, encoding="utf-8") as f:
+                passages.extend(chunk_markdown(f.read(), os.path.basename(path)))
+        return cls(passages, **kwargs)
+
+    # ---------- Search ----------
+
+    def bm25_scores(self, query: str) -> np.ndarray:
+        scores = np.zeros(len(self.passages))
+        for token in set(tokenize(query)):
+            posting = self._postings.get(token)
+            if posting is not None:
+                scores[posting[0]] += posting[1]
+        return scores
+
+    def search(self, query: str, k: int = 3, min_score: float = 0.0, relative_cutoff: float = 0.4,
+               max_words: int = None) -> list:
+        """
+        Top-k passages as [{title, text, source, score}], best first. Passages
+        scoring below `relative_cutoff` x the best BM25 score are dropped, so
+        weakly related sections do not pad the prompt. With `max_words`, later
+        passages are only kept while the total stays within that many words
+        (the best passage is always kept).
+        """
+        scores = self.bm25_scores(query)
+        floor = max(min_score, scores.max(initial=0.0) * relative_cutoff)
+        ranked = [i for i in np.argsort(-scores, kind="stable")[:max(k, 1) * 4] if scores[i] > floor]
+        if self._embeddings is not None:
+            ranked = self._fuse(ranked, self._embedding_ranking(query))
+            results = [{**self.passages[i], "score": s} for i, s in ranked[:k]]
+        else:
+            results = [{**self.passages[i], "score": float(scores[i])} for i in ranked[:k]]
+        return _within_budget(results, max_words) if max_words else results
+
+    # ---------- Optional embeddings ----------
+
+    def _build_embeddings(self, model_name: str):
+        try:
+            from sentence_transformers import SentenceTransformer
+        except ImportError:
+            print("Retrieval: sentence-transformers is not installed, using BM25 only")
+            return
+        try:
+            self._encoder = SentenceTransformer(model_name)
+            texts = [p["title"] + ". " + p["text"] for p in self.passages]
+            self._embeddings = self._encoder.encode(texts, normalize_embeddings=True, convert_to_numpy=True)
+        except Exception as e:
+            print(f"Retrieval: embedding index disabled ({e})")
+            self._encoder = None
+            self._embeddings = None
+
+    def _embedding_ranking(self, query: str) -> list:
+        vector = self._encoder.encode([query], normalize_embeddings=True, convert_to_numpy=True)[0]
+        return list(np.argsort(-(self._embeddings @ vector)))
+
+    @staticmethod
+    def _fuse(*rankings) -> list:
+        """Reciprocal-rank fusion: [(passage index, fused score)], best first."""
+        fused = {}
+        for ranking in rankings:
+            for rank, i in enumerate(ranking):
+                fused[i] = fused.get(i, 0.0) + 1 / (_RRF_K + rank + 1)
+        return sorted(fused.items(), key=lambda item: -item[1])
+
+
+def _within_budget(passages: list, max_words: int) -> list:
+    """Best-first passages, stopping at the first one that would take the total past `max_words`."""
+    kept, words = [], 0
+    for passage in passages:
+        words += len(passage["text"].split())
+        if kept and words > max_words:
+            break
+        kept.append(passage)
+    return kept
+
+
+def format_context(passages: list) -> str:
+    """Passages as a CONTEXT block for a prompt ("" when there are none)."""
+    if not passages:
+        return ""
+    blocks = "\n\n".join(f"[{p['title']}]\n{p['text']}" for p in passages)
+    return f"\n    CONTEXT:\n{blocks}\n"
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_knowledge_index() -> KnowledgeIndex:
+    """Process-wide index over config.KNOWLEDGE_DIR, built on first use."""
+    global _index
+    with _index_lock:
+        if _index is None:
+            _index = KnowledgeIndex.from_directory(config.KNOWLEDGE_DIR, embedding_model=config.RETRIEVAL_EMBEDDING_MODEL)
+            print(f"Retrieval: indexed {len(_index.passages)} passages in {_index.build_seconds * 1000:.1f} ms")
+    return _index
+
+
+def search(query: str, k: int = None, max_words: int = None) -> list:
+    """Top passages for a question from the bundled knowledge notes, within the configured word budget."""
+    return get_knowledge_index().search(query, k or config.RETRIEVAL_TOP_K,
+                                        max_words=max_words or config.RETRIEVAL_MAX_WORDS)
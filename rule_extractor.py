@@ -0,0 +1,232 @@
+"""
+Rule-based fast path for income and expense extraction.
+
+Like `calculate_deterministic_emi`, this answers common narrative forms without
+touching the model:
+
+    "I earn 50k, spent 5,000 on food and rent 12k"
+    "salary 1.2 lakh per month, ₹300 on movie, netflix 649"
+
+It understands Indian numbering (k, lakh, crore, LPA) and returns a confidence
+score. Callers use the parse only when it is confident and fall back to the LLM
+otherwise (unknown merchants, investments, negations, unexplained numbers...).
+"""
+import re
+
+# Category keywords, checked in order (multi-word phrases before single words)
+CATEGORY_KEYWORDS = [
+    ("Utilities", ["phone bill", "mobile bill", "mobile recharge", "electricity", "water bill", "gas bill",
+                   "gas cylinder", "internet", "wifi", "wi-fi", "broadband", "recharge", "utility", "utilities",
+                   "maintenance", "bill", "bills"]),
+    ("Subscription", ["netflix", "prime video", "amazon prime", "hotstar", "spotify", "youtube premium",
+                      "subscription", "subscriptions", "ott"]),
+    ("Rent", ["house rent", "rent", "pg", "hostel", "lease"]),
+    ("Food", ["groceries", "grocery", "food", "restaurant", "restaurants", "dining", "swiggy", "zomato", "lunch",
+              "dinner", "breakfast", "snacks", "cafe", "coffee", "eating out", "meals", "pizza", "vegetables",
+              "milk", "fruits"]),
+    ("Travel", ["petrol", "fuel", "diesel", "cab", "cabs", "uber", "ola", "taxi", "auto", "bus", "train", "metro",
+                "flight", "flights", "trip", "commute", "transport", "travel", "travelling", "parking", "toll"]),
+    ("Healthcare", ["medicine", "medicines", "doctor", "hospital", "medical", "health", "pharmacy", "gym",
+                    "clinic", "dentist", "health insurance"]),
+    ("Education", ["school", "college", "tuition", "fees", "fee", "course", "courses", "books", "education",
+                   "coaching", "exam", "classes"]),
+    ("Shopping", ["shopping", "clothes", "clothing", "shoes", "amazon", "flipkart", "myntra", "gadgets",
+                  "electronics", "dress", "gifts", "gift"]),
+    ("Other", ["movie", "movies", "emi", "loan", "entertainment", "party", "outing", "donation", "charity"]),
+]
+
+INCOME_WORDS = ("earn", "earning", "earnings", "salary", "income", "make", "making", "stipend", "take home",
+                "take-home", "get paid", "ctc", "package", "pension")
+EXPENSE_WORDS = ("spent", "spend", "spending", "paid", "pay", "paying", "bought", "buy", "cost", "costs",
+                 "expense", "expenses", "bill", "rent", "emi", "fees")
+UNCERTAIN_WORDS = ("invest", "investment", "sip", "saving", "save", "saved", "lent", "borrowed", "gift from",
+                   "bonus", "refund", "cashback", "loan of", "got back", "received")
+NEGATIONS = ("didn't", "did not", "don't", "do not", "never", "no longer", "stopped")
+ANNUAL_WORDS = ("per year", "a year", "per annum", "annually", "annual", "yearly", "lpa", "ctc", "package")
+
+STOPWORDS = {
+    "i", "we", "my", "our", "me", "the", "a", "an", "of", "on", "for", "is", "was", "are", "and", "to", "in", "at",
+    "spent", "spend", "spending", "paid", "pay", "paying", "bought", "buy", "cost", "costs", "around", "about",
+    "approx", "approximately", "roughly", "nearly", "also", "then", "total", "towards", "some", "this", "last",
+    "each", "every", "per", "month", "monthly", "rs", "inr", "rupees", "rupee", "had", "have", "has", "it", "went",
+    "got", "spends", "expense", "expenses", "amount", "of", "like", "just", "only", "with", "by", "from", "mine",
+}
+
+_UNITS = {
+    "k": 1e3, "thousand": 1e3, "l": 1e5, "lakh": 1e5, "lakhs": 1e5, "lac": 1e5, "lacs": 1e5, "lpa": 1e5,
+    "cr": 1e7, "crore": 1e7, "crores": 1e7, "m": 1e6, "mn": 1e6, "million": 1e6,
+}
+
+_AMOUNT = re.compile(
+    r"(?P<cur>₹|\$|€|£|\brs\b|\binr\b|\busd\b)?\s*"
+    r"(?P<num>\d+(?:,\d+)*(?:\.\d+)?)"
+    r"(?:\s*(?P<unit>k|thousand|lakhs?|lacs?|lpa|l|crores?|cr|million|mn|m)\b)?"
+    r"(?:\s*(?P<cur2>rupees?|rs|inr|dollars?|usd|/-))?",
+    re.IGNORECASE
+)
+# Numbers that are not money: percentages, durations, counts
+_NOT_MONEY = re.compile(r"\s*(%|percent|years?\b|yrs?\b|months?\b|days?\b|weeks?\b|times\b|x\b|kids?\b|people\b|members?\b)", re.IGNORECASE)
+# Payment-rail and bank noise in statement descriptions that says nothing about the merchant
+DESCRIPTION_NOISE = (
+    r"\b(?:upi|pos|neft|imps|rtgs|ach|nach|ecs|txn|trf|transfer|ref|refno|ecom|debit|dr|cr|"
+    r"card|visa|mastercard|rupay|ok(?:icici|sbi|axis|hdfcbank)|ybl|ibl|axl|paytm|payu|razorpay|pvt|ltd|india|in|x{2,})\b"
+)
+_DESCRIPTION_NOISE = re.compile(DESCRIPTION_NOISE)
+_CLAUSE_SPLIT = re.compile(r"[;\n]|,(?!\d{2})|\.(?!\d)|\b(?:and|then|plus|also|but|while|whereas)\b", re.IGNORECASE)
+
+
+def parse_amount(text: str):
+    """Parses a single money expression such as '50k', '5,000', '1.2 lakh' or '₹300'. Returns None if absent."""
+    amounts = _find_amounts(text)
+    return amounts[0][0] if amounts else None
+
+
+def detect_currency(text: str) -> str:
+    t = text.lower()
+    if "$" in t or re.search(r"\b(usd|dollars?)\b", t):
+        return "USD"
+    if "€" in t or re.search(r"\b(eur|euros?)\b", t):
+        return "EUR"
+    if "£" in t or re.search(r"\b(gbp|pounds?)\b", t):
+        return "GBP"
+    return "INR"
+
+
+def normalize_description(description: str) -> str:
+    """Merchant key for a description: 'UPI/123/SWIGGY*ORDER/okicici' -> 'swiggy order'."""
+    raw = str(description).lower()
+    text = re.sub(r"[^a-z]+", " ", raw)
+    text = _DESCRIPTION_NOISE.sub(" ", text)
+    text = re.sub(r"\b[a-z]\b", " ", text)
+    text = re.sub(r"\s+", " ", text).strip()
+    return text or raw.strip()
+
+
+def categorize_description(description: str, memo=None):
+    """
+    Returns (category, matched) for a description. With a merchant memo (see
+    merchant_memo) the order is: user corrections, the keyword table, exact
+    repeats of merchants the model categorized, then fuzzy model matches.
+    A fuzzy model match is only a guess, so it does not count as matched.
+    """
+    remembered = memo.match(description) if memo is not None else None
+    if remembered is not None and remembered[1]:
+        return remembered[0], True
+    text = f" {description.lower()} "
+    for category, keywords in CATEGORY_KEYWORDS:
+        for k in keywords:
+            if f" {k} " in text:
+                return category, True
+    if remembered is not None:
+        return remembered[0], remembered[2]
+    return "Other", False
+
+
+def parse_financial_text(text: str, memo=None) -> dict:
+    """
+    Deterministically extracts income and categorized expenses from a narrative.
+    Returns {income, currency, expenses, confidence} in the same shape as
+    extract_financials_from_text, plus a 0..1 confidence score.
+    Merchants remembered in `memo` count as known categories.
+    """
+    normalized = re.sub(r"\brs\.\s*", "rs ", text, flags=re.IGNORECASE)
+    income = 0
+    expenses = []
+    confidence = 1.0
+    income_clauses = 0
+
+    for clause in _CLAUSE_SPLIT.split(normalized):
+        clause = clause.strip()
+        if not clause:
+            continue
+        lower = clause.lower()
+        amounts = _find_amounts(clause)
+
+        # Digits we could not read as money ("for 3 months", "2 kids") make the parse suspect
+        leftover = lower
+        for _, (start, end) in reversed(amounts):
+            leftover = leftover[:start] + leftover[end:]
+        if any(c.isdigit() for c in leftover):
+            confidence *= 0.7
+
+        if not amounts:
+            if _mentions(lower, EXPENSE_WORDS + INCOME_WORDS):
+                confidence *= 0.6  # A money statement without a number ("spent a lot on food")
+            continue
+
+        if _mentions(lower, NEGATIONS + UNCERTAIN_WORDS):
+            confidence *= 0.5
+            continue
+        if len(amounts) > 1:
+            confidence *= 0.6  # Ambiguous: which amount belongs to what?
+
+        is_income = _mentions(lower, INCOME_WORDS)
+        if is_income and _mentions(lower, ("spent", "spend", "paid", "bought")):
+            confidence *= 0.5  # "paid 5000 as the maid's salary": income or expense?
+            continue
+
+        if is_income:
+            value, span = amounts[0]
+            if _mentions(lower, ANNUAL_WORDS):
+                value = value / 12
+            income += int(round(value))
+            income_clauses += 1
+            continue
+
+        for value, span in amounts:
+            description = _describe(clause, span)
+            category, matched = categorize_description(description or lower, memo)
+            if not description:
+                confidence *= 0.5
+            elif not matched:
+                confidence *= 0.85
+            if not (matched or _mentions(lower, EXPENSE_WORDS)):
+                confidence *= 0.8  # Neither a known category nor a spending verb
+            expenses.append({"description": description, "amount": _number(value), "category": category})
+
+    if income_clauses > 1:
+        confidence *= 0.9
+    if not income and not expenses:
+        confidence = 0.0
+
+    return {
+        "income": income,
+        "currency": detect_currency(text),
+        "expenses": expenses,
+        "confidence": round(confidence, 3)
+    }
+
+
+# ---------- Helpers ----------
+
+def _mentions(text: str, words) -> bool:
+    """Whole-word match, so 'learning' does not count as 'earn'."""
+    return any(re.search(rf"(?<!\w){re.escape(w)}(?!\w)", text) for w in words)
+
+def _find_amounts(text: str) -> list:
+    """Returns [(value, (start, end)), ...] for money-like numbers in the text."""
+    found = []
+    for m in _AMOUNT.finditer(text):
+        if _NOT_MONEY.match(text, m.end("num") if not m.group("unit") else m.end()):
+            continue
+        try:
+            value = float(m.group("num").replace(",", ""))
+        except ValueError:
+            continue
+        unit = (m.group("unit") or "").lower()
+        value *= _UNITS.get(unit, 1)
+        found.append((value, m.span()))
+    return found
+
+
+def _describe(clause: str, span: tuple) -> str:
+    """Description for the amount at `span`: words after 'on/for/at', else the words around it."""
+    after = clause[span[1]:]
+    m = re.match(r"\s*(?:on|for|towards|at|in)\s+(.+)", after, re.IGNORECASE)
+    words = m.group(1) if m else clause[:span[0]] + " " + after
+    tokens = [w for w in re.findall(r"[a-zA-Z][a-zA-Z'\-]*", words) if w.lower() not in STOPWORDS]
+    return " ".join(tokens[:4]).lower()
+
+
+def _number(value: float):
+    return int(value) if float(value).is_integer() else round(value, 2)
@@ -1,8 +1,19 @@
 import json
-from model_loader import call_llm
+import config
+from model_loader import call_llm, register_prompt_prefix
+from rule_extractor import parse_financial_text
+from transactions import TransactionTable, to_paise, to_rupees
+
+# Decoding is constrained to this shape, so the response is always a parseable object
+INCOME_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "income": {"type": ["integer", "null"]}
+    }
+}
 
-def extract_income_prompt(text):
-    return f"""
+# Fixed instructions come first so their KV state can be reused across calls
+INCOME_PROMPT_PREFIX = register_prompt_prefix("""
     You are a financial information extractor.
 
     Extract ONLY the total monthly income mentioned in the text.
@@ -13,16 +24,19 @@ def extract_income_prompt(text):
     - Ignore expenses.
     - If no income is found, return null.
 
+    Output format:
+    {"income": number_or_null}
+""")
+
+def extract_income_prompt(text):
+    return INCOME_PROMPT_PREFIX + f"""
     Text:
     {text}
-
-    Output format:
-    {{"income": number_or_null}}
     """
 
 def extract_income_from_text(text: str) -> int:
     prompt = extract_income_prompt(text)
-    response_str = call_llm(prompt) # This returns a JSON string
+    response_str = call_llm(prompt, max_tokens=60, greedy=True, json_schema=INCOME_SCHEMA) # This returns a JSON string
     
     try:
         # Find JSON block
@@ -38,7 +52,7 @@ def extract_income_from_text(text: str) -> int:
     except json.JSONDecodeError:
         # If model fails to give JSON, fallback to assumption logic or error
         # In notebook it raises error, but for app robustness we might default to 0
-        print(f"DEBUG: Failed to parse income JSON. Raw: {response_str}")
+        print("Income extraction: model reply was not valid JSON, using 0")
         return 0 
 
     income_value = response_dict.get("income")
@@ -47,33 +61,41 @@ def extract_income_from_text(text: str) -> int:
 
     return int(income_value)
 
-def compute_expense_summary(categorized_expenses: list) -> dict:
-    total_expense = 0
-    category_wise = {}
-
-    for txn in categorized_expenses:
-        amt = txn["amount"]
-        cat = txn["category"]
-
-        total_expense += amt
-        category_wise[cat] = category_wise.get(cat, 0) + amt
+def compute_expense_summary(categorized_expenses) -> dict:
+    """
+    Totals per category. Accepts a TransactionTable or a list of
+    {description, amount, category} dicts; sums run over int64 paise, so
+    money adds up exactly.
+    """
+    table = categorized_expenses
+    if not isinstance(table, TransactionTable):
+        table = TransactionTable.from_records(categorized_expenses)
 
     return {
-        "total_expense": total_expense,
-        "category_breakdown": category_wise
+        "total_expense": table.total(),
+        "category_breakdown": table.sum_by_category()
     }
 
-def savings_analysis(categorized_expenses: list, income_text: str) -> dict:
-    # 1. Extract income using LLM
-    income = extract_income_from_text(income_text)
+def savings_analysis(categorized_expenses, income_text: str, income: int = None) -> dict:
+    # 1. Extract income (skipped when the caller already extracted it).
+    # The rule-based parser answers first; the LLM only runs when it is unsure.
+    if income is None:
+        parsed = parse_financial_text(income_text)
+        if parsed["confidence"] >= config.FAST_PATH_MIN_CONFIDENCE and parsed["income"] > 0:
+            income = parsed["income"]
+        else:
+            income = extract_income_from_text(income_text)
 
-    # 2. Compute expenses
-    expense_summary = compute_expense_summary(categorized_expenses)
+    # 2. Compute expenses (columnar, in paise)
+    table = categorized_expenses
+    if not isinstance(table, TransactionTable):
+        table = TransactionTable.from_records(categorized_expenses)
+    expense_summary = compute_expense_summary(table)
 
     total_expense = expense_summary["total_expense"]
     
-    # Logic: Savings = Income - Expenses
-    savings = income - total_expense
+    # Logic: Savings = Income - Expenses (in paise, so no float drift)
+    savings = to_rupees(int(to_paise(income)) - table.total_paise())
     
     # Avoid div by zero
     if income > 0:
@@ -88,3 +110,54 @@ def savings_analysis(categorized_expenses: list, income_text: str) -> dict:
         "savings_percentage": savings_rate,
         "expense_breakdown_by_category": expense_summary["category_breakdown"]
     }
+
+def savings_analysis_from_history(user_id: str, income: int, months: int = None, store=None) -> dict:
+    """
+    Savings analysis over the stored transaction history instead of a single
+    narrative. Only column scans over the last `months` partitions are read;
+    nothing is re-extracted. Figures are monthly averages over the months that
+    have data, in the same shape as savings_analysis, plus the monthly series.
+    """
+    from transaction_store import TransactionStore, months_back
+
+    store = store or TransactionStore()
+    start_month = months_back(months or config.TRANSACTION_HISTORY_MONTHS)
+    summary = store.summary(user_id, start_month=start_month)
+    covered = len(summary["months"]) or 1
+
+    monthly_expense = summary["total_expense"] / covered
+    savings = income - monthly_expense
+    return {
+        "income": income,
+        "total_expenses": round(monthly_expense, 2),
+        "savings": round(savings, 2),
+        "savings_percentage": round((savings / income) * 100, 2) if income > 0 else 0.0,
+        "expense_breakdown_by_category": {
+            cat: round(amt / covered, 2) for cat, amt in summary["category_breakdown"].items()
+        },
+        "months_covered": summary["months"],
+        "month_over_month": store.month_over_month(user_id, start_month=start_month)
+    }
+
+def savings_analysis_for_user(categorized_expenses, income_text: str, user_id: str, income: int = None,
+                              store=None) -> dict:
+    """
+    savings_analysis that also keeps history: this analysis replaces the
+    user's transactions for the current month, and once earlier months are
+    stored the result is savings_analysis_from_history over all of them.
+    Storage problems never fail the analysis; it falls back to this month alone.
+    """
+    result = savings_analysis(categorized_expenses, income_text, income=income)
+    if not categorized_expenses:
+        return result
+    try:
+        from transaction_store import TransactionStore, months_back
+
+        store = store or TransactionStore()
+        store.append(user_id, categorized_expenses, replace=True)
+        months = store.summary(user_id, start_month=months_back(config.TRANSACTION_HISTORY_MONTHS))["months"]
+        if len(months) > 1:
+            return savings_analysis_from_history(user_id, result["income"], store=store)
+    except Exception as e:
+        print(f"Transaction history unavailable, using this analysis only: {e}")
+    return result
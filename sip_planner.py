@@ -0,0 +1,201 @@
+"""
+SIP (systematic investment plan) and goal-based savings planner.
+
+Closed-form annuity maths, vectorized with NumPy broadcasting so any argument
+can be an array (a grid of rates x horizons is one call):
+
+    sip_future_value(10000, 12, 15)                        # level SIP
+    sip_future_value(10000, 12, 15, step_up=10)            # contribution grows 10% every year
+    required_sip(1_00_00_000, 12, 15)                      # monthly SIP for a ₹1 Cr goal
+    months_to_goal(50_00_000, 15000, 12)                   # how long at ₹15k/month
+    sensitivity_grid(10000, [8, 10, 12], [5, 10, 20])      # FV table, rates x years
+
+Conventions follow the usual Indian SIP calculators: rates are annual percent
+compounded monthly (r = rate / 12), contributions are made at the start of
+each month, and step-ups apply once a year.
+
+`plan_from_cash_flow` drives these from analyze_cash_flow_and_savings output,
+and `parse_sip_query` reads the inputs out of a question.
+"""
+import re
+
+import numpy as np
+
+# Horizons past this are treated as unreachable by months_to_goal
+MAX_MONTHS = 1200
+DEFAULT_RATE = 12.0
+GRID_RATES = (8, 10, 12, 14)
+GRID_YEARS = (5, 10, 15, 20, 25)
+
+
+def _annuity_due(r, n):
+    """Future value of 1 paid at the start of each of n months at monthly rate r."""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(r > 0, ((1 + r) ** n - 1) / np.where(r > 0, r, 1) * (1 + r), n)
+
+
+def _unit_future_value(annual_rate, months, step_up):
+    """Future value of a SIP of 1/month (stepped up yearly) over `months` months."""
+    r = np.asarray(annual_rate, dtype=np.float64) / 1200
+    months = np.asarray(months, dtype=np.float64)
+    g = np.asarray(step_up, dtype=np.float64) / 100
+    full_years, rest = np.floor(months / 12), np.mod(months, 12)
+
+    year_block = _annuity_due(r, 12)       # value at year end of 12 payments of 1
+    growth = (1 + r) ** 12
+    ratio = (1 + g) / growth
+    # Sum over full years k of (1+g)^k * year_block * growth^(Y-1-k): a geometric series
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        series = np.where(
+            np.isclose(ratio, 1.0),
+            full_years,
+            (1 - ratio ** full_years) / np.where(np.isclose(ratio, 1.0), 1.0, 1 - ratio),
+        )
+    full_value = year_block * growth ** np.maximum(full_years - 1, 0) * series * (full_years > 0)
+    # Part-year tail: the grown-up contribution for `rest` months
+    tail = (1 + g) ** full_years * _annuity_due(r, rest)
+    return full_value * (1 + r) ** rest + tail
+
+
+def sip_future_value(monthly, annual_rate, years, step_up=0.0, initial=0.0):
+    """
+    Corpus after `years` of investing `monthly` (plus an `initial` lump sum) at
+    `annual_rate` percent, with the SIP raised by `step_up` percent every year.
+    """
+    months = np.rint(np.asarray(years, dtype=np.float64) * 12)
+    r = np.asarray(annual_rate, dtype=np.float64) / 1200
+    value = (np.asarray(monthly, dtype=np.float64) * _unit_future_value(annual_rate, months, step_up)
+             + np.asarray(initial, dtype=np.float64) * (1 + r) ** months)
+    return value if value.ndim else float(value)
+
+
+def required_sip(goal, annual_rate, years, step_up=0.0, initial=0.0):
+    """Starting monthly SIP needed to reach `goal` (0 where the lump sum alone gets there)."""
+    months = np.rint(np.asarray(years, dtype=np.float64) * 12)
+    r = np.asarray(annual_rate, dtype=np.float64) / 1200
+    shortfall = np.asarray(goal, dtype=np.float64) - np.asarray(initial, dtype=np.float64) * (1 + r) ** months
+    with np.errstate(divide="ignore", invalid="ignore"):
+        value = np.maximum(shortfall, 0.0) / _unit_future_value(annual_rate, months, step_up)
+    return value if value.ndim else float(value)
+
+
+def months_to_goal(goal, monthly, annual_rate, step_up=0.0, initial=0.0):
+    """
+    Months of investing until the corpus first reaches `goal` (vectorized
+    bisection over whole months). NaN where it takes longer than MAX_MONTHS.
+    """
+    goal, monthly, annual_rate, step_up, initial = np.broadcast_arrays(
+        *(np.asarray(v, dtype=np.float64) for v in (goal, monthly, annual_rate, step_up, initial))
+    )
+    lo = np.zeros(goal.shape)
+    hi = np.full(goal.shape, float(MAX_MONTHS))
+    reachable = sip_future_value(monthly, annual_rate, hi / 12, step_up, initial) >= goal
+    while np.any(hi - lo > 1):
+        mid = np.floor((lo + hi) / 2)
+        reached = sip_future_value(monthly, annual_rate, mid / 12, step_up, initial) >= goal
+        hi = np.where(reached, mid, hi)
+        lo = np.where(reached, lo, mid)
+    result = np.where(goal <= initial, 0.0, np.where(reachable, hi, np.nan))
+    return result if result.ndim else float(result)
+
+
+def sensitivity_grid(monthly, rates=GRID_RATES, years=GRID_YEARS, step_up=0.0, initial=0.0) -> dict:
+    """Corpus for every (rate, horizon) pair: {rates, years, future_value (len(rates) x len(years)), invested}."""
+    rates = np.asarray(rates, dtype=np.float64).reshape(-1, 1)
+    horizons = np.asarray(years, dtype=np.float64).reshape(1, -1)
+    return {
+        "rates": rates.ravel(),
+        "years": horizons.ravel(),
+        "future_value": sip_future_value(monthly, rates, horizons, step_up, initial),
+        "invested": sip_future_value(monthly, 0.0, horizons, step_up, initial).ravel(),
+    }
+
+
+def required_sip_grid(goal, rates=GRID_RATES, years=GRID_YEARS, step_up=0.0, initial=0.0) -> dict:
+    """Monthly SIP needed for `goal` for every (rate, horizon) pair."""
+    rates = np.asarray(rates, dtype=np.float64).reshape(-1, 1)
+    horizons = np.asarray(years, dtype=np.float64).reshape(1, -1)
+    return {
+        "rates": rates.ravel(),
+        "years": horizons.ravel(),
+        "required_sip": required_sip(goal, rates, horizons, step_up, initial),
+    }
+
+
+def plan_from_cash_flow(cash_flow_summary: dict, goal: float = None, years: float = None,
+                        annual_rate: float = DEFAULT_RATE, step_up: float = 0.0, initial: float = 0.0) -> dict:
+    """
+    SIP plan for the net savings in an analyze_cash_flow_and_savings summary.
+
+    Always returns the corpus grid for investing all of net_savings. With a goal,
+    also the SIP needed over `years` (and its share of net savings) and how long
+    net savings alone would take.
+    """
+    net_savings = max(float(cash_flow_summary.get("net_savings") or 0), 0.0)
+    plan = {
+        "net_savings": net_savings,
+        "grid": sensitivity_grid(net_savings, step_up=step_up, initial=initial),
+    }
+    if goal:
+        plan["goal"] = goal
+        if years:
+            need = required_sip(goal, annual_rate, years, step_up, initial)
+            plan["required_sip"] = need
+            plan["share_of_savings"] = need / net_savings * 100 if net_savings else None
+        plan["months_at_net_savings"] = months_to_goal(goal, net_savings, annual_rate, step_up, initial)
+    return plan
+
+
+# ---------------------------------------------------------
+# Query parsing
+# ---------------------------------------------------------
+
+_AMOUNT = r"(?:rs\.?|inr|₹)\s*(\d+(?:\.\d+)?)\s*(lakhs?|lacs?|l\b|crores?|cr\b|k\b)?|(\d+(?:\.\d+)?)\s*(lakhs?|lacs?|l\b|crores?|cr\b|k\b)?"
+_UNITS = {"lakh": 1e5, "lac": 1e5, "l": 1e5, "crore": 1e7, "cr": 1e7, "k": 1e3}
+_MONTHLY_AFTER = re.compile(r"^\s*(?:/-\s*)?(?:rupees\s*)?(?:per month|a month|each month|every month|monthly|/\s*month|pm\b|p\.m\.|sip|per-month)")
+_MONTHLY_BEFORE = re.compile(r"(?:sip|invest(?:ing)?|put(?:ting)?|save|saving|contribute|contribution)\s*(?:of\s*)?(?:rs\.?|₹)?\s*$")
+_STEP_UP_RE = re.compile(
+    r"(?:step[- ]?up|top[- ]?up|increas\w*|rais\w*|grow\w*)\D{0,25}?(\d+(?:\.\d+)?)\s*%"
+    r"|(\d+(?:\.\d+)?)\s*%\s*(?:annual |yearly )?(?:step[- ]?up|top[- ]?up|increase)"
+)
+_RATE_RE = re.compile(r"(\d+(?:\.\d+)?)\s*(?:%|percent)")
+_YEARS_RE = re.compile(r"(\d+(?:\.\d+)?)\s*(years?|yrs?|months?)\b")
+
+
+def parse_sip_query(text: str):
+    """
+    Extracts {goal, monthly, years, rate, step_up} from a SIP question (missing
+    values are None; rate defaults to DEFAULT_RATE). Returns None unless at least
+    two of goal / monthly / years are present.
+    """
+    text = text.lower().replace(",", "")
+
+    step_up = 0.0
+    match = _STEP_UP_RE.search(text)
+    if match:
+        step_up = float(match.group(1) or match.group(2))
+        text = text[:match.start()] + " " + text[match.end():]
+    rates = _RATE_RE.findall(text)
+    rate = float(rates[0]) if rates else DEFAULT_RATE
+    text = _RATE_RE.sub(" ", text)
+
+    years = None
+    for number, unit in _YEARS_RE.findall(text):
+        years = float(number) / (1 if unit.startswith("y") else 12)
+    text = _YEARS_RE.sub(" ", text)
+
+    monthly, goal = None, None
+    for match in re.finditer(_AMOUNT, text):
+        number = match.group(1) or match.group(3)
+        unit = (match.group(2) or match.group(4) or "").rstrip("s")
+        value = float(number) * _UNITS.get(unit, 1)
+        if not unit and value < 500:
+            continue
+        if _MONTHLY_AFTER.match(text[match.end():]) or _MONTHLY_BEFORE.search(text[:match.start()]):
+            monthly = value if monthly is None else monthly
+        elif goal is None or value > goal:
+            goal = value
+
+    if sum(v is not None for v in (goal, monthly, years)) < 2:
+        return None
+    return {"goal": goal, "monthly": monthly, "years": years, "rate": rate, "step_up": step_up}
@@ -0,0 +1,239 @@
+"""
+Per-call stop conditions for call_llm.
+
+Without them every call runs to EOS or max_tokens, even when the useful
+output (one label, one closed JSON document) was complete long before.
+
+    call_llm(prompt, stop=["\\n\\n"])                    # stop strings (cut from the output)
+    call_llm(prompt, stop_token_ids=[tokenizer.eos_token_id, 107])
+    call_llm(prompt, stop_when=OneOf(["yes", "no"]))    # text predicates
+    call_llm(prompt, stop_when=JsonClosed())
+
+Predicates are checked on the text generated so far. `StopPredicate`
+subclasses can also be sent to the model server; plain callables work locally.
+"""
+from abc import ABC, abstractmethod
+
+import torch
+from transformers import StoppingCriteria
+
+
+# ---------- Text predicates ----------
+
+class StopPredicate(ABC):
+    """A text predicate with a serializable spec (see predicate_from_spec)."""
+    name = "predicate"
+
+    @abstractmethod
+    def __call__(self, text: str) -> bool:
+        ...
+
+    def to_spec(self) -> dict:
+        return {"name": self.name}
+
+
+class JsonClosed(StopPredicate):
+    """True once a JSON object/array has been opened and its brackets are balanced again."""
+    name = "json_closed"
+
+    def __call__(self, text: str) -> bool:
+        depth = 0
+        opened = False
+        in_string = False
+        escaped = False
+        for ch in text:
+            if in_string:
+                if escaped:
+                    escaped = False
+                elif ch == "\\":
+                    escaped = True
+                elif ch == '"':
+                    in_string = False
+            elif ch == '"':
+                in_string = True
+            elif ch in "[{":
+                depth += 1
+                opened = True
+            elif ch in "]}":
+                depth -= 1
+                if opened and depth <= 0:
+                    return True
+        return False
+
+
+class OneOf(StopPredicate):
+    """True once any of the labels appears in the output (case-insensitive)."""
+    name = "one_of"
+
+    def __init__(self, labels):
+        self.labels = [str(label) for label in labels]
+        self._lowered = [label.lower() for label in self.labels]
+
+    def __call__(self, text: str) -> bool:
+        lowered = text.lower()
+        return any(label in lowered for label in self._lowered)
+
+    def to_spec(self) -> dict:
+        return {"name": self.name, "labels": self.labels}
+
+
+_PREDICATES = {JsonClosed.name: JsonClosed, OneOf.name: OneOf}
+
+
+def predicate_from_spec(spec: dict) -> StopPredicate:
+    kind = _PREDICATES.get(spec.get("name"))
+    if kind is None:
+        raise ValueError(f"Unknown stop predicate '{spec.get('name')}'")
+    args = {k: v for k, v in spec.items() if k != "name"}
+    return kind(**args)
+
+
+# ---------- Stopping criteria ----------
+
+class _GeneratedTextCriteria(StoppingCriteria):
+    """Base for criteria that look at the tokens generated after the prompt."""
+    reason = "predicate"
+
+    def __init__(self, prompt_len: int):
+        self.prompt_len = prompt_len
+        self.fired = False
+
+    @abstractmethod
+    def check(self, generated: list, row: int = 0) -> bool:
+        ...
+
+    def __call__(self, input_ids: torch.LongTensor, scores: torch.FloatTensor, **kwargs) -> torch.BoolTensor:
+        done = [self.check(input_ids[row, self.prompt_len:].tolist(), row) for row in range(input_ids.shape[0])]
+        self.fired = self.fired or any(done)
+        return torch.tensor(done, dtype=torch.bool, device=input_ids.device)
+
+
+class StopTokenCriteria(_GeneratedTextCriteria):
+    reason = "stop_token"
+
+    def __init__(self, prompt_len: int, token_ids):
+        super().__init__(prompt_len)
+        self.token_ids = set(token_ids)
+
+    def check(self, generated: list, row: int = 0) -> bool:
+        return bool(generated) and generated[-1] in self.token_ids
+
+
+class StopStringCriteria(_GeneratedTextCriteria):
+    """Stops once any stop string appears; only a short tail of tokens is decoded each step."""
+    reason = "stop_string"
+
+    def __init__(self, prompt_len: int, tokenizer, stop_strings):
+        super().__init__(prompt_len)
+        self.tokenizer = tokenizer
+        self.stop_strings = list(stop_strings)
+        self.window = max(len(s) for s in self.stop_strings) + 8
+
+    def check(self, generated: list, row: int = 0) -> bool:
+        tail = self.tokenizer.decode(generated[-self.window:], skip_special_tokens=True)
+        return any(s in tail for s in self.stop_strings)
+
+
+class IncrementalDecoder:
+    """
+    Text of a growing token list, decoding only the tokens added since the last
+    call (plus a few before them, so merged pieces and multi-byte characters
+    come out as a full decode would produce them).
+    """
+
+    def __init__(self, tokenizer):
+        self.tokenizer = tokenizer
+        self.reset()
+
+    def reset(self):
+        self.text = ""
+        self._prefix_offset = 0
+        self._read_offset = 0
+
+    def update(self, tokens: list) -> str:
+        if len(tokens) < self._read_offset:
+            self.reset()
+        prefix_text = self.tokenizer.decode(tokens[self._prefix_offset:self._read_offset], skip_special_tokens=True)
+        new_text = self.tokenizer.decode(tokens[self._prefix_offset:], skip_special_tokens=True)
+        # A trailing U+FFFD is an incomplete character: wait for the next token
+        if len(new_text) > len(prefix_text) and not new_text.endswith("\ufffd"):
+            self.text += new_text[len(prefix_text):]
+            self._prefix_offset = self._read_offset
+            self._read_offset = len(tokens)
+        return self.text
+
+
+class PredicateCriteria(_GeneratedTextCriteria):
+    """Checks a text predicate; each row's text is decoded incrementally, not re-decoded every step."""
+
+    def __init__(self, prompt_len: int, tokenizer, predicate):
+        super().__init__(prompt_len)
+        self.tokenizer = tokenizer
+        self.predicate = predicate
+        self.reason = getattr(predicate, "name", "predicate")
+        self._decoders = {}
+
+    def check(self, generated: list, row: int = 0) -> bool:
+        decoder = self._decoders.get(row)
+        if decoder is None:
+            decoder = self._decoders[row] = IncrementalDecoder(self.tokenizer)
+        return bool(self.predicate(decoder.update(generated)))
+
+
+def build_stop_criteria(tokenizer, prompt_len: int, stop=None, stop_token_ids=None, stop_when=None) -> list:
+    """Criteria for one call_llm request (empty list when no stop conditions were given)."""
+    criteria = []
+    if stop:
+        criteria.append(StopStringCriteria(prompt_len, tokenizer, [stop] if isinstance(stop, str) else stop))
+    if stop_token_ids:
+        criteria.append(StopTokenCriteria(prompt_len, stop_token_ids))
+    for predicate in _as_list(stop_when):
+        criteria.append(PredicateCriteria(prompt_len, tokenizer, predicate))
+    return criteria
+
+
+def truncate_at_stop(text: str, stop) -> str:
+    """Cuts the completion at the first stop string (the stop string itself is dropped)."""
+    if not stop:
+        return text
+    cut = len(text)
+    for s in ([stop] if isinstance(stop, str) else stop):
+        idx = text.find(s)
+        if idx != -1:
+            cut = min(cut, idx)
+    return text[:cut]
+
+
+def stop_reason(criteria: list, generated: list, max_tokens: int, eos_token_ids) -> str:
+    """Why a generation ended: the first criterion that fired, else eos / max_tokens."""
+    for c in criteria:
+        if getattr(c, "fired", False):
+            return c.reason
+    if generated and generated[-1] in eos_token_ids:
+        return "eos"
+    if len(generated) >= max_tokens:
+        return "max_tokens"
+    return "eos"
+
+
+def stop_spec(stop=None, stop_token_ids=None, stop_when=None):
+    """
+    JSON-serializable description of the stop conditions (for cache keys and the
+    model server). Returns None if a predicate is a plain callable without a spec.
+    """
+    predicates = []
+    for predicate in _as_list(stop_when):
+        if not isinstance(predicate, StopPredicate):
+            return None
+        predicates.append(predicate.to_spec())
+    return {
+        "stop": [stop] if isinstance(stop, str) else list(stop or []),
+        "stop_token_ids": list(stop_token_ids or []),
+        "stop_when": predicates,
+    }
+
+
+def _as_list(value) -> list:
+    if value is None:
+        return []
+    return list(value) if isinstance(value, (list, tuple)) else [value]
@@ -1,13 +1,23 @@
 import streamlit as st
 import pandas as pd
 import plotly.express as px
-import re
 import math
-from model_loader import load_model, call_llm
-from expenses_categorizer import categorize_expenses
-from savings_analysis import savings_analysis
+import config
+from model_loader import call_llm, stream_llm, register_prompt_prefix, model_ready, model_load_error
+from expenses_categorizer import EXPENSE_CATEGORIES, extract_financials_from_text
+from merchant_memo import get_merchant_memo
+from savings_analysis import savings_analysis, savings_analysis_for_user
 from budget_recommendation import analyze_cash_flow_and_savings
 from investment_advisor import generate_investment_guidance, investment_advisor_json
+from stopping import OneOf
+from pipeline import Pipeline
+from intent_classifier import classify_intent
+from loan_engine import parse_loan_query, emi, emi_grid, amortization_schedule, yearly_summary
+from tax_engine import ASSESSMENT_YEAR, parse_tax_query, compare_regimes, break_even_deductions
+from monte_carlo import project_allocation
+from retrieval import search as search_knowledge, format_context
+from sip_planner import (GRID_RATES, parse_sip_query, sip_future_value, required_sip, months_to_goal,
+                         sensitivity_grid, required_sip_grid, plan_from_cash_flow)
 
 # Page Config
 st.set_page_config(
@@ -37,14 +47,13 @@ with st.sidebar:
     st.caption("Your AI-powered Financial Assistant")
     st.markdown("---")
     
-    # Load model
-    if 'model_loaded' not in st.session_state:
-        with st.spinner("Loading AI Model (Shiva-k22/gemma-FinAI)..."):
-            load_model()
-            st.session_state.model_loaded = True
-        st.success("Model Loaded Successfully!")
-    else:
+    # Model loads in a background thread started at import, so the page never blocks on it
+    if model_ready():
         st.success("Model Active ✅")
+    elif model_load_error() is not None:
+        st.error(f"Model failed to load: {model_load_error()}")
+    else:
+        st.info("⏳ Loading AI Model in the background... You can already type; queries wait until it is ready.")
 
     st.markdown("### How to use:")
     st.info(
@@ -54,6 +63,32 @@ with st.sidebar:
 
 # --- Logic Functions (Ported from Notebook) ---
 
+# Fixed tax preamble (persona only); its KV state is cached across questions.
+# The facts come from the knowledge notes retrieved for each question.
+TAX_PROMPT_PREFIX = register_prompt_prefix("""
+        You are an Indian Tax Expert (FY 2024-25).
+        Use the CONTEXT to answer. If the CONTEXT does not cover the question, say so briefly.
+""")
+
+# The intent classifier only needs one of these labels; generation stops once one appears
+INTENT_LABELS = OneOf(["general_finance_question", "personal_finance_data", "unclear"])
+
+# Questions mentioning these go to the loan engine before any prompt is built
+LOAN_KEYWORDS = ["emi", "loan", "prepay", "part pay", "amortization", "amortisation", "tenure", "mortgage"]
+# ...and these to the SIP / goal planner. Plain "invest 10000 monthly" is not
+# enough: "ELSS or PPF?" and "prepay or invest?" are choices for the LLM, not projections.
+SIP_KEYWORDS = ["sip", "systematic investment", "corpus", "goal", "step-up", "step up",
+                "future value", "how much will i have", "grow to"]
+# ...or an explicit monthly investment with a horizon ("invest 10000 per month for 20 years")
+CHOICE_WORDS = [" or ", " vs", "versus", "better", "should i"]
+
+def is_monthly_investment_query(q_lower: str) -> bool:
+    """'invest' with a monthly amount and a horizon, and not a choice between options."""
+    if "invest" not in q_lower or any(w in q_lower for w in CHOICE_WORDS):
+        return False
+    sip = parse_sip_query(q_lower)
+    return bool(sip and sip["monthly"] and sip["years"])
+
 def detect_user_intent(user_input: str) -> str:
     """
     Detects whether the user input is:
@@ -68,6 +103,9 @@ def detect_user_intent(user_input: str) -> str:
     # If it starts with a question word or specific verb, likely a question
     if any(txt.startswith(k) for k in q_words) or any(f" {k} " in f" {txt} " for k in q_words):
         return "general_finance_question"
+    # "If I invest 10000 per month..." reads like data but asks for a projection
+    if is_monthly_investment_query(txt):
+        return "general_finance_question"
 
     # 2. Fast Data Check (Financial Narratives)
     # If users mentions money/spending keywords AND numbers, it's likely data.
@@ -78,7 +116,12 @@ def detect_user_intent(user_input: str) -> str:
     if has_keyword and has_number:
         return "personal_finance_data"
     
-    # 3. Robust LLM Check (Fallback)
+    # 3. Local Classifier (microseconds; only confident predictions are trusted)
+    prediction = classify_intent(user_input)
+    if prediction is not None and prediction[1] >= config.INTENT_MIN_CONFIDENCE:
+        return prediction[0]
+
+    # 4. Robust LLM Check (Fallback)
     prompt = f"""
     Classify the following user input.
     
@@ -89,8 +132,8 @@ def detect_user_intent(user_input: str) -> str:
     
     Return ONLY "general_finance_question" or "personal_finance_data" or "unclear".
     """
-    # Increased tokens to avoid cutoff, cleaned output
-    response = call_llm(prompt, max_tokens=50, temperature=0.1).strip().lower()
+    # Stop as soon as a label has been emitted instead of running out the token budget
+    response = call_llm(prompt, max_tokens=50, temperature=0.1, greedy=True, stop_when=INTENT_LABELS).strip().lower()
     
     # Fallback cleanup
     if "general" in response: return "general_finance_question"
@@ -100,74 +143,230 @@ def detect_user_intent(user_input: str) -> str:
 
 def calculate_deterministic_emi(query: str):
     """
-    Attempts to extract Loan Amount, Rate, and Tenure to calculate EMI deterministically.
+    Answers loan questions (EMI, schedules, prepayments, rate resets, rate/tenure
+    comparisons) deterministically with the loan engine. Returns None when the
+    query does not carry a loan amount, rate and tenure.
     """
     try:
-        # Normalize text
-        text = query.lower().replace(",", "")
-        
-        # Extract Principal (e.g. 25 lakh, 2500000)
-        principal = 0
-        p_match_lakh = re.search(r"(\d+(\.\d+)?)\s*lakh", text)
-        p_match_num = re.search(r"(\d+)\s*(?:home|loan|rupees|rs)", text)
-        
-        if p_match_lakh:
-            principal = float(p_match_lakh.group(1)) * 100000
-        elif p_match_num:
-            # Simple heuristic: ignore small numbers like "15 years", "8%"
-            # Assume principal is the largest number? Or look for context.
-            # Let's trust "lakh" match first. If user typed "2500000", simpler regex:
-            nums = [float(x) for x in re.findall(r"(\d+)", text)]
-            possible_ps = [x for x in nums if x > 1000] # Principal usually > 1000
-            if possible_ps: principal = max(possible_ps)
-            
-        # Extract Rate (e.g. 8%, 8.5 interest)
-        rate = 0
-        r_match = re.search(r"(\d+(\.\d+)?)%", text)
-        if not r_match:
-            r_match = re.search(r"(\d+(\.\d+)?)\s*interest", text)
-        if r_match:
-            rate = float(r_match.group(1))
-            
-        # Extract Tenure (e.g. 15 years, 180 months)
-        years = 0
-        y_match = re.search(r"(\d+(\.\d+)?)\s*year", text)
-        if y_match:
-            years = float(y_match.group(1))
-            
-        # Calculate
-        if principal > 0 and rate > 0 and years > 0:
-            r = rate / (12 * 100) # Monthly rate
-            n = years * 12 # Months
-            
-            emi = principal * r * ((1 + r)**n) / (((1 + r)**n) - 1)
-            
-            return f"""
-            🧮 **EMI Calculator**
-            
-            - **Principal:** ₹{principal:,.0f}
-            - **Rate:** {rate}%
-            - **Tenure:** {years} Years ({int(n)} Months)
-            
-            ### ✅ Monthly EMI: ₹{emi:,.2f}
-            
-            *(Calculated deterministically)*
-            """
+        loan = parse_loan_query(query)
+        if not loan:
+            return None
+
+        principal = loan["principal"]
+        rate, months = loan["rates"][0], loan["tenures_months"][0]
+        lines = [
+            "🧮 **Loan Calculator**",
+            "",
+            f"- **Principal:** ₹{principal:,.0f}",
+        ]
+
+        # Several rates and/or tenures: one table row per rate, one column per tenure
+        if len(loan["rates"]) > 1 or len(loan["tenures_months"]) > 1:
+            grid = emi_grid(principal, loan["rates"], loan["tenures_months"])
+            header = " | ".join(f"{m // 12:g} yrs" if m % 12 == 0 else f"{m} months" for m in grid["tenures_months"])
+            lines += ["", f"| Rate | {header} |", "|---" * (len(grid["tenures_months"]) + 1) + "|"]
+            for r, emis, interest in zip(grid["rates"], grid["emi"], grid["total_interest"]):
+                cells = " | ".join(f"₹{e:,.0f} EMI (₹{i:,.0f} interest)" for e, i in zip(emis, interest))
+                lines.append(f"| {r:g}% | {cells} |")
+            lines += ["", "*(Calculated deterministically)*"]
+            return "\n".join(lines)
+
+        lines += [
+            f"- **Rate:** {rate:g}%",
+            f"- **Tenure:** {months / 12:g} Years ({months} Months)",
+            "",
+            f"### ✅ Monthly EMI: ₹{emi(principal, rate, months):,.2f}",
+        ]
+
+        events = loan["prepayments"] or loan["monthly_extra"] or loan["rate_resets"]
+        schedule = amortization_schedule(principal, rate, months, loan["prepayments"],
+                                         loan["monthly_extra"], loan["rate_resets"])
+        if events:
+            plain = amortization_schedule(principal, rate, months)
+            for month, amount in sorted(loan["prepayments"].items()):
+                lines.append(f"- **Prepayment:** ₹{amount:,.0f} after month {month}")
+            if loan["monthly_extra"]:
+                lines.append(f"- **Extra every month:** ₹{loan['monthly_extra']:,.0f}")
+            for month, new_rate in sorted(loan["rate_resets"].items()):
+                lines.append(f"- **Rate reset:** {new_rate:g}% from month {month}")
+            lines += [
+                "",
+                "| | Without changes | With changes |",
+                "|---|---|---|",
+                f"| Months to repay | {plain['months_taken']} | {schedule['months_taken']} |",
+                f"| Total interest | ₹{plain['total_interest']:,.0f} | ₹{schedule['total_interest']:,.0f} |",
+                f"| Total paid | ₹{plain['total_paid']:,.0f} | ₹{schedule['total_paid']:,.0f} |",
+            ]
+            saved = plain["total_interest"] - schedule["total_interest"]
+            lines += ["", f"**Interest saved:** ₹{saved:,.0f}" if saved >= 0 else f"**Extra interest:** ₹{-saved:,.0f}"]
+        else:
+            lines.append(f"- **Total interest:** ₹{schedule['total_interest']:,.0f}")
+
+        if loan["schedule"]:
+            lines += ["", "| Year | Paid | Interest | Principal | Prepaid | Balance |", "|---|---|---|---|---|---|"]
+            for row in yearly_summary(schedule):
+                lines.append(
+                    f"| {row['year']} | ₹{row['payment']:,.0f} | ₹{row['interest']:,.0f} | ₹{row['principal']:,.0f}"
+                    f" | ₹{row['prepayment']:,.0f} | ₹{row['closing_balance']:,.0f} |"
+                )
+
+        lines += ["", "*(Calculated deterministically)*"]
+        return "\n".join(lines)
     except Exception as e:
-        print(f"Regex EMI Error: {e}")
+        print(f"Loan engine error: {e}")
         return None
-        
-    return None
 
-def answer_general_finance_question(question: str) -> str:
+def calculate_deterministic_tax(query: str):
+    """
+    Computes income tax for questions that carry a concrete income (FY 2024-25,
+    both regimes) with the tax engine. Returns None when no income is found.
+    """
+    try:
+        parsed = parse_tax_query(query)
+        if not parsed:
+            return None
+
+        income, deductions, age = parsed["income"], parsed["deductions"], parsed["age"]
+        comparison = compare_regimes(income, deductions, parsed["salaried"], age)
+        regimes = [parsed["regime"]] if parsed["regime"] else ["new", "old"]
+        names = {"new": "New Regime", "old": "Old Regime"}
+
+        lines = [f"🧾 **Income Tax Calculator ({ASSESSMENT_YEAR})**", "", f"- **Gross Income:** ₹{income:,.0f}"]
+        for name, amount in deductions.items():
+            lines.append(f"- **Deduction {name.upper()}:** ₹{amount:,.0f}")
+        if age is not None:
+            lines.append(f"- **Age:** {age}")
+        lines += ["", "| | " + " | ".join(names[r] for r in regimes) + " |", "|---" * (len(regimes) + 1) + "|"]
+        rows = [
+            ("Standard deduction", "standard_deduction"),
+            ("Other deductions allowed", "deductions"),
+            ("Taxable income", "taxable_income"),
+            ("Tax on slabs", "slab_tax"),
+            ("Rebate u/s 87A", "rebate"),
+            ("Surcharge", "surcharge"),
+            ("Cess (4%)", "cess"),
+        ]
+        for label, key in rows:
+            lines.append(f"| {label} | " + " | ".join(f"₹{comparison[r][key]:,.0f}" for r in regimes) + " |")
+        lines.append("| **Total tax** | " + " | ".join(f"**₹{comparison[r]['total_tax']:,.0f}**" for r in regimes) + " |")
+        lines.append("| Effective rate | " + " | ".join(f"{comparison[r]['effective_rate']:.2f}%" for r in regimes) + " |")
+
+        if len(regimes) == 2:
+            lines.append("")
+            if comparison["better"] == "either":
+                lines.append("### ✅ Both regimes cost the same")
+            else:
+                lines.append(f"### ✅ {names[comparison['better']]} saves ₹{comparison['savings']:,.0f}")
+            threshold = break_even_deductions(income, parsed["salaried"], age)
+            if threshold == threshold and threshold > 0:
+                lines.append(f"At this income the old regime wins only with more than ₹{threshold:,.0f} of deductions.")
+
+        lines += ["", "*(Calculated deterministically)*"]
+        return "\n".join(lines)
+    except Exception as e:
+        print(f"Tax engine error: {e}")
+        return None
+
+def _horizons_around(years: float) -> list:
+    """The asked-for horizon with its neighbours, for sensitivity tables."""
+    return sorted({y for y in (years - 5, years, years + 5) if y > 0})
+
+
+def calculate_deterministic_sip(query: str):
+    """
+    Answers SIP / goal-planning questions (future value, required SIP, time to
+    goal, step-up SIPs) with the SIP planner. Returns None unless the query
+    carries at least two of goal, monthly amount and horizon.
+    """
+    try:
+        sip = parse_sip_query(query)
+        if not sip:
+            return None
+
+        goal, monthly, years = sip["goal"], sip["monthly"], sip["years"]
+        rate, step_up = sip["rate"], sip["step_up"]
+        lines = ["🎯 **SIP Planner**", "", f"- **Expected Return:** {rate:g}% p.a."]
+        if step_up:
+            lines.append(f"- **Annual Step-up:** {step_up:g}%")
+        if goal:
+            lines.append(f"- **Goal:** ₹{goal:,.0f}")
+        if monthly:
+            lines.append(f"- **Monthly SIP:** ₹{monthly:,.0f}")
+        if years:
+            lines.append(f"- **Horizon:** {years:g} Years")
+        lines.append("")
+
+        def table(values, horizons, fmt):
+            rows = [f"| Return | " + " | ".join(f"{y:g} yrs" for y in horizons) + " |",
+                    "|---" * (len(horizons) + 1) + "|"]
+            for r, row in zip(GRID_RATES, values):
+                rows.append(f"| {r}% | " + " | ".join(fmt(v) for v in row) + " |")
+            return rows
+
+        if goal and years and not monthly:
+            need = required_sip(goal, rate, years, step_up)
+            lines.append(f"### ✅ Required Monthly SIP: ₹{need:,.0f}")
+            if step_up:
+                lines.append(f"(Without step-up: ₹{required_sip(goal, rate, years):,.0f}/month)")
+            horizons = _horizons_around(years)
+            lines += ["", "**Required SIP by return and horizon:**", ""]
+            lines += table(required_sip_grid(goal, GRID_RATES, horizons, step_up)["required_sip"], horizons,
+                           lambda v: f"₹{v:,.0f}")
+        elif monthly and years:
+            value = sip_future_value(monthly, rate, years, step_up)
+            invested = sip_future_value(monthly, 0, years, step_up)
+            lines += [
+                f"### ✅ Projected Corpus: ₹{value:,.0f}",
+                f"- **Total Invested:** ₹{invested:,.0f}",
+                f"- **Estimated Gains:** ₹{value - invested:,.0f}",
+            ]
+            if goal:
+                verdict = "reaches" if value >= goal else "falls short of"
+                lines.append(f"- This {verdict} the goal; the SIP needed is ₹{required_sip(goal, rate, years, step_up):,.0f}/month.")
+            horizons = _horizons_around(years)
+            lines += ["", "**Corpus by return and horizon:**", ""]
+            lines += table(sensitivity_grid(monthly, GRID_RATES, horizons, step_up)["future_value"], horizons,
+                           lambda v: f"₹{v:,.0f}")
+        else:
+            months = months_to_goal(goal, monthly, rate, step_up)
+            if months != months:
+                lines.append("### ⚠️ This SIP does not reach the goal within 100 years.")
+            else:
+                lines.append(f"### ✅ Time to Goal: {int(months) // 12} years {int(months) % 12} months")
+
+        lines += ["", "*(Calculated deterministically)*"]
+        return "\n".join(lines)
+    except Exception as e:
+        print(f"SIP planner error: {e}")
+        return None
+
+def answer_general_finance_question(question: str, stream: bool = False):
+    """
+    Answers a general finance question.
+    With stream=True, LLM answers come back as an iterator of text chunks (for st.write_stream);
+    deterministic answers are always plain strings.
+    """
     q_lower = question.lower()
+    llm = stream_llm if stream else call_llm
     
-    # 1. Math / Calculation Branch
+    # 1. Loan Calculations (deterministic engine)
+    if any(k in q_lower for k in LOAN_KEYWORDS):
+        loan_result = calculate_deterministic_emi(question)
+        if loan_result: return loan_result
+
+    # 2. Tax Calculations (deterministic engine)
+    tax_keywords = ["tax", "slab", "regime", "deduction", "section", "80c", "old", "new"]
+    if any(k in q_lower for k in tax_keywords):
+        tax_result = calculate_deterministic_tax(question)
+        if tax_result: return tax_result
+
+    # 3. SIP / Goal Planning (deterministic planner)
+    if any(k in q_lower for k in SIP_KEYWORDS) or is_monthly_investment_query(q_lower):
+        sip_result = calculate_deterministic_sip(question)
+        if sip_result: return sip_result
+
+    # 4. Math / Calculation Branch
     if any(k in q_lower for k in ["calculate", "compute", "emi", "interest", "amount", "math"]):
-        # Try Deterministic Logic first
-        math_result = calculate_deterministic_emi(question)
-        if math_result: return math_result
-        
         # Fallback to LLM Math
         prompt = f"""
         You are a financial calculator.
@@ -175,44 +374,51 @@ def answer_general_finance_question(question: str) -> str:
         Question: "{question}"
         Show the formula and steps.
         """
-        return call_llm(prompt, max_tokens=600, temperature=0.1)
+        return llm(prompt, max_tokens=600, temperature=0.1, greedy=True)
 
-    # 2. Tax / Context Branch (RAG)
-    tax_keywords = ["tax", "slab", "regime", "deduction", "section", "80c", "old", "new"]
+    # 5. Tax / Context Branch (RAG)
     if any(k in q_lower for k in tax_keywords):
-        context = """
-        CURRENT INDIAN FINANCIAL FACTS (FY 2024-25):
-        - **New Tax Regime (Default):**
-          - Up to ₹3 Lakh: Nil
-          - ₹3 Lakh - ₹7 Lakh: 5% (Rebate u/s 87A available up to ₹7 Lakh income, so effective tax is 0)
-          - ₹7 Lakh - ₹10 Lakh: 10%
-          - ₹10 Lakh - ₹12 Lakh: 15%
-          - ₹12 Lakh - ₹15 Lakh: 20%
-          - Above ₹15 Lakh: 30%
-        - **Old Tax Regime:** High exemptions but different slabs (0-2.5L Nil, 2.5-5L 5%, 5-10L 20%, >10L 30%).
-        - **Standard Deduction:** ₹75,000 (New Regime proposed FY25).
-        """
-        prompt = f"""
-        You are an Indian Tax Expert.
-        Use the CONTEXT to answer.
-        
-        CONTEXT:
-        {context}
-        
+        prompt = TAX_PROMPT_PREFIX + format_context(search_knowledge(question)) + f"""
         Question: "{question}"
         """
-        return call_llm(prompt, max_tokens=400, temperature=0.1)
+        return llm(prompt, max_tokens=400, temperature=0.1, greedy=True)
 
-    # 3. General Knowledge Branch (Open)
+    # 6. General Knowledge Branch (Open)
+    # Only the notes relevant to this question go into the prompt
+    context = format_context(search_knowledge(question))
     prompt = f"""
     You are a friendly Indian Financial Educator.
     Explain the following concept clearly to a beginner.
-    
+    {"Use the CONTEXT where it helps." if context else ""}
+    {context}
     Question: "{question}"
     
     Answer concisely (under 150 words).
     """
-    return call_llm(prompt, max_tokens=300, temperature=0.7)
+    return llm(prompt, max_tokens=300, temperature=0.7)
+
+def project_savings(savings: dict, investment_json: dict):
+    """
+    Monte Carlo projection of investing the monthly net savings in the
+    recommended allocation. The goal is ending above the amount put in.
+    Returns None when there is nothing to project.
+    """
+    allocation = investment_json.get("recommended_allocation")
+    monthly = savings.get("savings", 0)
+    if not allocation or monthly <= 0:
+        return None
+    years = config.MONTE_CARLO_YEARS
+    return project_allocation(allocation, monthly, years, goal=monthly * 12 * years)
+
+def analyze_savings(extraction: dict, user_input: str) -> dict:
+    """
+    Savings for the extracted income and expenses. With transaction history on,
+    they are also stored for this month, and earlier stored months are averaged in.
+    """
+    if config.TRANSACTION_HISTORY_ENABLED:
+        return savings_analysis_for_user(extraction["expenses"], user_input, config.TRANSACTION_USER_ID,
+                                         income=extraction["income"])
+    return savings_analysis(extraction["expenses"], user_input, income=extraction["income"])
 
 def fin_smart_router(user_input: str):
     intent = detect_user_intent(user_input)
@@ -224,42 +430,56 @@ def fin_smart_router(user_input: str):
     if intent == "general_finance_question":
         return {
             "type": "general_answer",
-            "response": answer_general_finance_question(user_input)
+            "response": answer_general_finance_question(user_input, stream=True)
         }
 
     elif intent == "personal_finance_data":
         status_text = st.empty()
-        status_text.info("🔄 Identifying Expenses...")
-        
-        # Step 1: Categorize
-        categorized_expenses = categorize_expenses(user_input, "text")
-        
-        status_text.info("🔄 Analyzing Savings & Income...")
-        # Step 2: Savings Analysis
-        savings_result = savings_analysis(categorized_expenses, user_input)
-        
-        status_text.info("🔄 Generating Recommendations...")
+
+        # Stages run as soon as their inputs are ready. The model is only used by
+        # extraction (when the rule parser is unsure) and guidance, which depend on
+        # each other; what overlaps is the rule-based allocation and projection
+        # running next to cash flow and the start of the guidance.
+        pipeline = Pipeline()
+        # Step 1: Extract income + categorized expenses in one pass over the text
+        pipeline.add("extraction", lambda: extract_financials_from_text(user_input),
+                     label="Identifying Income & Expenses...")
+        # Step 2: Savings Analysis (income already extracted, no second LLM call).
+        # With history on, this month's transactions are stored and earlier months are averaged in.
+        pipeline.add("savings", lambda extraction: analyze_savings(extraction, user_input),
+                     deps=["extraction"], label="Analyzing Savings...")
         # Step 3: Cash Flow
-        cash_flow_summary = analyze_cash_flow_and_savings(savings_result)
-        
-        # Step 4: Advice
-        investment_guidance = generate_investment_guidance(
-            cash_flow_summary,
-            financial_goals="wealth building",
-            risk_tolerance="moderate"
-        )
-        
-        # Step 5: Investment JSON for Charts (Optional, using rule based)
-        inv_json = investment_advisor_json({"savings_amount": savings_result["savings"]})
+        pipeline.add("cash_flow", lambda savings: analyze_cash_flow_and_savings(savings),
+                     deps=["savings"], label="Summarizing Cash Flow...")
+        # Step 4: Advice (streams; generation starts here and renders later)
+        pipeline.add("guidance", lambda cash_flow: generate_investment_guidance(
+                         cash_flow,
+                         financial_goals="wealth building",
+                         risk_tolerance="moderate",
+                         stream=True
+                     ), deps=["cash_flow"], label="Generating Recommendations...")
+        # Step 5: Investment JSON for Charts (rule based, only needs the savings)
+        pipeline.add("investment_json", lambda savings: investment_advisor_json({"savings_amount": savings["savings"]}),
+                     deps=["savings"], label="Building Allocation...")
+        # Step 6: Monte Carlo projection of that allocation (NumPy, runs alongside the guidance)
+        pipeline.add("projection", project_savings, deps=["savings", "investment_json"],
+                     label="Projecting Portfolio Growth...")
 
+        results, timings = pipeline.run(
+            on_progress=lambda labels: status_text.info("🔄 " + " | ".join(labels)) if labels else None
+        )
         status_text.empty()
         
         return {
             "type": "financial_analysis",
-            "financial_summary": savings_result,
-            "cash_flow_summary": cash_flow_summary,
-            "investment_guidance": investment_guidance,
-            "investment_json": inv_json
+            "currency": results["extraction"]["currency"],
+            "expenses": results["extraction"]["expenses"],
+            "financial_summary": results["savings"],
+            "cash_flow_summary": results["cash_flow"],
+            "investment_guidance": results["guidance"],
+            "investment_json": results["investment_json"],
+            "projection": results["projection"],
+            "timings": timings
         }
 
     else:
@@ -286,10 +506,16 @@ if query:
             result = fin_smart_router(query)
         
         if result["type"] == "general_answer":
-            txt_response = result.get("response", "").strip()
+            response = result.get("response", "")
+            if isinstance(response, str):
+                txt_response = response.strip()
+                if txt_response:
+                    st.markdown(txt_response)
+            else:
+                # LLM answers stream in token by token
+                txt_response = st.write_stream(response).strip()
             if not txt_response:
-                txt_response = "I apologize, but I couldn't generate a response. Please check your query or try rephrasing."
-            st.markdown(txt_response)
+                st.markdown("I apologize, but I couldn't generate a response. Please check your query or try rephrasing.")
             
         elif result["type"] == "financial_analysis":
             fs = result["financial_summary"]
@@ -298,6 +524,9 @@ if query:
             
             # 1. Summary Metrics
             st.subheader("📊 Financial Snapshot")
+            if fs.get("months_covered"):
+                st.caption(f"Monthly averages over your {len(fs['months_covered'])} stored months "
+                           f"({fs['months_covered'][0]} to {fs['months_covered'][-1]}), including this analysis.")
             c1, c2, c3, c4 = st.columns(4)
             c1.metric("Monthly Income", f"₹{fs['income']:,.0f}")
             c2.metric("Total Expenses", f"₹{fs['total_expenses']:,.0f}", delta_color="inverse")
@@ -324,9 +553,21 @@ if query:
                 else:
                     st.info("No expenses found.")
 
+                if fs.get("month_over_month"):
+                    st.markdown("#### 📅 Month over Month")
+                    mom_df = pd.DataFrame(fs["month_over_month"]).rename(columns={
+                        "month": "Month", "total": "Expenses", "delta": "Change", "delta_pct": "Change (%)"})
+                    st.dataframe(mom_df, use_container_width=True, hide_index=True)
+
+                if result["expenses"]:
+                    # Kept for the category correction form in the sidebar
+                    st.session_state["last_expenses"] = result["expenses"]
+                    with st.expander("Transactions"):
+                        st.dataframe(pd.DataFrame(result["expenses"]), use_container_width=True, hide_index=True)
+
             with t2:
                 st.subheader("💡 AI Investment Guidance")
-                st.markdown(result["investment_guidance"])
+                st.write_stream(result["investment_guidance"])
                 
                 st.divider()
                 
@@ -340,6 +581,43 @@ if query:
                     with st.expander("Why this allocation?"):
                         st.dataframe(alloc_df[["instrument", "allocation_percent", "reason"]], hide_index=True)
 
+                # Monte Carlo projection of investing the monthly savings in this mix
+                projection = result.get("projection")
+                if projection:
+                    years = int(projection["months"][-1] // 12)
+                    st.subheader(f"🔮 Projected Growth over {years} Years")
+                    proj_df = pd.DataFrame({"Year": projection["months"] / 12, "Invested": projection["invested"]})
+                    for p, values in projection["percentiles"].items():
+                        proj_df[f"P{p}"] = values
+                    fig_proj = px.line(proj_df, x="Year", y=list(proj_df.columns[1:]),
+                                       labels={"value": "Wealth (₹)", "variable": "Scenario"},
+                                       title=f"Simulated Wealth ({projection['paths']:,} paths)")
+                    st.plotly_chart(fig_proj, use_container_width=True)
+
+                    m1, m2, m3 = st.columns(3)
+                    m1.metric("Median Outcome", f"₹{projection['percentiles'][50][-1]:,.0f}")
+                    m2.metric("Pessimistic (P10)", f"₹{projection['percentiles'][10][-1]:,.0f}")
+                    m3.metric("Chance of Beating Amount Invested", f"{projection['goal_probability'] * 100:.1f}%")
+                    st.caption(
+                        f"Assumes ~{projection['annual_return'] * 100:.1f}% expected annual return with "
+                        f"{projection['annual_volatility'] * 100:.1f}% volatility for this mix, rebalanced monthly. "
+                        "Illustrative only, not a forecast."
+                    )
+
+                # SIP sensitivity: investing the full net savings every month (closed form, no model call)
+                plan = plan_from_cash_flow(cf)
+                if plan["net_savings"] > 0:
+                    st.subheader("🎯 SIP Planner")
+                    st.caption(f"Corpus from investing your net savings of ₹{plan['net_savings']:,.0f} every month.")
+                    grid = plan["grid"]
+                    sip_df = pd.DataFrame(
+                        grid["future_value"].round(),
+                        index=[f"{r:g}% return" for r in grid["rates"]],
+                        columns=[f"{y:g} yrs" for y in grid["years"]]
+                    )
+                    sip_df.loc["Amount invested"] = grid["invested"].round()
+                    st.dataframe(sip_df.style.format("₹{:,.0f}"), use_container_width=True)
+
             with t3:
                 st.subheader("📋 Detailed Financial Report")
                 
@@ -358,6 +636,37 @@ if query:
                 if fs.get("expense_breakdown_by_category"):
                     st.markdown("#### 🛒 Expense Breakdown")
                     st.table(pd.DataFrame(list(fs["expense_breakdown_by_category"].items()), columns=["Category", "Amount"]))
+
+                with st.expander("⏱️ Stage timings"):
+                    timings = result["timings"]
+                    st.dataframe(
+                        pd.DataFrame([(name, seconds) for name, seconds in timings.items() if name != "total"],
+                                     columns=["Stage", "Seconds"]),
+                        hide_index=True
+                    )
+                    st.caption(f"Total {timings['total']:.2f} s. Stages overlap, so they add up to more than the total; "
+                               "guidance is timed until its stream starts.")
         
         else:
             st.warning(result["response"])
+
+
+# --- Category Corrections ---
+# Drawn last so the form lists the transactions of the analysis just shown.
+# A correction is remembered for the merchant and wins over the model from then on.
+
+memo = get_merchant_memo()
+if memo is not None:
+    with st.sidebar:
+        st.markdown("---")
+        st.markdown("### Fix a category")
+        with st.form("category_correction", clear_on_submit=True):
+            descriptions = sorted({str(e.get("description", "")) for e in st.session_state.get("last_expenses", [])} - {""})
+            if descriptions:
+                description = st.selectbox("Transaction", descriptions)
+            else:
+                description = st.text_input("Merchant or description", placeholder="e.g. swiggy")
+            category = st.selectbox("Correct category", EXPENSE_CATEGORIES)
+            if st.form_submit_button("Remember") and description.strip():
+                memo.record_correction(description, category)
+                st.success(f"'{description}' will be categorized as {category} from now on.")
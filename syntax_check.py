@@ -1,14 +1,50 @@
 try:
+    import config
+    print("config imported")
+    import inference_queue
+    print("inference_queue imported")
+    import response_cache
+    print("response_cache imported")
+    import json_constraints
+    print("json_constraints imported")
+    import stopping
+    print("stopping imported")
+    import model_client
+    print("model_client imported")
     import model_loader
     print("model_loader imported")
+    import rule_extractor
+    print("rule_extractor imported")
+    import merchant_memo
+    print("merchant_memo imported")
+    import intent_classifier
+    print("intent_classifier imported")
     import expenses_categorizer
     print("expenses_categorizer imported")
+    import transactions
+    print("transactions imported")
+    import ingestion
+    print("ingestion imported")
+    import transaction_store
+    print("transaction_store imported")
     import savings_analysis
     print("savings_analysis imported")
     import budget_recommendation
     print("budget_recommendation imported")
     import investment_advisor
     print("investment_advisor imported")
+    import monte_carlo
+    print("monte_carlo imported")
+    import sip_planner
+    print("sip_planner imported")
+    import retrieval
+    print("retrieval imported")
+    import loan_engine
+    print("loan_engine imported")
+    import tax_engine
+    print("tax_engine imported")
+    import pipeline
+    print("pipeline imported")
     import streamlit_app
     print("streamlit_app imported")
     print("✅ All modules syntax checked.")
@@ -0,0 +1,365 @@
+"""
+Deterministic Indian income-tax engine (FY 2024-25 / AY 2025-26, individuals).
+
+Both regimes are described by the REGIMES table (slabs, standard deduction,
+87A rebate, surcharge bands, allowed deductions), and every computation is
+vectorized over NumPy arrays of incomes:
+
+    compute_tax(12_00_000, "new")                         # one income
+    compute_tax(np.arange(5e5, 5e6, 1e4), "old", {"80c": 150000})
+    compare_regimes(15_00_000, {"80c": 150000, "80d": 25000})
+    break_even_deductions([10e5, 15e5, 20e5])             # old-regime deductions needed to match new
+
+Covered: slab tax, standard deduction for salaried taxpayers, the 87A rebate
+(with marginal relief in the new regime), surcharge with marginal relief, 4%
+health & education cess, higher old-regime exemption for senior citizens,
+and the common Chapter VI-A / house-property deductions with their caps.
+Not covered: capital gains and other special-rate income, AMT, HRA
+computation (pass the exempt amount as "hra").
+
+`parse_tax_query` extracts income, deductions and age from a question.
+"""
+import bisect
+import re
+
+import numpy as np
+
+ASSESSMENT_YEAR = "FY 2024-25"
+CESS_RATE = 0.04
+
+# Deduction caps (None = no cap here; the caller passes the eligible amount)
+DEDUCTION_CAPS = {
+    "80c": 150000,          # PPF, ELSS, EPF, life insurance, principal repayment, ...
+    "80ccd_1b": 50000,      # own NPS contribution over the 80C limit
+    "80ccd_2": None,        # employer NPS contribution
+    "80d": 25000,           # health insurance, self/family (50,000 for senior citizens)
+    "80d_parents": 50000,   # health insurance for parents
+    "24b": 200000,          # home-loan interest on a self-occupied house
+    "80tta": 10000,         # savings-account interest (80TTB: 50,000 for senior citizens)
+    "80e": None,            # education-loan interest
+    "80g": None,            # donations (eligible amount)
+    "hra": None,            # exempt part of HRA
+    "professional_tax": 2500,
+}
+_SENIOR_CAPS = {"80d": 50000, "80tta": 50000}
+
+REGIMES = {
+    "new": {
+        "slabs": ((0, 0.0), (300000, 0.05), (700000, 0.10), (1000000, 0.15), (1200000, 0.20), (1500000, 0.30)),
+        "senior_slabs": None,
+        "super_senior_slabs": None,
+        "standard_deduction": 75000,
+        "rebate_limit": 700000,
+        "rebate_max": 25000,
+        "rebate_marginal_relief": True,
+        "surcharge": ((5000000, 0.10), (10000000, 0.15), (20000000, 0.25)),
+        "deductions": ("80ccd_2",),
+    },
+    "old": {
+        "slabs": ((0, 0.0), (250000, 0.05), (500000, 0.20), (1000000, 0.30)),
+        "senior_slabs": ((0, 0.0), (300000, 0.05), (500000, 0.20), (1000000, 0.30)),
+        "super_senior_slabs": ((0, 0.0), (500000, 0.20), (1000000, 0.30)),
+        "standard_deduction": 50000,
+        "rebate_limit": 500000,
+        "rebate_max": 12500,
+        "rebate_marginal_relief": False,
+        "surcharge": ((5000000, 0.10), (10000000, 0.15), (20000000, 0.25), (50000000, 0.37)),
+        "deductions": tuple(DEDUCTION_CAPS),
+    },
+}
+
+
+def _slabs_for(regime: dict, age: int):
+    if age is not None and age >= 80 and regime["super_senior_slabs"]:
+        return regime["super_senior_slabs"]
+    if age is not None and age >= 60 and regime["senior_slabs"]:
+        return regime["senior_slabs"]
+    return regime["slabs"]
+
+
+def slab_tax(taxable_income, slabs) -> np.ndarray:
+    """Tax from a ((lower bound, rate), ...) table, for an array of taxable incomes."""
+    income = np.asarray(taxable_income, dtype=np.float64)[..., None]
+    lower = np.array([s[0] for s in slabs], dtype=np.float64)
+    rates = np.array([s[1] for s in slabs], dtype=np.float64)
+    upper = np.append(lower[1:], np.inf)
+    return (np.clip(income, lower, upper) - lower) @ rates
+
+
+def _surcharge(taxable, tax, regime: dict, slabs) -> np.ndarray:
+    """Surcharge on `tax`, with marginal relief just above each threshold."""
+    surcharge = np.zeros_like(tax)
+    for threshold, rate in regime["surcharge"]:
+        above = taxable > threshold
+        if not above.any():
+            break
+        # Tax + surcharge may not exceed the amount at the threshold plus the income above it
+        prev_rate = max([r for t, r in regime["surcharge"] if t < threshold], default=0.0)
+        at_threshold = slab_tax(threshold, slabs) * (1 + prev_rate)
+        capped = np.minimum(tax * rate, at_threshold + (taxable - threshold) - tax)
+        surcharge = np.where(above, np.maximum(capped, tax * prev_rate), surcharge)
+    return surcharge
+
+
+def allowed_deductions(deductions: dict, regime: str = "old", age: int = None) -> float:
+    """Sum of the deductions the regime allows, each capped at its limit."""
+    senior = age is not None and age >= 60
+    total = 0.0
+    for name, amount in (deductions or {}).items():
+        if name not in REGIMES[regime]["deductions"]:
+            continue
+        cap = _SENIOR_CAPS.get(name) if senior and name in _SENIOR_CAPS else DEDUCTION_CAPS.get(name)
+        total += max(0.0, float(amount)) if cap is None else min(max(0.0, float(amount)), cap)
+    return total
+
+
+def compute_tax(gross_income, regime: str = "new", deductions=None, salaried: bool = True, age: int = None) -> dict:
+    """
+    Tax liability for one income or an array of incomes.
+
+    deductions: {name: amount} with names from DEDUCTION_CAPS (ignored where the
+    regime does not allow them), or a plain number/array of already-capped
+    deductions to subtract.
+    Returns arrays (or floats for scalar input): taxable_income, slab_tax, rebate,
+    surcharge, cess, total_tax, effective_rate (percent of gross income).
+    """
+    table = REGIMES[regime]
+    gross = np.asarray(gross_income, dtype=np.float64)
+    slabs = _slabs_for(table, age)
+
+    if isinstance(deductions, dict):
+        deducted = allowed_deductions(deductions, regime, age)
+    else:
+        deducted = np.asarray(deductions if deductions is not None else 0.0, dtype=np.float64)
+    standard = np.minimum(gross, table["standard_deduction"]) if salaried else 0.0
+    taxable = np.maximum(gross - standard - deducted, 0.0)
+
+    tax = slab_tax(taxable, slabs)
+    eligible = taxable <= table["rebate_limit"]
+    rebate = np.where(eligible, np.minimum(tax, table["rebate_max"]), 0.0)
+    if table["rebate_marginal_relief"]:
+        # Just above the limit, tax may not exceed the income above the limit
+        excess = tax - (taxable - table["rebate_limit"])
+        rebate = np.where(~eligible & (excess > 0), excess, rebate)
+    tax = tax - rebate
+
+    surcharge = _surcharge(taxable, tax, table, slabs)
+    cess = (tax + surcharge) * CESS_RATE
+    total = tax + surcharge + cess
+    with np.errstate(divide="ignore", invalid="ignore"):
+        effective = np.where(gross > 0, total / gross * 100, 0.0)
+
+    result = {
+        "regime": regime,
+        "gross_income": gross,
+        "standard_deduction": np.broadcast_to(standard, gross.shape) * 1.0,
+        "deductions": np.broadcast_to(deducted, gross.shape) * 1.0,
+        "taxable_income": taxable,
+        "slab_tax": tax + rebate,
+        "rebate": rebate,
+        "surcharge": surcharge,
+        "cess": cess,
+        "total_tax": total,
+        "effective_rate": effective,
+    }
+    if gross.ndim == 0:
+        return {k: v if isinstance(v, str) else float(v) for k, v in result.items()}
+    return result
+
+
+def compare_regimes(gross_income, deductions=None, salaried: bool = True, age: int = None) -> dict:
+    """Both regimes side by side: {old, new, better (per income), savings (absolute difference)}."""
+    old = compute_tax(gross_income, "old", deductions, salaried, age)
+    new = compute_tax(gross_income, "new", deductions, salaried, age)
+    diff = np.asarray(old["total_tax"]) - np.asarray(new["total_tax"])
+    better = np.where(diff > 0, "new", np.where(diff < 0, "old", "either"))
+    return {
+        "old": old,
+        "new": new,
+        "better": str(better) if better.ndim == 0 else better,
+        "savings": float(abs(diff)) if diff.ndim == 0 else np.abs(diff),
+    }
+
+
+def break_even_deductions(gross_income, salaried: bool = True, age: int = None, iterations: int = 40):
+    """
+    Old-regime deductions (beyond the standard deduction) at which the old regime
+    costs the same as the new one with no deductions. Below it the new regime
+    wins; above it the old one does. 0 where the old regime already wins,
+    NaN where no amount of deductions can close the gap. Vectorized bisection.
+    """
+    gross = np.asarray(gross_income, dtype=np.float64)
+    target = np.asarray(compute_tax(gross, "new", None, salaried, age)["total_tax"])
+    lo = np.zeros_like(gross)
+    hi = gross.copy()
+
+    def old_tax(d):
+        return np.asarray(compute_tax(gross, "old", d, salaried, age)["total_tax"])
+
+    reachable = old_tax(hi) <= target
+    for _ in range(iterations):
+        mid = (lo + hi) / 2
+        too_little = old_tax(mid) > target
+        lo = np.where(too_little, mid, lo)
+        hi = np.where(too_little, hi, mid)
+    result = np.where(old_tax(np.zeros_like(gross)) <= target, 0.0, np.where(reachable, np.ceil(hi), np.nan))
+    return float(result) if result.ndim == 0 else result
+
+
+# ---------------------------------------------------------
+# Query parsing
+# ---------------------------------------------------------
+
+_AMOUNT = r"(?:rs\.?|inr|₹)?\s*(\d+(?:\.\d+)?)\s*(lakhs?|lacs?|lpa|l\b|crores?|cr\b|k\b)?"
+_UNITS = {"lakh": 1e5, "lac": 1e5, "lpa": 1e5, "l": 1e5, "crore": 1e7, "cr": 1e7, "k": 1e3}
+
+# Phrases that name each deduction; where two overlap the earlier entry wins
+_DEDUCTION_PATTERNS = (
+    ("80ccd_2", r"80\s*ccd\s*\(?2\)?|employer(?:'s)? (?:nps|contribution)"),
+    ("80ccd_1b", r"80\s*ccd\s*\(?1b\)?|nps"),
+    ("80d_parents", r"(?:80\s*d|health insurance|mediclaim)[^.\d]{0,20}parents?|parents?'?s? (?:health insurance|mediclaim)"),
+    ("80d", r"80\s*d\b|health insurance|mediclaim"),
+    ("80c", r"80\s*c\b|ppf|elss|epf|lic\b|life insurance"),
+    ("24b", r"24\s*\(?b\)?|home[- ]loan interest|housing loan interest"),
+    ("80tta", r"80\s*ttb?\b|savings (?:account |bank )?interest"),
+    ("80e", r"80\s*e\b|education loan"),
+    ("80g", r"80\s*g\b|donations?"),
+    ("hra", r"\bhra\b|house rent allowance"),
+)
+_DEDUCTION_RES = tuple((name, re.compile(phrase)) for name, phrase in _DEDUCTION_PATTERNS)
+# Every standalone amount ("1.5 lakh", "25000"), but not "80c", "24b" or percentages
+_AMOUNT_RE = re.compile(
+    r"(?<!\d)(?<!\d\.)(\d+(?:\.\d+)?)\s*(lakhs?|lacs?|lpa|l|crores?|cr|k)?(?![a-z0-9])(?!\s*(?:%|percent))"
+)
+_INCOME_RE = re.compile(r"(?:income(?!\s*tax)|salary|ctc|earn(?:ing)?s?|package|make|making|gross)\D{0,25}?" + _AMOUNT)
+_ANNUAL_AMOUNT_RE = re.compile(_AMOUNT + r"\s*(?:per annum|p\.?a\.?|a year|per year|annual|yearly|salary|income|ctc)")
+_AGE_RE = re.compile(r"(?:age[d]?\s*(?:is\s*)?|i am |i'm )(\d{2})|(\d{2})\s*(?:years?|yrs?)\s*old")
+# "FY 2024-25", "2025-26": years, not amounts
+_YEAR_RE = re.compile(r"\b(?:fy|ay)\s*\d{2,4}(?:\s*-\s*\d{2,4})?|\b\d{4}\s*-\s*\d{2,4}\b")
+# Deduction amounts are only paired with keywords in the same clause
+_CLAUSE_BREAK_RE = re.compile(r"[;,!?\n]|(?<!rs)\.(?!\d)|\b(?:and|also|plus|but|while)\b")
+
+
+def _amount(number: str, unit: str) -> float:
+    return float(number) * _UNITS.get((unit or "").rstrip("s"), 1)
+
+
+def _blank(text: str, spans) -> str:
+    """Replaces each (start, end) span with spaces, keeping every other position."""
+    chars = list(text)
+    for start, end in spans:
+        chars[start:end] = " " * (end - start)
+    return "".join(chars)
+
+
+def _deduction_mentions(text: str) -> list:
+    """[(start, end, name)] for every deduction keyword, in text order."""
+    mentions = []
+    for name, pattern in _DEDUCTION_RES:
+        for match in pattern.finditer(text):
+            if not any(match.start() < end and start < match.end() for start, end, _ in mentions):
+                mentions.append((match.start(), match.end(), name))
+    return sorted(mentions)
+
+
+def _pair(mentions: list, amounts: list, forward: bool) -> dict:
+    """
+    {mention index: amount index}, pairing each keyword with the nearest amount
+    after it (forward) or before it, without crossing a neighbouring keyword.
+    """
+    pairs = {}
+    for i, (start, end, _) in enumerate(mentions):
+        if forward:
+            limit = mentions[i + 1][0] if i + 1 < len(mentions) else float("inf")
+            inside = [j for j, (a_start, _, _) in enumerate(amounts) if end <= a_start < limit]
+            if inside:
+                pairs[i] = inside[0]
+        else:
+            limit = mentions[i - 1][1] if i else -1
+            inside = [j for j, (a_start, a_end, _) in enumerate(amounts) if a_start >= limit and a_end <= start]
+            if inside:
+                pairs[i] = inside[-1]
+    return pairs
+
+
+def _assign_deductions(text: str, mentions: list, amounts: list):
+    """
+    {name: amount} from keyword mentions and (start, end, value) amounts. Within
+    each clause, keywords take the amount after them ("80C 1.5 lakh") or before
+    them ("1.5 lakh in 80C"), whichever reading pairs more keywords. Returns
+    None when both readings pair the same number of keywords differently.
+    """
+    breaks = [m.start() for m in _CLAUSE_BREAK_RE.finditer(text)]
+    deductions = {}
+    for clause in sorted({bisect.bisect(breaks, start) for start, _, _ in mentions}):
+        keys = [m for m in mentions if bisect.bisect(breaks, m[0]) == clause]
+        values = [a for a in amounts if bisect.bisect(breaks, a[0]) == clause]
+        after, before = _pair(keys, values, forward=True), _pair(keys, values, forward=False)
+        if len(after) == len(before) and after != before:
+            return None
+        for i, j in max(after, before, key=len).items():
+            name = keys[i][2]
+            deductions[name] = deductions.get(name, 0) + values[j][2]
+    return deductions
+
+
+def _find_income(text: str, mentions: list):
+    """(income, start of its number) from "salary 15 lakh" or "15 lakh per annum" phrasing, or None."""
+    for pattern in (_INCOME_RE, _ANNUAL_AMOUNT_RE):
+        for match in pattern.finditer(text):
+            number, unit = match.group(1), match.group(2)
+            # A bare number under 1000 is not an annual income
+            if not unit and float(number) < 1000:
+                continue
+            # "salary ... 80C 1.5 lakh": the amount belongs to the deduction
+            if any(match.start() < end and start < match.end() for start, end, _ in mentions):
+                continue
+            return _amount(number, unit), match.start(1)
+    return None
+
+
+def parse_tax_query(text: str):
+    """
+    Extracts {income, deductions, age, salaried, regime} from a tax question, or
+    None when it has no income figure or a deduction amount cannot be assigned
+    unambiguously (the LLM answers those). regime is "old", "new" or None
+    (compare both).
+    """
+    text = re.sub(r"(?<=\d),(?=\d)", "", text.lower())
+
+    age_match = _AGE_RE.search(text)
+    age = int(age_match.group(1) or age_match.group(2)) if age_match else None
+    if age is None and re.search(r"super senior", text):
+        age = 80
+    elif age is None and re.search(r"senior citizen", text):
+        age = 60
+
+    # Ages and financial years are numbers, but never amounts
+    hidden = [m.span(1) if m.group(1) else m.span(2) for m in _AGE_RE.finditer(text)]
+    hidden += [m.span() for m in _YEAR_RE.finditer(text)]
+    numbers = _blank(text, hidden)
+
+    mentions = _deduction_mentions(numbers)
+    found = _find_income(numbers, mentions)
+    if found is None:
+        return None
+    income, income_start = found
+
+    amounts = [
+        (m.start(), m.end(), _amount(m.group(1), m.group(2)))
+        for m in _AMOUNT_RE.finditer(numbers)
+        if m.start() != income_start and (m.group(2) or float(m.group(1)) >= 100)
+    ]
+    deductions = _assign_deductions(numbers, mentions, amounts)
+    if deductions is None:
+        return None
+
+    mentions_old = bool(re.search(r"\bold (?:tax )?regime", text))
+    mentions_new = bool(re.search(r"\bnew (?:tax )?regime", text))
+    return {
+        "income": income,
+        "deductions": deductions,
+        "age": age,
+        "salaried": not re.search(r"\b(?:business|freelanc\w*|self[- ]employed|professional income)\b", text),
+        "regime": "old" if mentions_old and not mentions_new else "new" if mentions_new and not mentions_old else None,
+    }
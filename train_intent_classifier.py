@@ -0,0 +1,99 @@
+"""
+Retrains the local intent classifier and prints an accuracy/latency report.
+
+The report uses stratified k-fold cross-validation on the labeled examples:
+overall and per-label accuracy, how many inputs clear the confidence threshold
+(and how accurate those are), and prediction latency. The final model is then
+trained on all examples and saved.
+
+Usage:
+    python train_intent_classifier.py [--examples data/intent_examples.jsonl] [--output data/intent_model.json]
+                                      [--folds 5] [--epochs 40] [--no-save]
+"""
+import argparse
+import random
+import statistics
+import time
+from collections import defaultdict
+
+import config
+from intent_classifier import IntentClassifier, load_examples
+
+
+def stratified_folds(examples: list, folds: int, seed: int = 0) -> list:
+    by_label = defaultdict(list)
+    for ex in examples:
+        by_label[ex[1]].append(ex)
+    rng = random.Random(seed)
+    buckets = [[] for _ in range(folds)]
+    for label in sorted(by_label):
+        items = by_label[label]
+        rng.shuffle(items)
+        for i, ex in enumerate(items):
+            buckets[i % folds].append(ex)
+    return buckets
+
+
+def cross_validate(examples: list, labels: list, folds: int, epochs: int, threshold: float) -> dict:
+    per_label = defaultdict(lambda: [0, 0])  # label -> [correct, total]
+    confident = [0, 0]
+    latencies = []
+    buckets = stratified_folds(examples, folds)
+
+    for i, held_out in enumerate(buckets):
+        train = [ex for j, b in enumerate(buckets) if j != i for ex in b]
+        model = IntentClassifier(labels).fit(train, epochs=epochs)
+        for text, label in held_out:
+            start = time.perf_counter()
+            predicted, confidence = model.predict(text)
+            latencies.append((time.perf_counter() - start) * 1e6)
+            per_label[label][0] += predicted == label
+            per_label[label][1] += 1
+            if confidence >= threshold:
+                confident[0] += predicted == label
+                confident[1] += 1
+
+    correct = sum(c for c, _ in per_label.values())
+    total = sum(t for _, t in per_label.values())
+    latencies.sort()
+    return {
+        "accuracy": correct / total,
+        "per_label": {label: c / t for label, (c, t) in per_label.items()},
+        "coverage": confident[1] / total,
+        "confident_accuracy": confident[0] / confident[1] if confident[1] else 0.0,
+        "latency_us_mean": statistics.mean(latencies),
+        "latency_us_p99": latencies[int(0.99 * (len(latencies) - 1))],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--examples", default=config.INTENT_EXAMPLES_PATH)
+    parser.add_argument("--output", default=config.INTENT_MODEL_PATH)
+    parser.add_argument("--folds", type=int, default=5)
+    parser.add_argument("--epochs", type=int, default=40)
+    parser.add_argument("--threshold", type=float, default=config.INTENT_MIN_CONFIDENCE)
+    parser.add_argument("--no-save", action="store_true")
+    args = parser.parse_args()
+
+    examples = load_examples(args.examples)
+    labels = sorted({label for _, label in examples})
+    print(f"{len(examples)} examples, labels: {', '.join(labels)}")
+
+    report = cross_validate(examples, labels, args.folds, args.epochs, args.threshold)
+    print(f"\n{args.folds}-fold cross-validation")
+    print(f"  accuracy:            {report['accuracy']:.3f}")
+    for label, acc in sorted(report["per_label"].items()):
+        print(f"    {label:<26} {acc:.3f}")
+    print(f"  confidence >= {args.threshold}: {report['coverage']:.1%} of inputs, accuracy {report['confident_accuracy']:.3f}")
+    print(f"  (the remaining {1 - report['coverage']:.1%} would fall back to the LLM)")
+    print(f"  latency:             {report['latency_us_mean']:.0f} us mean, {report['latency_us_p99']:.0f} us p99")
+
+    if not args.no_save:
+        start = time.perf_counter()
+        IntentClassifier(labels).fit(examples, epochs=args.epochs).save(args.output)
+        print(f"\nTrained on all examples in {time.perf_counter() - start:.1f}s, saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
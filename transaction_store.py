@@ -0,0 +1,155 @@
+"""
+Local columnar transaction store (Parquet, partitioned by user and month).
+
+Every analysis used to start from scratch. Categorized transactions can now be
+appended here incrementally: each append writes one new Parquet file into its
+`user_id=<user>/month=<YYYY-MM>` directory, so old data is never rewritten.
+Queries go through `pyarrow.dataset`, so partition filters prune whole
+directories and only the needed columns are scanned.
+
+    store = TransactionStore()
+    store.append("local", categorize_expenses(text))
+    store.summary("local", start_month="2024-01")   # compute_expense_summary-shaped
+    store.month_over_month("local")
+"""
+import datetime
+import os
+import uuid
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+import config
+
+SCHEMA = pa.schema([
+    ("date", pa.date32()),
+    ("description", pa.string()),
+    ("amount", pa.float64()),
+    ("category", pa.string()),
+])
+_PARTITIONING = ds.partitioning(pa.schema([("user_id", pa.string()), ("month", pa.string())]), flavor="hive")
+
+
+def _month_of(day: datetime.date) -> str:
+    return day.strftime("%Y-%m")
+
+
+class TransactionStore:
+    def __init__(self, root: str = None):
+        self.root = root or config.TRANSACTION_STORE_DIR
+
+    # ---------- Writes ----------
+
+    def append(self, user_id: str, transactions: list, when: datetime.date = None, replace: bool = False) -> int:
+        """
+        Appends {description, amount, category[, date]} dicts. Transactions without
+        a date are stamped with `when` (default: today). With replace=True they
+        replace what was stored for the months they fall in, e.g. a re-analysis
+        of the same month. Returns the number stored.
+        """
+        default_day = when or datetime.date.today()
+        by_month = {}
+        for txn in transactions:
+            day = txn.get("date") or default_day
+            if isinstance(day, str):
+                day = datetime.date.fromisoformat(day[:10])
+            elif isinstance(day, datetime.datetime):
+                day = day.date()
+            by_month.setdefault(_month_of(day), []).append((day, txn))
+
+        for month, rows in by_month.items():
+            table = pa.table({
+                "date": [day for day, _ in rows],
+                "description": [str(t.get("description", "")) for _, t in rows],
+                "amount": [float(t["amount"]) for _, t in rows],
+                "category": [str(t.get("category") or "Other") for _, t in rows],
+            }, schema=SCHEMA)
+            directory = self._partition_dir(user_id, month)
+            os.makedirs(directory, exist_ok=True)
+            old_parts = [f for f in os.listdir(directory) if f.endswith(".parquet")] if replace else []
+            pq.write_table(table, os.path.join(directory, f"part-{uuid.uuid4().hex}.parquet"))
+            # Old files go only after the new one is written, so the month is never empty
+            for part in old_parts:
+                os.remove(os.path.join(directory, part))
+        return sum(len(rows) for rows in by_month.values())
+
+    def compact(self, user_id: str, month: str):
+        """Rewrites one month's small append files as a single file."""
+        directory = self._partition_dir(user_id, month)
+        parts = sorted(f for f in os.listdir(directory) if f.endswith(".parquet")) if os.path.isdir(directory) else []
+        if len(parts) < 2:
+            return
+        table = pa.concat_tables(pq.read_table(os.path.join(directory, p), schema=SCHEMA) for p in parts)
+        pq.write_table(table, os.path.join(directory, f"part-{uuid.uuid4().hex}.parquet"))
+        for p in parts:
+            os.remove(os.path.join(directory, p))
+
+    # ---------- Queries ----------
+
+    def summary(self, user_id: str, start_month: str = None, end_month: str = None) -> dict:
+        """{total_expense, category_breakdown, months} over the selected months."""
+        table = self._scan(user_id, ["amount", "category", "month"], start_month, end_month)
+        if table is None or table.num_rows == 0:
+            return {"total_expense": 0, "category_breakdown": {}, "months": []}
+        grouped = table.group_by("category").aggregate([("amount", "sum")])
+        breakdown = dict(zip(grouped["category"].to_pylist(), grouped["amount_sum"].to_pylist()))
+        return {
+            "total_expense": pc.sum(table["amount"]).as_py(),
+            "category_breakdown": breakdown,
+            "months": sorted(pc.unique(table["month"]).to_pylist()),
+        }
+
+    def monthly_totals(self, user_id: str, start_month: str = None, end_month: str = None,
+                       by_category: bool = False) -> list:
+        """[{month, total}] in month order, or [{month, category, total}] with by_category=True."""
+        keys = ["month", "category"] if by_category else ["month"]
+        table = self._scan(user_id, keys + ["amount"], start_month, end_month)
+        if table is None or table.num_rows == 0:
+            return []
+        grouped = table.group_by(keys).aggregate([("amount", "sum")]).sort_by([(k, "ascending") for k in keys])
+        return [
+            {**{k: row[k] for k in keys}, "total": row["amount_sum"]}
+            for row in grouped.to_pylist()
+        ]
+
+    def month_over_month(self, user_id: str, start_month: str = None, end_month: str = None) -> list:
+        """Monthly totals with the change from the previous stored month."""
+        rows = self.monthly_totals(user_id, start_month, end_month)
+        previous = None
+        for row in rows:
+            row["delta"] = None if previous is None else row["total"] - previous
+            row["delta_pct"] = (
+                round(row["delta"] / previous * 100, 2) if previous else None
+            )
+            previous = row["total"]
+        return rows
+
+    # ---------- Internals ----------
+
+    def _partition_dir(self, user_id: str, month: str) -> str:
+        return os.path.join(self.root, f"user_id={user_id}", f"month={month}")
+
+    def _scan(self, user_id: str, columns: list, start_month: str = None, end_month: str = None):
+        if not os.path.isdir(os.path.join(self.root, f"user_id={user_id}")):
+            return None
+        dataset = ds.dataset(self.root, format="parquet", partitioning=_PARTITIONING, schema=_dataset_schema())
+        # Partition filters prune directories before any file is opened
+        expr = ds.field("user_id") == user_id
+        if start_month:
+            expr = expr & (ds.field("month") >= start_month)
+        if end_month:
+            expr = expr & (ds.field("month") <= end_month)
+        return dataset.to_table(columns=columns, filter=expr)
+
+
+def _dataset_schema() -> pa.Schema:
+    return pa.schema(list(SCHEMA) + [pa.field("user_id", pa.string()), pa.field("month", pa.string())])
+
+
+def months_back(months: int, today: datetime.date = None) -> str:
+    """The YYYY-MM month that starts a window of `months` months ending with the current one."""
+    today = today or datetime.date.today()
+    index = today.year * 12 + today.month - 1 - (months - 1)
+    return f"{index // 12:04d}-{index % 12 + 1:02d}"
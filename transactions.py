@@ -0,0 +1,116 @@
+"""
+Compact, array-backed transaction container.
+
+Transactions travel through the pipeline as lists of dicts with float
+amounts. TransactionTable holds the same data as NumPy columns instead:
+
+- amounts:          int64 paise (exact money arithmetic, no float drift)
+- category_codes:   small integer codes into `categories`
+- description_ids:  integer ids into `descriptions` (each distinct text stored once)
+
+Aggregations (totals, per-category sums) run as vectorized C loops.
+`from_records` / `to_records` convert to and from the dict-based format the
+rest of the app uses.
+"""
+import numpy as np
+
+
+def to_paise(amounts) -> np.ndarray:
+    """Rupee amounts (scalars or arrays) -> int64 paise, rounded to the nearest paisa."""
+    return np.rint(np.asarray(amounts, dtype=np.float64) * 100).astype(np.int64)
+
+
+def to_rupees(paise: int):
+    """Paise -> rupees; an int when the value is whole, else a float with 2 decimals."""
+    paise = int(paise)
+    return paise // 100 if paise % 100 == 0 else paise / 100
+
+
+class TransactionTable:
+    __slots__ = ("amounts", "category_codes", "description_ids", "categories", "descriptions")
+
+    def __init__(self, amounts: np.ndarray, category_codes: np.ndarray, description_ids: np.ndarray,
+                 categories: list, descriptions: list):
+        self.amounts = amounts
+        self.category_codes = category_codes
+        self.description_ids = description_ids
+        self.categories = categories
+        self.descriptions = descriptions
+
+    # ---------- Construction / conversion ----------
+
+    @classmethod
+    def from_records(cls, records: list) -> "TransactionTable":
+        """Builds a table from [{description, amount, category}, ...] dicts."""
+        return cls.from_columns(
+            [r.get("description", "") for r in records],
+            [r["amount"] for r in records],
+            [r.get("category") or "Other" for r in records],
+        )
+
+    @classmethod
+    def from_frame(cls, df) -> "TransactionTable":
+        """Builds a table from a DataFrame with description/amount/category columns."""
+        return cls.from_columns(df["description"].astype(str), df["amount"].to_numpy(), df["category"].astype(str))
+
+    @classmethod
+    def from_columns(cls, descriptions, amounts, categories) -> "TransactionTable":
+        # Codes follow first appearance, so breakdowns keep the input order
+        category_names, category_codes = _intern(categories)
+        description_texts, description_ids = _intern(descriptions)
+        return cls(
+            to_paise(amounts) if len(amounts) else np.zeros(0, dtype=np.int64),
+            category_codes.astype(np.int16),
+            description_ids.astype(np.int32),
+            category_names,
+            description_texts,
+        )
+
+    def to_records(self) -> list:
+        return [
+            {"description": self.descriptions[d], "amount": to_rupees(a), "category": self.categories[c]}
+            for d, a, c in zip(self.description_ids.tolist(), self.amounts.tolist(), self.category_codes.tolist())
+        ]
+
+    def __len__(self) -> int:
+        return len(self.amounts)
+
+    # ---------- Aggregations ----------
+
+    def total_paise(self) -> int:
+        return int(self.amounts.sum())
+
+    def total(self):
+        return to_rupees(self.total_paise())
+
+    def sum_by_category_paise(self) -> dict:
+        """{category: paise} for every category present, in first-appearance order."""
+        sums = np.zeros(len(self.categories), dtype=np.int64)
+        np.add.at(sums, self.category_codes, self.amounts)
+        present = np.bincount(self.category_codes, minlength=len(self.categories)) > 0
+        return {name: int(s) for name, s, p in zip(self.categories, sums.tolist(), present.tolist()) if p}
+
+    def sum_by_category(self) -> dict:
+        return {name: to_rupees(p) for name, p in self.sum_by_category_paise().items()}
+
+    def sum_by_description(self) -> dict:
+        sums = np.zeros(len(self.descriptions), dtype=np.int64)
+        np.add.at(sums, self.description_ids, self.amounts)
+        return {name: to_rupees(s) for name, s in zip(self.descriptions, sums.tolist())}
+
+    def filter(self, mask: np.ndarray) -> "TransactionTable":
+        """Rows where `mask` is True (the interned lookup tables are shared)."""
+        return TransactionTable(self.amounts[mask], self.category_codes[mask], self.description_ids[mask],
+                                self.categories, self.descriptions)
+
+    def with_category(self, category: str) -> "TransactionTable":
+        if category not in self.categories:
+            return self.filter(np.zeros(len(self), dtype=bool))
+        return self.filter(self.category_codes == self.categories.index(category))
+
+
+def _intern(values) -> tuple:
+    """Returns (distinct values in first-appearance order, int codes per value)."""
+    table = {}
+    codes = np.fromiter((table.setdefault(v, len(table)) for v in values), dtype=np.int64)
+    return list(table), codes